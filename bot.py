@@ -1,6 +1,6 @@
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from pkgutil import iter_modules
 from typing import TYPE_CHECKING
 
@@ -12,8 +12,18 @@ from discord.ext import commands
 from discord.ext.duck.errors import ErrorManager
 
 from cogs.db import init_db
-from cogs.future_tasks import FutureTask
-from cogs.utils import InvalidURL, Layout, View
+from cogs.future_tasks import FutureTask, FutureTasksCog
+from cogs.utils import (
+    CooldownStore,
+    CopyBuffer,
+    InvalidURL,
+    Layout,
+    MemberJobs,
+    MessageDispatcher,
+    PlotRenderer,
+    Scheduler,
+    View,
+)
 from cogs.utils.checks import guild_only
 from cogs.activity_event.constants import START_TIME
 from config import ERROR_WEBHOOK_URL, LOG_FILE
@@ -52,6 +62,12 @@ class LunaBot(commands.Bot):
         )
         self.tickets: dict[discord.Thread, Ticket] = {}
         self.views: set[View] = set()
+        self.messages = MessageDispatcher(self)
+        self.buffers: set[CopyBuffer] = set()
+        self.cooldowns = CooldownStore(self)
+        self.plots = PlotRenderer()
+        self.scheduler = Scheduler(self)
+        self.jobs = MemberJobs(self)
 
     async def load_activity_event(self):
         from cogs.activity_event import (
@@ -88,6 +104,8 @@ class LunaBot(commands.Bot):
 
         # connect to db
         self.db = await init_db()
+        await self.cooldowns.load()
+        self.cooldowns.start()
 
         await self.load_extension("jishaku")
         priority = ["cogs.vars", "cogs.tools"]
@@ -115,14 +133,41 @@ class LunaBot(commands.Bot):
         else:
             await self.load_extension("cogs.activity_event")
 
+        self.loop.create_task(self.jobs.resume())
+
         logging.info("LunaBot is ready")
 
+    async def add_cog(self, cog: commands.Cog, /, **kwargs):
+        await super().add_cog(cog, **kwargs)
+        self.messages.register_cog(cog)
+
+    async def remove_cog(self, name: str, /, **kwargs) -> commands.Cog | None:
+        cog = await super().remove_cog(name, **kwargs)
+        if cog is not None:
+            self.messages.unregister_cog(cog)
+        return cog
+
     async def close(self):
         for view in list(self.views):
             try:
                 await view.on_timeout()
             except Exception as e:
                 logging.info(f"Couldnt stop view: {e}")
+        for buffer in list(self.buffers):
+            try:
+                await buffer.close()
+            except Exception as e:
+                logging.info(f"Couldnt flush buffer for {buffer.table}: {e}")
+        try:
+            await self.cooldowns.close()
+        except Exception as e:
+            logging.info(f"Couldnt snapshot cooldowns: {e}")
+        try:
+            await self.jobs.close()
+        except Exception as e:
+            logging.info(f"Couldnt checkpoint member jobs: {e}")
+        self.plots.close()
+        self.scheduler.stop()
         await self.session.close()
         await super().close()
 
@@ -166,20 +211,11 @@ class LunaBot(commands.Bot):
         except discord.NotFound:
             raise InvalidURL()
 
-    async def schedule_future_task(self, action: str, time: datetime, **kwargs):
-        query = """INSERT INTO
-                       future_tasks (action, time, data)
-                   VALUES
-                       ($1, $2, $3)
-                   RETURNING
-                       id
-                """
-        task_id = await self.db.fetchval(
-            query, action, time, json.dumps(kwargs, indent=4)
-        )
-        task = FutureTask(self, task_id, action, time, **kwargs)
-        self.future_tasks[task_id] = task
-        task.start()
+    async def schedule_future_task(
+        self, action: str, time: datetime, **kwargs
+    ) -> FutureTask:
+        cog: FutureTasksCog = self.get_cog("FutureTasksCog")  # type: ignore
+        return await cog.schedule(action, time, **kwargs)
 
     async def get_cooldown_end(
         self,
@@ -202,37 +238,9 @@ class LunaBot(commands.Bot):
         else:
             obj_id = None
 
-        # query = 'UPDATE cooldowns SET count = count + 1 WHERE action = $1 AND object_id = $2 AND bucket = $3 AND end_time > NOW() RETURNING end_time'
-        # row = await self.db.fetchrow(query, action, obj_id, bucket)
-        # if row is not None:
-        #     return row['end_time']
-
-        query = "SELECT count, end_time FROM cooldowns WHERE action = $1 AND object_id = $2 AND bucket = $3"
-        row = await self.db.fetchrow(query, action, obj_id, bucket)
-        time_ok = True
-        count_ok = True
-
-        if row is not None:
-            time_ok = row["end_time"] < discord.utils.utcnow()
-            count_ok = row["count"] < rate
-
-            if not time_ok and not count_ok:
-                return row["end_time"]
-
-            if not time_ok:
-                query = "UPDATE cooldowns SET count = count + 1 WHERE action = $1 AND object_id = $2"
-                await self.db.execute(query, action, obj_id)
-
-        if update and time_ok:
-            query = """INSERT INTO cooldowns (action, object_id, bucket, end_time, count) 
-                       VALUES ($1, $2, $3, $4, 1) 
-                       ON CONFLICT (action, object_id)
-                       DO UPDATE SET end_time = $4, count = 1 
-                    """
-            end_time = discord.utils.utcnow() + timedelta(seconds=duration)
-            await self.db.execute(query, action, obj_id, bucket, end_time)
-
-        return None
+        return self.cooldowns.hit(
+            action, obj_id, bucket, duration, rate=rate, update=update
+        )
 
     def get_var_channel(
         self, name: str
@@ -292,6 +300,7 @@ class LunaBot(commands.Bot):
             f.write(" ".join(parts) + "\n")
 
     async def on_message(self, message):
+        self.loop.create_task(self.messages.dispatch(message))
         ctx = await self.get_context(message, cls=LunaCtx)
         await self.invoke(ctx)
 
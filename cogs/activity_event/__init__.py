@@ -3,7 +3,7 @@ import logging
 import random
 import time
 from collections.abc import Callable
-from datetime import datetime
+from datetime import datetime, timezone
 from itertools import cycle
 from typing import TYPE_CHECKING, Dict, List, Set
 from zoneinfo import ZoneInfo
@@ -12,20 +12,22 @@ import dateparser
 import discord
 from discord.ext import commands, tasks
 
-from cogs.utils import Layout, next_day
+from cogs.utils import Layout, MessageView, message_handler, next_day
 from cogs.utils.errors import ActivityEventBreak
 from cogs.utils.time_stuff import localnow
 
 from .constants import *
 from .effects import (
     CooldownReducer,
+    EffectScheduler,
     Multiplier,
 )
-from .graphs import DataPoint, PlotData, plot_data
+from .graphs import MAX_POINTS, DataPoint, PlotData, plot_data
 from .player import Player
 from .team import Team
 from .trivia import parse_raw
 from .views import DailyTasksView, RedeemView, TeamLBView
+from .writer import EventWriter
 
 if TYPE_CHECKING:
     from asyncpg import Record
@@ -61,7 +63,7 @@ class ActivityEvent(commands.Cog):
         #     1158931468664446986,
         #     GENERAL_ID,
         # }
-        self.bot.powerup_tasks = []
+        self.bot.effects = EffectScheduler()
 
         if TEST:
             self.msgs_needed = 3
@@ -87,15 +89,7 @@ class ActivityEvent(commands.Cog):
             "double",
             "triple",
         ]
-        self.non_point_types = [
-            "all_msg",
-            "multi_powerup",
-            "cd_powerup",
-            "1k",
-            "trivia_powerup",
-            "steal_powerup",
-            "topup_powerup",
-        ]
+        self.non_point_types = NON_POINT_TYPES
 
         self.team_members = {
             "poinsettia": [
@@ -209,9 +203,32 @@ class ActivityEvent(commands.Cog):
                        claimed BOOLEAN DEFAULT FALSE,
                        UNIQUE (user_id, date_str, task)
                    );
+
+                   CREATE TABLE IF NOT EXISTS event_player_totals (
+                       user_id bigint PRIMARY KEY,
+                       points integer NOT NULL DEFAULT 0,
+                       messages integer NOT NULL DEFAULT 0
+                   );
                 """
         await self.bot.db.execute(query)
 
+        # the totals are kept by the event writer from here on, this only
+        # seeds them for an event that started before the table existed
+        query = """INSERT INTO
+                       event_player_totals (user_id, points, messages)
+                   SELECT
+                       user_id,
+                       COALESCE(SUM(gain) FILTER (WHERE type != ALL ($1)), 0),
+                       COALESCE(SUM(gain) FILTER (WHERE type = 'all_msg'), 0)
+                   FROM
+                       event_log
+                   WHERE
+                       NOT EXISTS (SELECT 1 FROM event_player_totals)
+                   GROUP BY
+                       user_id
+                """
+        await self.bot.db.execute(query, self.non_point_types)
+
         for team, member_ids in self.team_members.items():
             query = """INSERT INTO
                            event_stats (user_id, team, points, messages)
@@ -229,6 +246,27 @@ class ActivityEvent(commands.Cog):
 
         await self.create_tables()
 
+        self.writer = EventWriter(self.bot)
+        self.writer.start()
+
+        totals = await self.fetch_player_totals()
+
+        query = """SELECT
+                       id,
+                       user_id,
+                       name,
+                       value,
+                       start_time,
+                       end_time
+                   FROM
+                       powerups
+                   WHERE
+                       end_time > $1
+                """
+        powerup_rows: Dict[int, List["Record"]] = {}
+        for row in await self.bot.db.fetch(query, time.time()):
+            powerup_rows.setdefault(row["user_id"], []).append(row)
+
         for team_name, member_ids in self.team_members.items():
             if team_name not in self.teams:
                 query = """INSERT INTO
@@ -260,22 +298,8 @@ class ActivityEvent(commands.Cog):
                 if member is None:
                     continue
 
-                query = """SELECT
-                               id,
-                               name,
-                               value,
-                               start_time,
-                               end_time
-                           FROM
-                               powerups
-                           WHERE
-                               user_id = $1 
-                               AND end_time > $2 
-                        """
-
-                rows = await self.bot.db.fetch(query, member.id, time.time())
                 powerups = []
-                for row in rows:
+                for row in powerup_rows.get(member.id, []):
                     if row["name"] == "multi_powerup":
                         powerups.append(
                             Multiplier(
@@ -296,35 +320,12 @@ class ActivityEvent(commands.Cog):
                             )
                         )
 
-                query = """SELECT
-                               sum(gain)
-                           FROM
-                               event_log
-                           WHERE
-                               type != ALL($2)
-                               AND user_id = $1 
-                        """
-                points = await self.bot.db.fetchval(
-                    query, member.id, self.non_point_types
-                )
-                if points is None:
-                    points = 0
-
-                query = """SELECT
-                               sum(gain)
-                           FROM
-                               event_log
-                           WHERE
-                               type = $1 
-                               AND user_id = $2
-                        """
-                msgs = await self.bot.db.fetchval(query, "all_msg", member.id)
-                if msgs is None:
-                    msgs = 0
+                points, msgs = totals.get(member.id, (0, 0))
 
                 team = self.teams[team_name]
                 player = Player(
                     self.bot,
+                    self.writer,
                     team,
                     member,
                     self.nick_dict[member.id],
@@ -355,11 +356,11 @@ class ActivityEvent(commands.Cog):
         self.award_pension.start()
 
     async def cog_unload(self):
-        for t in self.bot.powerup_tasks:
-            t.cancel()
-        self.bot.log(f"Cancelled {len(self.bot.powerup_tasks)} powerup tasks", "ae")
+        self.bot.effects.stop()
+        self.bot.log(f"Stopped {len(self.bot.effects.effects)} active powerups", "ae")
         self.sync_player_data.cancel()
         self.award_pension.cancel()
+        await self.writer.close()
 
     @tasks.loop(hours=24)
     async def award_pension(self):
@@ -385,48 +386,24 @@ class ActivityEvent(commands.Cog):
     async def before_award_pension(self):
         await discord.utils.sleep_until(next_day(ZoneInfo("America/Chicago")))
 
+    async def fetch_player_totals(self) -> Dict[int, tuple[int, int]]:
+        query = "SELECT user_id, points, messages FROM event_player_totals"
+        rows = await self.bot.db.fetch(query)
+        return {row["user_id"]: (row["points"], row["messages"]) for row in rows}
+
     @tasks.loop(hours=1)
     async def sync_player_data(self):
         """Fetch points and message counts from the database and update the players."""
         try:
+            await self.writer.flush()
+            totals = await self.fetch_player_totals()
             for player_id, player in self.players.items():
-                # Fetch points
-                points_query = """SELECT
-                                    COALESCE(SUM(gain), 0)
-                                  FROM
-                                    event_log
-                                  WHERE
-                                    user_id = $1
-                                    AND type != ALL ($2)
-                               """
-                points = await self.bot.db.fetchval(
-                    points_query, player_id, self.non_point_types
-                )
-                if points is None:
-                    points = 0
-
-                # Fetch message count
-                msgs_query = """SELECT
-                                  COALESCE(SUM(gain), 0)
-                                FROM
-                                  event_log
-                                WHERE
-                                  user_id = $1
-                                  AND type = $2
-                             """
-                msgs = await self.bot.db.fetchval(msgs_query, player_id, "all_msg")
-                if msgs is None:
-                    msgs = 0
+                points, msgs = totals.get(player_id, (0, 0))
 
                 # Update player object
                 player.points = points
                 player.msg_count = msgs
 
-                # logging.info(
-                #     f"Updated Player {player.nick} (ID: {player_id}): "
-                #     f"Points: {player.points}, Msg Count: {player.msg_count}"
-                # )
-
         except Exception as e:
             self.bot.log(f"Error during player data synchronization: {e}", "ae")
 
@@ -666,16 +643,10 @@ class ActivityEvent(commands.Cog):
             else:
                 num_poinsettia[msg.author.id] += 1
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if msg.guild is None or msg.guild.id != self.bot.GUILD_ID:
-            return
-        if msg.author.bot:
-            return
+    @message_handler(main_guild=True, channels=[GENERAL_ID])
+    async def handle_message(self, msg: discord.Message, view: MessageView):
         if msg.author.id not in self.players:
             return
-        if msg.channel.id != GENERAL_ID:
-            return
 
         if is_break() and not TEST:
             return
@@ -993,6 +964,31 @@ class ActivityEvent(commands.Cog):
             jinja=True,
         )
 
+    @commands.command()
+    @commands.is_owner()
+    async def effects(self, ctx):
+        """Shows every active powerup and when it expires"""
+        scheduler = self.bot.effects
+        active = scheduler.active()
+
+        lines = []
+        for effect in active[:20]:
+            powerup = effect.powerup
+            end = discord.utils.format_dt(datetime.fromtimestamp(effect.end), "R")
+            lines.append(f"{effect.player.nick}: {powerup.name} ({powerup.n}) {end}")
+        if len(active) > 20:
+            lines.append(f"...and {len(active) - 20} more")
+
+        embed = discord.Embed(
+            title=f"{len(active)} active powerups",
+            description="\n".join(lines) or "None",
+            color=self.bot.DEFAULT_EMBED_COLOR,
+        )
+        embed.set_footer(
+            text=f"{len(scheduler.heap)} heap entries, {scheduler.expired} expired"
+        )
+        await ctx.send(embed=embed)
+
     @commands.command(aliases=["dailys"])
     @commands.check(is_on_break)
     async def dailies(self, ctx):
@@ -1114,42 +1110,87 @@ class ActivityEvent(commands.Cog):
         #         ctx, team, start, end, "points from dailies", ["dailies_bonus"]
         #     )
 
-    def _data_from_rows(
+    async def _fetch_series(
         self,
-        rows_list: list[tuple[str, "Record"]],
-        tz: str,
+        stat_type: str | None,
         start: datetime,
         end: datetime,
+        exclude_types=None,
     ) -> PlotData:
-        ret = []
-        for tname, rows in rows_list:
-            data: list[DataPoint] = []
-            cumulative_sum = 0  # Accumulate values even before the start time
+        """Cumulative gain per team, binned server-side to at most MAX_POINTS.
 
-            # Add all rows before the start time to the cumulative sum
-            for row in rows:
-                if row["time"] <= int(start.timestamp()):
-                    cumulative_sum += row["gain"]
-                else:
-                    break
+        Everything up to ``start`` is folded into bin 0, which is the value at
+        the start of the plot. Bin ``k`` covers ``(start + (k-1)w, start + kw]``
+        and is plotted at its right edge.
+        """
+        start_ts = int(start.timestamp())
+        end_ts = int(end.timestamp())
+        width = max(1, -(-(end_ts - start_ts) // MAX_POINTS))
 
-            # Ensure a data point at the start time
-            data.append((start, cumulative_sum))
-
-            # Add rows from the start time onward
-            for row in rows:
-                if row["time"] > int(start.timestamp()):
-                    cumulative_sum += row["gain"]
-                    data.append(
-                        (
-                            datetime.fromtimestamp(row["time"], tz=ZoneInfo(tz)),
-                            cumulative_sum,
-                        )
+        if stat_type:
+            condition = "type = $4"
+            arg = stat_type
+        else:
+            # stat_type = None: points
+            condition = "type != ALL($4)"
+            arg = exclude_types
+
+        query = f"""WITH binned AS (
+                        SELECT
+                            team,
+                            CASE
+                                WHEN time <= $1 THEN 0
+                                ELSE (time - $1 - 1) / $3 + 1
+                            END AS bin,
+                            SUM(gain) AS gain
+                        FROM
+                            event_log
+                        WHERE
+                            time < $2
+                            AND {condition}
+                        GROUP BY
+                            team,
+                            bin
                     )
+                    SELECT
+                        team,
+                        bin,
+                        SUM(gain) OVER (
+                            PARTITION BY team
+                            ORDER BY bin
+                        )::bigint AS total
+                    FROM
+                        binned
+                    ORDER BY
+                        team,
+                        bin
+                 """
+        rows = await self.bot.db.fetch(query, start_ts, end_ts, width, arg)
+
+        by_team: Dict[str, List["Record"]] = {}
+        for row in rows:
+            by_team.setdefault(row["team"], []).append(row)
 
-            # Ensure a data point at the end time
-            if not data or data[-1][0] < end:
-                data.append((end, cumulative_sum))
+        ret = []
+        for tname in self.teams.keys():
+            team_rows = by_team.get(tname, [])
+
+            total = 0
+            data: list[DataPoint] = []
+            for row in team_rows:
+                total = row["total"]
+                if row["bin"] == 0:
+                    continue
+                ts = min(start_ts + row["bin"] * width, end_ts)
+                data.append((datetime.fromtimestamp(ts, tz=timezone.utc), total))
+
+            # Ensure data points at the start and end times
+            baseline = 0
+            if team_rows and team_rows[0]["bin"] == 0:
+                baseline = team_rows[0]["total"]
+            data.insert(0, (start, baseline))
+            if data[-1][0] < end:
+                data.append((end, total))
 
             ret.append((tname, data))
         return ret
@@ -1177,13 +1218,8 @@ class ActivityEvent(commands.Cog):
         team_key: Callable[[Team], int],
         exclude_types=None,
     ):
-        rows_list = []
-        # for t in self.teams.values() if team == "both" else [team]:
-        for tname in self.teams.keys():
-            rows = await self._fetch_rows(tname, stat_type, end, exclude_types)
-            rows_list.append((tname, rows))
-
-        data = self._data_from_rows(rows_list, tz, start, end)
+        await self.writer.flush()
+        data = await self._fetch_series(stat_type, start, end, exclude_types)
         file = await plot_data(ctx, tz, data)
         embed = self.bot.get_embed("ae/teamstats")
         repls = self._get_stat_repls(title, start, end, player_key, team_key)
@@ -1207,19 +1243,6 @@ class ActivityEvent(commands.Cog):
     #     embed.set_image(url="attachment://plot.png")
     #     await ctx.send(embed=embed, file=file)
 
-    async def _fetch_rows(
-        self, team: str, stat_type: str | None, end: datetime, exclude_types
-    ):
-        if stat_type:
-            query = """SELECT time, gain FROM event_log WHERE team = $1 AND type = $2 AND time < $3 ORDER BY time ASC"""
-            return await self.bot.db.fetch(query, team, stat_type, int(end.timestamp()))
-        else:
-            # stat_type = None: points
-            query = """SELECT gain, time FROM event_log WHERE team = $1 AND type != ALL($2) AND time < $3 ORDER BY time ASC"""
-            return await self.bot.db.fetch(
-                query, team, exclude_types, int(end.timestamp())
-            )
-
     async def _process_rows(self, team, types, end, stats, player_stats):
         if team.name not in stats:
             stats[team.name] = {}
@@ -78,3 +78,15 @@ else:
     DAILY_GOAL_TRIVIA = 3
     DAILY_GOAL_POINTS = 50
     DAILY_GOAL_WELC = 5
+
+
+# event_log types that don't count towards a player's points
+NON_POINT_TYPES = [
+    "all_msg",
+    "multi_powerup",
+    "cd_powerup",
+    "1k",
+    "trivia_powerup",
+    "steal_powerup",
+    "topup_powerup",
+]
@@ -1,7 +1,9 @@
 import asyncio
+import heapq
+import itertools
+import logging
 import time
-from typing import TYPE_CHECKING
-from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List
 
 if TYPE_CHECKING:
     from .player import Player
@@ -19,7 +21,10 @@ class Powerup:
     def __eq__(self, other):
         return self.id == other.id
 
-    async def apply(self, _: "Player"):
+    def activate(self, _: "Player"):
+        raise NotImplementedError()
+
+    def expire(self, _: "Player"):
         raise NotImplementedError()
 
 
@@ -30,17 +35,14 @@ class Multiplier(Powerup):
         self.name = "Multiplier"
         self.log_name = "multi_powerup"
 
-    async def _after_apply(self, player: "Player"):
-        await asyncio.sleep(self.end - time.time())
-        player.multi //= self.n
-        player.powerups.remove(self)
-
-    async def apply(self, player: "Player"):
+    def activate(self, player: "Player"):
         if self not in player.powerups:
             player.powerups.append(self)
         player.multi *= self.n
-        await self._after_apply(player)
-        # player.bot.loop.create_task(self._after_apply(player))
+
+    def expire(self, player: "Player"):
+        player.multi //= self.n
+        player.powerups.remove(self)
 
 
 class CooldownReducer(Powerup):
@@ -50,14 +52,96 @@ class CooldownReducer(Powerup):
         self.name = "Cooldown Reducer"
         self.log_name = "cd_powerup"
 
-    async def _after_apply(self, player: "Player"):
-        await asyncio.sleep(self.end - time.time())
-        player.cds.remove(self.n)
-        player.powerups.remove(self)
-
-    async def apply(self, player: "Player"):
+    def activate(self, player: "Player"):
         if self not in player.powerups:
             player.powerups.append(self)
         player.cds.append(self.n)
-        await self._after_apply(player)
-        # player.bot.loop.create_task(self._after_apply(player))
+
+    def expire(self, player: "Player"):
+        player.cds.remove(self.n)
+        player.powerups.remove(self)
+
+
+class ActiveEffect:
+    __slots__ = ("end", "seq", "powerup", "player", "cancelled")
+
+    def __init__(self, seq: int, powerup: Powerup, player: "Player"):
+        self.end = powerup.end
+        self.seq = seq
+        self.powerup = powerup
+        self.player = player
+        self.cancelled = False
+
+    def __lt__(self, other: "ActiveEffect"):
+        return (self.end, self.seq) < (other.end, other.seq)
+
+
+class EffectScheduler:
+    """Expires every active powerup from a single sleeper task.
+
+    Effects sit in a heap ordered by end time. The task sleeps until the
+    earliest one is due, expires everything that is due in one batch and is
+    woken early when a sooner effect is scheduled. Cancelled effects are
+    reverted right away and their heap entries skipped when popped.
+    """
+
+    def __init__(self):
+        self.heap: List[ActiveEffect] = []
+        self.effects: Dict[int, ActiveEffect] = {}
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.expired = 0
+
+    def schedule(self, powerup: Powerup, player: "Player") -> ActiveEffect:
+        powerup.activate(player)
+
+        effect = ActiveEffect(next(self.counter), powerup, player)
+        heapq.heappush(self.heap, effect)
+        self.effects[effect.seq] = effect
+
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        elif self.heap[0] is effect:
+            self.wakeup.set()
+        return effect
+
+    def cancel(self, effect: ActiveEffect):
+        if effect.cancelled or self.effects.pop(effect.seq, None) is None:
+            return
+        effect.cancelled = True
+        effect.powerup.expire(effect.player)
+
+    def active(self) -> List[ActiveEffect]:
+        return sorted(self.effects.values())
+
+    def _pop_due(self, now: float) -> List[ActiveEffect]:
+        due = []
+        heap = self.heap
+        while heap and heap[0].end <= now:
+            effect = heapq.heappop(heap)
+            if not effect.cancelled:
+                due.append(effect)
+        return due
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            for effect in self._pop_due(time.time()):
+                del self.effects[effect.seq]
+                try:
+                    effect.powerup.expire(effect.player)
+                except Exception as e:
+                    logging.warning(f"Couldnt expire {effect.powerup.name}: {e}")
+                self.expired += 1
+
+            timeout = self.heap[0].end - time.time() if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
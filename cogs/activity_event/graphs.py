@@ -1,20 +1,16 @@
 from datetime import datetime
-from io import BytesIO
 from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
 import matplotlib.dates as mdates
 from discord import File
 from discord.ext.commands import Context
-from matplotlib import pyplot as plt
-
-from .constants import *
 
 if TYPE_CHECKING:
     from bot import LunaBot
 
 
-__all__ = ("DataPoint", "TeamSeries", "PlotData", "plot_data")
+__all__ = ("DataPoint", "TeamSeries", "PlotData", "plot_data", "MAX_POINTS")
 
 type DataPoint = tuple[datetime, int]
 type TeamSeries = tuple[str, list[DataPoint]]
@@ -28,27 +24,28 @@ params = {
     "axes.edgecolor": "w",
     "figure.dpi": 300,
 }
-plt.rcParams.update(params)
+
+FIGSIZE = (8, 5)
+# one point per horizontal pixel is as much detail as the plot can show
+MAX_POINTS = FIGSIZE[0] * params["figure.dpi"]
 
 
 async def plot_data(ctx: Context, tz: str, data: PlotData) -> File:
     bot: "LunaBot" = ctx.bot
 
-    buf = await bot.loop.run_in_executor(None, _plot_data_sync, data, tz)
+    buf = await bot.plots.render(
+        _plot_data_sync, data, tz, rc=params, figsize=FIGSIZE
+    )
     return File(fp=buf, filename="plot.png")
 
 
-def _plot_data_sync(data: PlotData, tz: str):
+def _plot_data_sync(fig, data: PlotData, tz: str):
     """
-    Plot data synchronously.
-    :param data: A list of tuples of the form (datetime, value).
-    :return: A BytesIO object containing the plot.
+    Draw the team series onto a figure, run in the plot renderer's workers.
+    :param fig: The Agg figure to draw on.
+    :param data: A list of (team name, [(datetime, value)]) tuples.
+    :param tz: The timezone used for the x axis.
     """
-    # Convert the data to a list of datetime objects and a list of values.
-
-    # Create the plot.
-    fig = plt.figure(figsize=(8, 5))
-
     # set background color
     fig.set_facecolor("none")
     ax = fig.add_subplot(1, 1, 1)
@@ -90,13 +87,6 @@ def _plot_data_sync(data: PlotData, tz: str):
     # Rotate the x axis labels.
     fig.autofmt_xdate()
 
-    # Save the plot to a BytesIO object.
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-
-    return buf
-
 
 if __name__ == "__main__":
     test_data = [
@@ -160,8 +150,12 @@ if __name__ == "__main__":
             ],
         )
     ]
-    buf = plot_data_sync(test_data)
+    from io import BytesIO
+
     from PIL import Image
 
+    from cogs.utils.plotting import render_figure
+
+    buf = BytesIO(render_figure(_plot_data_sync, (test_data, "UTC"), params))
     img = Image.open(buf)
     img.show()
@@ -11,18 +11,20 @@ from .constants import *
 from .effects import (
     Powerup,
 )
-from .helpers import get_unique_day_string, is_santas_sleigh
+from .helpers import is_santas_sleigh
 
 if TYPE_CHECKING:
     from bot import LunaBot
 
     from .team import Team
+    from .writer import EventWriter
 
 
 class Player:
     def __init__(
         self,
         bot: "LunaBot",
+        writer: "EventWriter",
         team: "Team",
         member: discord.Member,
         nick: str,
@@ -31,10 +33,13 @@ class Player:
         powerups: List[Powerup],
     ):
         self.bot = bot
+        self.writer = writer
         self.member = member
         self.nick = nick
-        self.points = points
         self.team = team
+        self._points = 0
+        self._msg_count = 0
+        self.points = points
         self.cds = [BASE_CD]
         self.multi = 1
         self.powerups = powerups
@@ -45,6 +50,24 @@ class Player:
 
         self.apply_powerups()
 
+    @property
+    def points(self) -> int:
+        return self._points
+
+    @points.setter
+    def points(self, value: int):
+        self.team.total_points += value - self._points
+        self._points = value
+
+    @property
+    def msg_count(self) -> int:
+        return self._msg_count
+
+    @msg_count.setter
+    def msg_count(self, value: int):
+        self.team.msg_count += value - self._msg_count
+        self._msg_count = value
+
     @property
     def cd(self):
         return min(self.cds)
@@ -54,14 +77,7 @@ class Player:
         return min(self.multi, 10)
 
     async def log_powerup(self, name):
-        query = """INSERT INTO
-                       event_log (team, user_id, type, gain, time)
-                   VALUES
-                       ($1, $2, $3, $4, $5)
-                """
-        await self.bot.db.execute(
-            query, self.team.name, self.member.id, name, 1, int(time.time())
-        )
+        self.writer.log(self.team.name, self.member.id, name, 1)
 
     async def apply_new_powerup(self, powerup: Powerup, *, log=False):
         query = """INSERT INTO
@@ -82,13 +98,11 @@ class Player:
         if log:
             await self.log_powerup(powerup.log_name)
 
-        t = self.bot.loop.create_task(powerup.apply(self))
-        self.bot.powerup_tasks.append(t)
+        self.bot.effects.schedule(powerup, self)
 
     def apply_powerups(self):
-        for powerup in self.powerups:
-            t = self.bot.loop.create_task(powerup.apply(self))
-            self.bot.powerup_tasks.append(t)
+        for powerup in list(self.powerups):
+            self.bot.effects.schedule(powerup, self)
 
     async def on_msg(self):
         self.last_message_time = time.time()
@@ -127,19 +141,7 @@ class Player:
         self.msg_count += 1
         # query = 'update se_stats set msgs = msgs + 1 where user_id = ?'
         # await self.bot.db.execute(query, self.member.id)
-        query = """INSERT INTO
-                       event_log (team, user_id, type, gain, time)
-                   VALUES
-                       ($1, $2, $3, $4, $5)
-                """
-        await self.bot.db.execute(
-            query,
-            self.team.name,
-            self.member.id,
-            "all_msg",
-            1,
-            int(time.time()),
-        )
+        self.writer.log(self.team.name, self.member.id, "all_msg", 1)
 
     async def add_points(self, points, reason, multi=True) -> int:
         if reason == "msg" and is_santas_sleigh():
@@ -153,20 +155,7 @@ class Player:
         self.points += gain
 
         await self.increment_daily_task("points", gain)
-
-        query = """INSERT INTO
-                       event_log (team, user_id, type, gain, time)
-                   VALUES
-                       ($1, $2, $3, $4, $5)
-                """
-        await self.bot.db.execute(
-            query,
-            self.team.name,
-            self.member.id,
-            reason,
-            gain,
-            int(time.time()),
-        )
+        self.writer.log(self.team.name, self.member.id, reason, gain)
 
         return gain
 
@@ -180,14 +169,7 @@ class Player:
 
     async def remove_points(self, points, reason):
         self.points -= points
-        query = """INSERT INTO
-                       event_log (team, user_id, type, gain, time)
-                   VALUES
-                       ($1, $2, $3, $4, $5)
-                """
-        await self.bot.db.execute(
-            query, self.team.name, self.member.id, reason, -points, int(time.time())
-        )
+        self.writer.log(self.team.name, self.member.id, reason, -points)
 
         # query = """UPDATE event_stats
         #            SET
@@ -208,16 +190,4 @@ class Player:
         )
 
     async def increment_daily_task(self, task: str, amount: int = 1):
-        query = """INSERT INTO
-                        event_dailies (user_id, date_str, task, num)
-                    VALUES
-                        ($1, $2, $3, $4)
-                    ON CONFLICT (user_id, date_str, task) DO
-                    UPDATE
-                    SET
-                        num = event_dailies.num + $4 
-
-                """
-        await self.bot.db.execute(
-            query, self.member.id, get_unique_day_string(), task, amount
-        )
+        self.writer.increment_daily(self.member.id, task, amount)
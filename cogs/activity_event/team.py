@@ -37,6 +37,10 @@ class Team:
         self.saved_powerups = saved_powerups
         self.opp: Team | None = None
 
+        # kept up to date by the players, see Player.points/msg_count
+        self.total_points = 0
+        self.msg_count = 0
+
     def create_captain(self):
         self.captain = self.players[0]
 
@@ -98,11 +102,3 @@ class Team:
                     log=log,
                 )
             return None
-
-    @property
-    def total_points(self):
-        return sum([player.points for player in self.players])
-
-    @property
-    def msg_count(self):
-        return sum([player.msg_count for player in self.players])
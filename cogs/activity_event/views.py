@@ -173,6 +173,7 @@ class DailyTasksView(View):
         self.message: Optional[discord.Message] = None
 
     async def update_self(self):
+        await self.player.writer.flush_dailies()
         today = get_unique_day_string()
         unclaimed_ids = []
 
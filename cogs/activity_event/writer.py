@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from cogs.utils import CopyBuffer
+
+from .constants import NON_POINT_TYPES
+from .helpers import get_unique_day_string
+
+if TYPE_CHECKING:
+    from bot import LunaBot
+
+
+__all__ = ("EventLogBuffer", "EventWriter")
+
+
+class EventLogBuffer(CopyBuffer):
+    """Copies ``event_log`` rows and folds them into ``event_player_totals``
+    in the same transaction, so the totals never drift from the log."""
+
+    def __init__(self, bot: "LunaBot", *, interval: float):
+        super().__init__(
+            bot,
+            "event_log",
+            ("team", "user_id", "type", "gain", "time"),
+            max_rows=200,
+            interval=interval,
+        )
+
+    async def write(self, rows: List[Tuple[Any, ...]]):
+        totals: Dict[int, List[int]] = {}
+        for _, user_id, type, gain, _ in rows:
+            total = totals.setdefault(user_id, [0, 0])
+            if type not in NON_POINT_TYPES:
+                total[0] += gain
+            if type == "all_msg":
+                total[1] += gain
+
+        query = """INSERT INTO
+                       event_player_totals (user_id, points, messages)
+                   SELECT
+                       *
+                   FROM
+                       unnest($1::bigint[], $2::int[], $3::int[])
+                   ON CONFLICT (user_id) DO
+                   UPDATE
+                   SET
+                       points = event_player_totals.points + EXCLUDED.points,
+                       messages = event_player_totals.messages + EXCLUDED.messages
+                """
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    self.table, records=rows, columns=self.columns
+                )
+                await conn.execute(
+                    query,
+                    list(totals),
+                    [points for points, _ in totals.values()],
+                    [messages for _, messages in totals.values()],
+                )
+
+
+class EventWriter:
+    """Write-behind log for the event's per-message writes.
+
+    ``event_log`` rows are queued in an ``EventLogBuffer`` and daily task
+    increments are summed per (user, day, task) until the next flush, which
+    writes them with a single upsert. The in-memory ``Player``/``Team``
+    counters are updated right away and stay authoritative in between, so
+    only code that reads the tables back has to ``flush`` first.
+    """
+
+    def __init__(self, bot: "LunaBot", *, interval: float = 5):
+        self.bot = bot
+        self.interval = interval
+        self.log_buffer = EventLogBuffer(bot, interval=interval)
+        self.dailies: Dict[Tuple[int, str, str], int] = {}
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task | None = None
+
+    def start(self):
+        self.log_buffer.start()
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush_dailies()
+            except Exception as e:
+                logging.warning(f"Flushing event_dailies failed: {e}")
+
+    def log(self, team: str, user_id: int, type: str, gain: int):
+        self.log_buffer.add(team, user_id, type, gain, int(time.time()))
+
+    def increment_daily(self, user_id: int, task: str, amount: int = 1):
+        key = (user_id, get_unique_day_string(), task)
+        self.dailies[key] = self.dailies.get(key, 0) + amount
+
+    async def flush_dailies(self) -> int:
+        async with self.lock:
+            if not self.dailies:
+                return 0
+
+            pending, self.dailies = self.dailies, {}
+            query = """INSERT INTO
+                           event_dailies (user_id, date_str, task, num)
+                       SELECT
+                           *
+                       FROM
+                           unnest($1::bigint[], $2::text[], $3::text[], $4::int[])
+                       ON CONFLICT (user_id, date_str, task) DO
+                       UPDATE
+                       SET
+                           num = event_dailies.num + EXCLUDED.num
+                    """
+            keys = list(pending)
+            try:
+                await self.bot.db.execute(
+                    query,
+                    [user_id for user_id, _, _ in keys],
+                    [date_str for _, date_str, _ in keys],
+                    [task for _, _, task in keys],
+                    [pending[key] for key in keys],
+                )
+            except Exception:
+                for key, amount in pending.items():
+                    self.dailies[key] = self.dailies.get(key, 0) + amount
+                raise
+
+            return len(keys)
+
+    async def flush(self):
+        await self.log_buffer.flush()
+        await self.flush_dailies()
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        try:
+            await self.flush_dailies()
+        finally:
+            await self.log_buffer.close()
@@ -6,6 +6,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from .utils import MessageView, message_handler
+
 if TYPE_CHECKING:
     from bot import LunaBot
 
@@ -42,14 +44,8 @@ class AFK(commands.Cog):
                 start_time,
             )
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if not msg.guild:
-            return
-
-        if msg.author.bot:
-            return
-
+    @message_handler()
+    async def handle_message(self, msg: discord.Message, view: MessageView):
         for abcuser in msg.mentions:
             if abcuser.id in self.afk:
                 layout = self.bot.get_layout("afk/ping")
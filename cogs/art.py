@@ -4,7 +4,7 @@ from typing import TYPE_CHECKING
 import discord
 from discord.ext import commands
 
-from cogs.utils import Layout
+from cogs.utils import Layout, MessageView, message_handler
 
 if TYPE_CHECKING:
     from bot import LunaBot
@@ -46,10 +46,11 @@ class Art(commands.Cog):
         )
         return embed
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if msg.author.bot:
-            return
+    @message_handler(
+        guild_only=False,
+        channels=[lambda cog: cog.art_channel_ids, "fanart-channel-id"],
+    )
+    async def handle_message(self, msg: discord.Message, view: MessageView):
         if msg.type is not discord.MessageType.default:
             return
 
@@ -1,4 +1,3 @@
-import asyncio
 from time import time as rn
 
 import discord
@@ -8,7 +7,7 @@ from discord.ext import commands
 
 from bot import LunaBot
 
-from .utils import Layout, LayoutChooserOrEditor, TimeConverter
+from .utils import Layout, LayoutChooserOrEditor, ScheduledCall, TimeConverter
 
 
 class AutoMessage:
@@ -27,7 +26,7 @@ class AutoMessage:
         self.interval = interval
         self.lastsent = lastsent
         self.name = name
-        self.task: asyncio.Task = None
+        self.call: ScheduledCall | None = None
 
     @classmethod
     def from_db_row(cls, bot: LunaBot, row: Record):
@@ -39,20 +38,29 @@ class AutoMessage:
         return cls(bot, name, channel, layout, interval, lastsent)
 
     def start(self):
-        self.task = self.bot.loop.create_task(self.run())
+        sincelast = rn() - self.lastsent
+        self.schedule(rn() + max(self.interval - sincelast, 0))
+
+    def schedule(self, when: float):
+        self.call = self.bot.scheduler.call_at(
+            when, self.run, name=f"automessage {self.name}"
+        )
+
+    def stop(self):
+        if self.call is not None:
+            self.bot.scheduler.cancel(self.call)
+            self.call = None
 
     async def run(self):
-        sincelast = rn() - self.lastsent
-        if sincelast < self.interval:
-            await asyncio.sleep(self.interval - sincelast)
-        while True:
-            await self.layout.send(self.channel)
-            query = "UPDATE auto_messages SET lastsent = $1 WHERE name = $2"
-            await self.bot.db.execute(query, rn(), self.name)
-            await asyncio.sleep(self.interval)
+        # reschedule first so a failed send doesn't end the loop
+        self.schedule(rn() + self.interval)
+        await self.layout.send(self.channel)
+        self.lastsent = rn()
+        query = "UPDATE auto_messages SET lastsent = $1 WHERE name = $2"
+        await self.bot.db.execute(query, self.lastsent, self.name)
 
     async def cancel(self):
-        self.task.cancel()
+        self.stop()
         query = "DELETE FROM auto_messages WHERE name = $1"
         await self.bot.db.execute(query, self.name)
 
@@ -70,7 +78,7 @@ class Automessages(commands.Cog):
 
     async def cog_unload(self):
         for am in self.auto_messages.values():
-            am.task.cancel()
+            am.stop()
 
     async def cog_check(self, ctx):
         return (
@@ -135,7 +143,7 @@ class Automessages(commands.Cog):
 
         if name in self.auto_messages:
             am = self.auto_messages.pop(name)
-            am.task.cancel()
+            am.stop()
 
         query = "DELETE FROM auto_messages WHERE name = $1"
         await self.bot.db.execute(query, name)
@@ -1,15 +1,15 @@
-import re
 from typing import TYPE_CHECKING
 
 import discord
 from discord import Member, app_commands
 from discord.ext import commands
 
-from cogs.utils import LayoutContext, SimplePages
+from cogs.utils import LayoutContext, MessageView, SimplePages, message_handler
 
 from ..utils import AdminCog
 from .auto_responder import AutoResponder
 from .editor import AutoResponderEditor
+from .matcher import TriggerMatcher
 
 if TYPE_CHECKING:
     from bot import LunaBot, LunaCtx
@@ -22,6 +22,7 @@ class AutoResponderCog(
         self.bot: "LunaBot" = bot
         self.auto_responders = []
         self.name_lookup = {}
+        self.matcher = TriggerMatcher([])
 
     async def cog_load(self):
         query = "SELECT * FROM auto_responders"
@@ -30,61 +31,26 @@ class AutoResponderCog(
             auto_responder = AutoResponder.from_db_row(self.bot, row)
             self.auto_responders.append(auto_responder)
             self.name_lookup[auto_responder.name] = auto_responder
+        self.rebuild_matcher()
+
+    def rebuild_matcher(self):
+        self.matcher = TriggerMatcher(self.auto_responders)
+
+    def ar_check(
+        self, msg: discord.Message, view: MessageView
+    ) -> AutoResponder | None:
+        return self.matcher.match(
+            msg.author.id,
+            view.role_ids,
+            msg.channel.id,
+            msg.content,
+            view.lower,
+            view.tokens,
+        )
 
-    async def ar_check(self, msg: discord.Message) -> AutoResponder | None:
-        for ar in self.auto_responders:
-            if ar.wl_users and msg.author.id not in ar.wl_users:
-                continue
-            if ar.bl_users and msg.author.id in ar.bl_users:
-                continue
-
-            roleids = [r.id for r in msg.author.roles]
-            if ar.wl_roles and all(role not in roleids for role in ar.wl_roles):
-                continue
-            if ar.bl_roles and any(role in roleids for role in ar.bl_roles):
-                continue
-            if ar.wl_channels and msg.channel.id not in ar.wl_channels:
-                continue
-            if ar.bl_channels and msg.channel.id in ar.bl_channels:
-                continue
-
-            # if ar.cooldown:
-            #     bucket = ar.cooldown.get_bucket(msg)
-            #     retry_after = bucket.get_retry_after()
-            #     if retry_after:
-            #         continue
-
-            content = msg.content.lower()
-
-            if ar.detection == "starts":
-                if not content.startswith(ar.trigger):
-                    continue
-            elif ar.detection == "contains":
-                if ar.trigger not in content:
-                    continue
-            elif ar.detection == "matches":
-                if ar.trigger != content:
-                    continue
-            elif ar.detection == "contains_word":
-                if ar.trigger not in content.split():
-                    continue
-            elif ar.detection == "regex":
-                match = re.search(ar.trigger, msg.content, re.IGNORECASE)
-                if not match:
-                    continue
-
-            return ar
-
-        return None
-
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if msg.author.bot:
-            return
-        if not msg.guild:
-            return
-
-        ar = await self.ar_check(msg)
+    @message_handler()
+    async def handle_message(self, msg: discord.Message, view: MessageView):
+        ar = self.ar_check(msg, view)
 
         if not ar:
             return
@@ -176,6 +142,7 @@ class AutoResponderCog(
 
         self.auto_responders.append(ar)
         self.name_lookup[name] = ar
+        self.rebuild_matcher()
 
         await editor.final_interaction.response.edit_message(
             content="Successfully made autoresponder!", view=None, embeds=[]
@@ -195,6 +162,7 @@ class AutoResponderCog(
         await self.bot.db.execute(query, name)
         removed = self.name_lookup.pop(name)
         self.auto_responders.remove(removed)
+        self.rebuild_matcher()
 
         await ctx.send("Successfully removed autoresponder!", ephemeral=True)
 
@@ -248,6 +216,7 @@ class AutoResponderCog(
         self.auto_responders.remove(old_ar)
         self.name_lookup[name] = ar
         self.auto_responders.append(ar)
+        self.rebuild_matcher()
 
         await editor.final_interaction.response.edit_message(
             content="Successfully edited autoresponder!", view=None, embeds=[]
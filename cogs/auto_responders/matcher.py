@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import TYPE_CHECKING, Collection, Generic, Iterable, Iterator, TypeVar
+
+if TYPE_CHECKING:
+    from .auto_responder import AutoResponder
+
+T = TypeVar("T")
+
+
+class AhoCorasick(Generic[T]):
+    """Finds every occurrence of a fixed set of patterns in a single pass."""
+
+    def __init__(self, patterns: Iterable[tuple[str, T]]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[tuple[int, T]]] = [[]]
+
+        for pattern, value in patterns:
+            self._insert(pattern, value)
+        self._build()
+
+    def _insert(self, pattern: str, value: T):
+        state = 0
+        for char in pattern:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[state][char] = nxt
+            state = nxt
+        self.out[state].append((len(pattern), value))
+
+    def _build(self):
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> Iterator[tuple[int, int, T]]:
+        """Yields ``(start, length, value)`` for every pattern occurrence."""
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in out[state]:
+                yield i - length + 1, length, value
+
+
+class _Entry:
+    __slots__ = (
+        "ar",
+        "regex",
+        "wl_users",
+        "bl_users",
+        "wl_roles",
+        "bl_roles",
+        "wl_channels",
+        "bl_channels",
+    )
+
+    def __init__(self, ar: AutoResponder):
+        self.ar = ar
+        self.regex: re.Pattern | None = None
+        self.wl_users = frozenset(ar.wl_users)
+        self.bl_users = frozenset(ar.bl_users)
+        self.wl_roles = frozenset(ar.wl_roles)
+        self.bl_roles = frozenset(ar.bl_roles)
+        self.wl_channels = frozenset(ar.wl_channels)
+        self.bl_channels = frozenset(ar.bl_channels)
+
+    def allows(self, author_id: int, role_ids: Collection[int], channel_id: int):
+        if self.wl_users and author_id not in self.wl_users:
+            return False
+        if author_id in self.bl_users:
+            return False
+        if self.wl_roles and self.wl_roles.isdisjoint(role_ids):
+            return False
+        if not self.bl_roles.isdisjoint(role_ids):
+            return False
+        if self.wl_channels and channel_id not in self.wl_channels:
+            return False
+        if channel_id in self.bl_channels:
+            return False
+        return True
+
+
+class TriggerMatcher:
+    """Compiled form of a list of autoresponders.
+
+    ``contains`` and ``starts`` triggers live in one Aho-Corasick automaton,
+    ``matches`` and ``contains_word`` triggers are dict lookups and regexes
+    are compiled once. ``match`` returns the same responder as checking every
+    responder in list order would.
+    """
+
+    def __init__(self, responders: list[AutoResponder]):
+        self.entries = [_Entry(ar) for ar in responders]
+        self.always: list[int] = []
+        self.exact: dict[str, list[int]] = {}
+        self.words: dict[str, list[int]] = {}
+        self.regexes: list[int] = []
+
+        substrings: list[tuple[str, tuple[int, bool]]] = []
+
+        for i, entry in enumerate(self.entries):
+            ar = entry.ar
+            if ar.detection in ("contains", "starts"):
+                if not ar.trigger:
+                    self.always.append(i)
+                else:
+                    substrings.append((ar.trigger, (i, ar.detection == "starts")))
+            elif ar.detection == "matches":
+                self.exact.setdefault(ar.trigger, []).append(i)
+            elif ar.detection == "contains_word":
+                self.words.setdefault(ar.trigger, []).append(i)
+            elif ar.detection == "regex":
+                try:
+                    entry.regex = re.compile(ar.trigger, re.IGNORECASE)
+                except re.error as e:
+                    logging.warning(f"Skipping autoresponder {ar.name}: {e}")
+                    continue
+                self.regexes.append(i)
+            else:
+                self.always.append(i)
+
+        self.automaton: AhoCorasick[tuple[int, bool]] = AhoCorasick(substrings)
+
+    def candidates(self, lower: str, tokens: Iterable[str]) -> set[int]:
+        found = set(self.always)
+        found.update(self.regexes)
+        found.update(self.exact.get(lower, ()))
+
+        words = self.words
+        if words:
+            for token in tokens:
+                hit = words.get(token)
+                if hit is not None:
+                    found.update(hit)
+
+        for start, _, (i, starts_only) in self.automaton.search(lower):
+            if starts_only and start != 0:
+                continue
+            found.add(i)
+
+        return found
+
+    def match(
+        self,
+        author_id: int,
+        role_ids: Collection[int],
+        channel_id: int,
+        content: str,
+        lower: str | None = None,
+        tokens: Iterable[str] | None = None,
+    ) -> AutoResponder | None:
+        if lower is None:
+            lower = content.lower()
+        if tokens is None:
+            tokens = lower.split()
+
+        for i in sorted(self.candidates(lower, tokens)):
+            entry = self.entries[i]
+            if not entry.allows(author_id, role_ids, channel_id):
+                continue
+            if entry.regex is not None and not entry.regex.search(content):
+                continue
+            return entry.ar
+
+        return None
+
@@ -6,6 +6,7 @@ import discord
 from dateparser import parse
 from discord.ext import commands
 
+from .utils import MessageView, message_handler
 from .utils.checks import staff_only
 
 if TYPE_CHECKING:
@@ -84,11 +85,8 @@ class BumpRemind(commands.Cog):
 
         self.task = self.bot.loop.create_task(self.task_coro(end_time))
 
-    @commands.Cog.listener()
-    async def on_message(self, msg):
-        if not msg.guild:
-            return
-
+    @message_handler(bots=True)
+    async def handle_message(self, msg: discord.Message, view: MessageView):
         if msg.guild.id != self.bot.vars.get("main-server-id"):
             return
 
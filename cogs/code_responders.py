@@ -1,12 +1,17 @@
+import ast
 import asyncio
+import builtins
 import json
 import re
+import time
 import traceback
+from dataclasses import dataclass
+from types import CodeType
 
 import discord
 from discord.ext import commands
 
-from .utils import Cooldown, Layout
+from .utils import Cooldown, Layout, MessageView, message_handler
 
 
 def format_err(err):
@@ -22,6 +27,178 @@ async def __ex():
     """
 
 
+# how long a responder may run, and how many may run at once
+RUN_TIMEOUT = 3
+MAX_CONCURRENT_RUNS = 4
+
+# size limits for work that happens inside a single C call, which the
+# deadline checks can't interrupt
+MAX_RANGE = 1_000_000
+MAX_SEQUENCE = 1_000_000
+MAX_INT_BITS = 100_000
+
+
+class CodeResponderTimeout(BaseException):
+    """Raised inside responder code once its deadline passes. It isn't an
+    ``Exception`` so a bare ``except Exception`` in the code can't swallow it."""
+
+
+def int_bits(value) -> int:
+    return abs(value).bit_length() if isinstance(value, int) else 0
+
+
+def check_size(size: int, limit: int, what: str):
+    if size > limit:
+        raise CodeResponderError(f"{what} too large (limit {limit:,})")
+
+
+def capped_range(*args):
+    r = range(*args)
+    try:
+        size = len(r)
+    except OverflowError:
+        size = MAX_RANGE + 1
+    check_size(size, MAX_RANGE, "range")
+    return r
+
+
+def capped_pow(base, exp, mod=None):
+    # modular pow stays small no matter the exponent
+    if mod is None and isinstance(exp, int) and exp > 0:
+        check_size(int_bits(base) * exp, MAX_INT_BITS, "result")
+    return pow(base, exp, mod)
+
+
+def capped_bytes(cls):
+    def make(source=0, *args):
+        if isinstance(source, int):
+            check_size(source, MAX_SEQUENCE, "size")
+        return cls(source, *args)
+
+    return make
+
+
+def capped_iter(obj, *sentinel):
+    if not sentinel:
+        return iter(obj)
+
+    # the callable form loops in C until the sentinel shows up, so it gets
+    # a limit like range
+    def gen():
+        for _ in capped_range(MAX_RANGE):
+            value = obj()
+            if value == sentinel[0]:
+                return
+            yield value
+        raise CodeResponderError(f"iter too long (limit {MAX_RANGE:,})")
+
+    return gen()
+
+
+def checked_binop(op: str, left, right):
+    if op == "pow":
+        return capped_pow(left, right)
+
+    if op == "lshift":
+        if isinstance(left, int) and isinstance(right, int) and left:
+            check_size(int_bits(left) + right, MAX_INT_BITS, "result")
+        return left << right
+
+    # sequence repetition and big int products
+    if isinstance(left, int) and isinstance(right, int):
+        check_size(int_bits(left) + int_bits(right), MAX_INT_BITS, "result")
+    elif isinstance(right, int) and hasattr(left, "__len__"):
+        check_size(len(left) * right, MAX_SEQUENCE, "sequence")
+    elif isinstance(left, int) and hasattr(right, "__len__"):
+        check_size(len(right) * left, MAX_SEQUENCE, "sequence")
+    return left * right
+
+
+SAFE_BUILTINS = {k: v for k, v in vars(builtins).items() if k != "__import__"}
+SAFE_BUILTINS.update(
+    range=capped_range,
+    pow=capped_pow,
+    bytes=capped_bytes(bytes),
+    bytearray=capped_bytes(bytearray),
+    iter=capped_iter,
+)
+
+GUARDED_OPS = {ast.Pow: "pow", ast.LShift: "lshift", ast.Mult: "mult"}
+
+
+class CodeGuard(ast.NodeTransformer):
+    """Makes every loop in responder code check the run's deadline, and
+    routes ``**``, ``<<`` and ``*`` through size checks.
+
+    ``asyncio.wait_for`` can only stop code at an ``await``, so a busy loop
+    would otherwise block the event loop indefinitely. Responders run on the
+    event loop, so none of this is a hard timeout: a single C call can't be
+    interrupted, which is what the size limits are for.
+    """
+
+    def visit_While(self, node):
+        self.generic_visit(node)
+        tick = ast.Call(ast.Name("_cr_tick", ast.Load()), [], [])
+        node.body.insert(0, ast.Expr(tick))
+        return node
+
+    def guard_iter(self, node):
+        self.generic_visit(node)
+        if not getattr(node, "is_async", False):
+            node.iter = ast.Call(ast.Name("_cr_guard", ast.Load()), [node.iter], [])
+        return node
+
+    visit_For = guard_iter
+    visit_comprehension = guard_iter
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        op = GUARDED_OPS.get(type(node.op))
+        if op is None:
+            return node
+        return ast.copy_location(
+            ast.Call(
+                ast.Name("_cr_binop", ast.Load()),
+                [ast.Constant(op), node.left, node.right],
+                [],
+            ),
+            node,
+        )
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        op = GUARDED_OPS.get(type(node.op))
+        if op is None or not isinstance(node.target, ast.Name):
+            return node
+        # x *= y becomes x = _cr_binop("mult", x, y), the in-place form is
+        # only kept for targets that aren't plain names
+        value = ast.Call(
+            ast.Name("_cr_binop", ast.Load()),
+            [ast.Constant(op), ast.Name(node.target.id, ast.Load()), node.value],
+            [],
+        )
+        return ast.copy_location(ast.Assign([node.target], value), node)
+
+
+def compile_code(code: str) -> CodeType:
+    tree = ast.parse(wrap_code(code), "<inline>", "exec")
+    tree = ast.fix_missing_locations(CodeGuard().visit(tree))
+    return compile(tree, "<inline>", "exec")
+
+
+def make_guards(deadline: float):
+    def tick():
+        if time.monotonic() > deadline:
+            raise CodeResponderTimeout()
+
+    def guard(iterable):
+        for item in iterable:
+            tick()
+            yield item
+
+    return tick, guard
+
+
 class AddCrFlags(commands.FlagConverter):
     trigger: str
     detection: str
@@ -30,6 +207,31 @@ class AddCrFlags(commands.FlagConverter):
     cd: int = None
 
 
+@dataclass
+class CodeResponderStats:
+    runs: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def average(self) -> float:
+        if self.runs == 0:
+            return 0.0
+        return self.total / self.runs
+
+    def record(self, status: str, elapsed: float):
+        self.runs += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if status == "timeout":
+            self.timeouts += 1
+        elif status != "ok":
+            self.errors += 1
+
+
 class CodeResponderItem:
     def __init__(
         self, name, trigger, detection, code, ignore_errors=False, cooldown=None
@@ -39,12 +241,28 @@ class CodeResponderItem:
         self.code = code
         self.detection = detection
         self.ignore_errors = ignore_errors
+        self.stats = CodeResponderStats()
 
         if cooldown:
             self.cooldown = commands.CooldownMapping.from_cooldown(
                 cooldown.rate, cooldown.per, cooldown.type
             )
 
+    @property
+    def code(self) -> str:
+        return self._code
+
+    @code.setter
+    def code(self, code: str):
+        self._code = code
+        self._compiled: CodeType | None = None
+
+    @property
+    def compiled(self) -> CodeType:
+        if self._compiled is None:
+            self._compiled = compile_code(self._code)
+        return self._compiled
+
     @classmethod
     def from_db_row(cls, row):
         if row["cooldown"]:
@@ -107,12 +325,18 @@ class CodeResponderAPI:
         self.bot = bot
         self.ctx = ctx
         self.message = ctx.message
+        self.parts: dict[str, list[str]] = {}
+
+    def split(self, separator: str) -> list[str]:
+        if separator not in self.parts:
+            self.parts[separator] = split_text(self.message.content, separator)
+        return self.parts[separator]
 
     async def getVar(self, name):
         return self.bot.vars.get(name)
 
     async def numberOfParts(self, separator=" "):
-        return len(split_text(self.message.content, separator))
+        return len(self.split(separator))
 
     async def getParts(self, spec, separator=" "):
         if spec.endswith("+"):
@@ -130,7 +354,7 @@ class CodeResponderAPI:
         if not ok:
             raise CodeResponderError(f"invalid spec {spec}, must be 0 or more")
 
-        parts = split_text(self.message.content, separator)
+        parts = self.split(separator)
         if i >= len(parts):
             raise CodeResponderError(f"not enough parts in message to get part {i}")
 
@@ -287,6 +511,7 @@ class CodeResponders(commands.Cog):
         self.lookup: dict[str, CodeResponderItem] = {}
         self.code_responders: list[CodeResponderItem] = []
         self.process_n = 0
+        self.slots = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
 
     async def cog_check(self, ctx):
         return (
@@ -302,13 +527,19 @@ class CodeResponders(commands.Cog):
             self.code_responders.append(cr)
             self.lookup[cr.name] = cr
 
-    async def run_code(self, ctx, code: str) -> dict:
+    async def run_code(self, ctx, code: CodeType) -> dict:
+        if self.slots.locked():
+            return {"status": "busy"}
+
         api = CodeResponderAPI(self.bot, ctx)
+        deadline = time.monotonic() + RUN_TIMEOUT
+        tick, guard = make_guards(deadline)
 
         g = {}
-        builtins = __builtins__.copy()
-        del builtins["__import__"]
-        g["__builtins__"] = builtins
+        g["__builtins__"] = SAFE_BUILTINS.copy()
+        g["_cr_tick"] = tick
+        g["_cr_guard"] = guard
+        g["_cr_binop"] = checked_binop
         g["LB"] = api
         g["BOT"] = self.bot
         g["MSG"] = ctx.message
@@ -318,30 +549,27 @@ class CodeResponders(commands.Cog):
         resp = {}
 
         try:
-
-            def executor():
-                byte_code = compile(wrap_code(code), "<inline>", "exec")
-                exec(byte_code, g, loc)
-
-            await self.bot.loop.run_in_executor(None, executor)
+            exec(code, g, loc)
         except Exception as err:
             resp["status"] = "syntax_error"
             resp["error"] = err
             raise CodeResponderError("syntax error")
 
         coro = loc["__ex"]
-        try:
-            await asyncio.wait_for(coro(), timeout=3)
-        except asyncio.TimeoutError:
-            resp["status"] = "timeout"
-            return resp
-        except Exception as err:
-            # runtime error
-            resp["status"] = "runtime_error"
-            resp["error"] = err
-            return resp
+        async with self.slots:
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(coro(), timeout=RUN_TIMEOUT)
+            except (asyncio.TimeoutError, CodeResponderTimeout):
+                resp["status"] = "timeout"
+            except Exception as err:
+                # runtime error
+                resp["status"] = "runtime_error"
+                resp["error"] = err
+            else:
+                resp["status"] = "ok"
+            resp["elapsed"] = time.perf_counter() - start
 
-        resp["status"] = "ok"
         return resp
 
     @commands.group(aliases=["coderesponder"], invoke_without_command=True)
@@ -408,7 +636,7 @@ class CodeResponders(commands.Cog):
             code = message.content.strip("`").removeprefix("py")
 
             try:
-                compile(wrap_code(code), "<inline>", "exec")
+                compiled = compile_code(code)
             except Exception as err:
                 err_str = "".join(
                     traceback.format_exception(type(err), err, err.__traceback__)[3:]
@@ -429,9 +657,9 @@ class CodeResponders(commands.Cog):
             if message.content.lower() == "skip":
                 break
 
-            resp = await self.run_code(await self.bot.get_context(message), code)
-            if resp["status"] == "err":
-                err_str = resp["err_str"]
+            resp = await self.run_code(await self.bot.get_context(message), compiled)
+            if resp["status"] == "runtime_error":
+                err_str = format_err(resp["error"])
                 await message.channel.send(
                     f"(As expected) Your code encountered an error:\n```py\n{err_str}```\nTake your time debugging and re-send whenever you're ready."
                 )
@@ -491,6 +719,29 @@ class CodeResponders(commands.Cog):
         out = f"```py\n{cr.code}```"
         await ctx.send(out)
 
+    @cr.command()
+    async def stats(self, ctx, reset: bool = False):
+        """Shows how long each coderesponder takes to run."""
+        if reset:
+            for item in self.code_responders:
+                item.stats = CodeResponderStats()
+            return await ctx.send("Reset coderesponder stats.")
+
+        items = sorted(
+            self.code_responders, key=lambda i: i.stats.total, reverse=True
+        )
+        lines = [
+            f"{'name':<24}{'runs':>7}{'avg ms':>9}{'max ms':>9}"
+            f"{'errs':>6}{'t/o':>5}{'busy':>6}"
+        ]
+        for item in items:
+            s = item.stats
+            lines.append(
+                f"{item.name[:23]:<24}{s.runs:>7}{s.average * 1000:>9.2f}"
+                f"{s.max * 1000:>9.1f}{s.errors:>6}{s.timeouts:>5}{s.rejected:>6}"
+            )
+        await ctx.send("```\n" + "\n".join(lines) + "```")
+
     @cr.command(aliases=["delete"])
     async def remove(self, ctx, *, name):
         name = name.lower()
@@ -510,13 +761,10 @@ class CodeResponders(commands.Cog):
 
         await ctx.send(f"Coderesponder `{name}` has been deleted.")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-
+    @message_handler(guild_only=False)
+    async def handle_message(self, message: discord.Message, view: MessageView):
         respond = False
-        lower = message.content.lower()
+        lower = view.lower
 
         for item in self.code_responders:
             if item.detection == "matches":
@@ -524,7 +772,7 @@ class CodeResponders(commands.Cog):
                     respond = True
                     break
             elif item.detection == "contains_word":
-                if item.name in lower.split():
+                if item.name in view.token_set:
                     respond = True
                     break
             elif item.detection == "contains":
@@ -545,7 +793,17 @@ class CodeResponders(commands.Cog):
                     break
 
         if respond:
-            resp = await self.run_code(await self.bot.get_context(message), item.code)
+            try:
+                code = item.compiled
+            except SyntaxError:
+                raise CodeResponderError(f"coderesponder {item.name} doesn't compile")
+
+            resp = await self.run_code(await self.bot.get_context(message), code)
+            if resp["status"] == "busy":
+                item.stats.rejected += 1
+                return
+
+            item.stats.record(resp["status"], resp["elapsed"])
             if resp["status"] == "ok":
                 return
 
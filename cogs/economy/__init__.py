@@ -8,12 +8,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from ..utils import LayoutContext
+from ..utils import LayoutContext, MessageView, message_handler
 from ..utils.checks import staff_only
 from . import items  # for automatically finding Item classes
 from .inv import InvMainPages, InvMainPageSource
 from .items import ItemCategory, ItemReq
-from .search import search_item
+from .search import ItemIndex
 from .shop import ShopMainView
 from .su import EconomySu
 
@@ -40,6 +40,7 @@ class Economy(commands.Cog):
         self.candy_drop_msg_count = 0
         self.candy_drop_message: discord.Message | None = None
         self.items = []
+        self.item_index = ItemIndex([])
         self.categories = {}
         self.skibidi = False
         self.last_edit = time.time()
@@ -98,6 +99,9 @@ class Economy(commands.Cog):
         # sys.stderr = open('error.log', 'w')
 
         await self.create_tables()
+        await self.load_items()
+
+    async def load_items(self):
         query = "SELECT * FROM item_categories"
         rows = await self.bot.db.fetch(query)
         self.categories = {
@@ -109,6 +113,7 @@ class Economy(commands.Cog):
 
         query = "SELECT * FROM shop_items ORDER BY number_id ASC"
         rows = await self.bot.db.fetch(query)
+        loaded = []
 
         classes = [
             item_cls
@@ -150,13 +155,13 @@ class Economy(commands.Cog):
                 reqs,
             )
 
-            self.items.append(item)
+            loaded.append(item)
+
+        self.items = loaded
+        self.item_index = ItemIndex(loaded)
 
     def get_item_from_str(self, item_str: str) -> "BaseItem":
-        for item in self.items:
-            if item_str in item.as_list():
-                return item
-        return None
+        return self.item_index.get(item_str)
 
     async def get_stock(self, item_name_id: str):
         item = self.get_item_from_str(item_name_id)
@@ -320,7 +325,7 @@ class Economy(commands.Cog):
     ) -> Optional["BaseItem"]:
         shop_item = self.get_item_from_str(item)
         if shop_item is None:
-            items = search_item(self.items, item)
+            items = self.item_index.search(item)
 
             if items:
                 display_names = [it.display_name for it in items]
@@ -591,17 +596,8 @@ class Economy(commands.Cog):
 
             self.bot.loop.create_task(task())
 
-    @commands.Cog.listener()
-    async def on_message(self, msg):
-        if msg.author.bot:
-            return
-
-        if msg.channel.id != self.bot.vars.get("general-channel-id"):
-            return
-
-        if not self.is_verified(msg.author):
-            return
-
+    @message_handler(channels=["general-channel-id"], verified=True)
+    async def handle_message(self, msg: discord.Message, view: MessageView):
         # await self.handle_candydrop(msg)  # halloween
 
         if not self.drop_message:
@@ -626,7 +622,7 @@ class Economy(commands.Cog):
 
             self.bot.loop.create_task(task())
 
-        if "welc" in msg.content.lower():
+        if "welc" in view.lower:
             et = await self.bot.get_cooldown_end("welc", 60, obj=msg.author)
             if et:
                 # await (self.bot.get_layout('welccd')).send(msg.channel, LayoutContext(message=msg), delete_after=7)
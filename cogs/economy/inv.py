@@ -3,7 +3,6 @@ from discord import ui
 import discord
 
 from .items import BaseItem
-from .search import search_item
 
 from cogs.utils import View
 from cogs.utils.paginators import SkipToModal
@@ -27,7 +26,9 @@ class InvSearchModal(ui.Modal):
     async def on_submit(self, interaction: discord.Interaction):
         query = self.query.value
         entries = self.parent_view.source.entries
-        results = search_item([e["item"] for e in entries], query)
+        results = self.parent_view.ctx.cog.item_index.search(
+            query, items=[e["item"] for e in entries]
+        )
 
         if results:
             # await interaction.response.send_message(f"Found {len(results)} item(s) matching '{query}':", ephemeral=True)
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
 from rapidfuzz import process
 
@@ -6,24 +6,84 @@ if TYPE_CHECKING:
     from . import BaseItem
 
 
-def search_item(
-    items: List["BaseItem"], query: str, threshold: int = 70
-) -> List["BaseItem"]:
-    # Iterate over each item and compare the query to both the display_name and qualified_name
+def build_names(
+    items: Sequence["BaseItem"],
+) -> Tuple[List[str], Dict[str, "BaseItem"]]:
+    # every name of every item, a name shared by several items maps to the last one
     item_map = {}
     names = []
     for item in items:
         for name in item.as_list():
             names.append(name)
             item_map[name] = item
+    return names, item_map
 
-    results = process.extract(query.lower(), names, limit=len(items))
+
+def extract_items(
+    names: List[str],
+    item_map: Dict[str, "BaseItem"],
+    query: str,
+    limit: int,
+    threshold: int,
+) -> List["BaseItem"]:
+    # names below the threshold are dropped by the extractor itself; the
+    # matches are still sorted by score, so the top `limit` are unchanged
+    results = process.extract(
+        query.lower(), names, limit=limit, score_cutoff=threshold
+    )
 
     output = []
-    for name, sim, _ in results:
-        if item_map[name] in output or sim < threshold:
+    seen = set()
+    for name, _, _ in results:
+        item = item_map[name]
+        if id(item) in seen:
             continue
-        output.append(item_map[name])
+        seen.add(id(item))
+        output.append(item)
 
     # Return only the items, not the similarity scores
     return output
+
+
+def search_item(
+    items: List["BaseItem"], query: str, threshold: int = 70
+) -> List["BaseItem"]:
+    # Compare the query to the number_id, name_id and display_name of each item
+    names, item_map = build_names(items)
+    return extract_items(names, item_map, query, len(items), threshold)
+
+
+class ItemIndex:
+    """The search names of every shop item, built once when the items are
+    loaded. Searching a different list of items (e.g. an inventory) falls
+    back to ``search_item``."""
+
+    def __init__(self, items: Sequence["BaseItem"]):
+        self.items = list(items)
+        self.names, self.item_map = build_names(self.items)
+
+        # exact lookups return the first item with the name, like scanning does
+        self.exact: Dict[str, "BaseItem"] = {}
+        for item in self.items:
+            for name in item.as_list():
+                self.exact.setdefault(name, item)
+
+    def get(self, name: str) -> Optional["BaseItem"]:
+        return self.exact.get(name)
+
+    def is_all(self, items: Sequence["BaseItem"]) -> bool:
+        return len(items) == len(self.items) and all(
+            a is b for a, b in zip(items, self.items)
+        )
+
+    def search(
+        self,
+        query: str,
+        threshold: int = 70,
+        items: Optional[Sequence["BaseItem"]] = None,
+    ) -> List["BaseItem"]:
+        if items is not None and not self.is_all(items):
+            return search_item(list(items), query, threshold)
+        return extract_items(
+            self.names, self.item_map, query, len(self.items), threshold
+        )
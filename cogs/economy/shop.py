@@ -8,7 +8,6 @@ from cogs.utils import View
 from cogs.utils.paginators import SkipToModal
 
 from .items import BaseItem
-from .search import search_item
 
 if TYPE_CHECKING:
     from bot import LunaBot
@@ -26,7 +25,7 @@ class ShopSearchModal(ui.Modal):
     async def on_submit(self, interaction: discord.Interaction):
         query = self.query.value
         entries = self.parent_view.source.entries
-        results = search_item(entries, query)
+        results = self.parent_view.ctx.cog.item_index.search(query, items=entries)
 
         if results:
             results_source = ShopResultsPageSource(
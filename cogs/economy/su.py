@@ -114,7 +114,11 @@ class EconomySu(commands.Cog):
                 json.dumps(req["kwargs"]),
             )
 
-        await ctx.send("Item added. Please reload the cog to see changes.")
+        economy = self.bot.get_cog("Economy")
+        if economy is not None:
+            # also rebuilds the item search index
+            await economy.load_items()
+        await ctx.send("Item added.")
 
     @additem.error
     async def additem_error(self, ctx, error):
@@ -4,7 +4,14 @@ from typing import TYPE_CHECKING
 from discord.ext import commands
 from discord.utils import format_dt, utcnow
 
-from .utils.errors import GeneralOnly, GuildOnly, SilentCheckFailure, ActivityEventBreak
+from .utils.errors import (
+    ActivityEventBreak,
+    GeneralOnly,
+    GuildOnly,
+    PlotRendererBusy,
+    PlotTimeout,
+    SilentCheckFailure,
+)
 
 if TYPE_CHECKING:
     from bot import LunaBot
@@ -37,6 +44,12 @@ class EH(commands.Cog):
                 "The activity event is on break! Please wait until it resumes until you can use this."
             )
             return
+        if isinstance(error, PlotRendererBusy):
+            await ctx.send("Too many graphs are being drawn right now, try again soon!")
+            return
+        if isinstance(error, PlotTimeout):
+            await ctx.send("Drawing that graph took too long, try a smaller range!")
+            return
         if (
             isinstance(error, commands.CheckFailure)
             or isinstance(error, commands.MissingPermissions)
@@ -6,6 +6,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from cogs.utils import SimplePages, ConfirmView
+from cogs.layouts.layout import invalidate_embed_plan
 from ..utils.errors import InvalidURL
 
 from .editor import EmbedEditor
@@ -28,6 +29,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
             self.bot.embeds[row["name"]] = discord.Embed.from_dict(
                 json.loads(row["embed"])
             )
+        invalidate_embed_plan()
 
     @commands.hybrid_group()
     @app_commands.default_permissions()
@@ -67,6 +69,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
                 """
         await self.bot.db.execute(query, ctx.author.id, name, data)
         self.bot.embeds[name] = discord.Embed.from_dict(json.loads(data))
+        invalidate_embed_plan(name)
         await ctx.send(f"Added your embed {name}!")
 
     @embed.command()
@@ -94,6 +97,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
                 """
         await self.bot.db.execute(query, ctx.author.id, name, data)
         self.bot.embeds[name] = embed
+        invalidate_embed_plan(name)
         await ctx.send(f"Added your embed {name}!")
 
     @embed.command()
@@ -151,6 +155,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
                     """
             await self.bot.db.execute(query, ctx.author.id, name, data)
             self.bot.embeds[name] = embed
+            invalidate_embed_plan(name)
             await v.final_interaction.response.send_message(f"Added your embed {name}!")
         else:
             await v.final_interaction.response.send_message("Cancelled.")
@@ -178,6 +183,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
                 """
         await self.bot.db.execute(query, ctx.author.id, new_name, data)
         self.bot.embeds[new_name] = discord.Embed.from_dict(json.loads(data))
+        invalidate_embed_plan(new_name)
 
         await ctx.send(f"Duplicated the embed `{old_name}` to `{new_name}`!")
 
@@ -200,6 +206,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
                 """
         await self.bot.db.execute(query, ctx.author.id, name, data)
         self.bot.embeds[name] = discord.Embed.from_dict(json.loads(data))
+        invalidate_embed_plan(name)
         await view.final_interaction.response.edit_message(
             content=f"Added your embed `{name}`!", view=None
         )
@@ -222,6 +229,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
         query = "UPDATE embeds SET embed = $1 WHERE name = $2"
         await self.bot.db.execute(query, data, name)
         self.bot.embeds[name] = discord.Embed.from_dict(json.loads(data))
+        invalidate_embed_plan(name)
         await view.final_interaction.response.edit_message(
             content=f"Edited the embed `{name}`!", view=None
         )
@@ -236,6 +244,7 @@ class Embeds(commands.Cog, description="Create, save, and edit your own embeds."
         query = "DELETE FROM embeds WHERE name = $1"
         await self.bot.db.execute(query, name)
         del self.bot.embeds[name]
+        invalidate_embed_plan(name)
         await ctx.send(f"Deleted the embed `{name}`!")
 
     @embed.command(aliases=["view"])
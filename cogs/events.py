@@ -1,9 +1,10 @@
 import json
 from typing import TYPE_CHECKING
 
+import discord
 from discord.ext import commands
 
-from .utils import LayoutContext
+from .utils import LayoutContext, MessageView, message_handler
 
 if TYPE_CHECKING:
     from bot import LunaBot
@@ -24,8 +25,12 @@ class Events(
             or ctx.author.id == self.bot.owner_id
         )
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    @message_handler(
+        guild_only=False,
+        bots=True,
+        channels=["free-offers-channel-id", "void-channel-id"],
+    )
+    async def handle_message(self, message: discord.Message, view: MessageView):
         if message.channel.id == self.bot.vars.get("free-offers-channel-id"):
             await message.add_reaction("<a:LCM_mail:1151561338317983966>")
         if message.channel.id == self.bot.vars.get("void-channel-id"):
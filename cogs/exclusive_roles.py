@@ -19,9 +19,6 @@ class ExclusiveRoles(commands.Cog):
         self.groups = defaultdict(lambda: defaultdict(set))
         self.group_lookup = defaultdict(dict)
 
-        self.clean_progress = 0
-        self.total_members = 0
-
     async def cog_load(self):
         query = "SELECT * FROM exclusive_roles"
         for row in await self.bot.db.fetch(query):
@@ -32,6 +29,11 @@ class ExclusiveRoles(commands.Cog):
             self.groups[guild_id][group_name].add(role_id)
             self.group_lookup[guild_id][role_id] = group_name
 
+        self.bot.jobs.register("exclusive_roles_clean", self.clean_job)
+
+    async def cog_unload(self):
+        self.bot.jobs.unregister("exclusive_roles_clean")
+
     async def cog_check(self, ctx):
         return ctx.author.guild_permissions.administrator
 
@@ -64,6 +66,21 @@ class ExclusiveRoles(commands.Cog):
         else:
             return []
 
+    def has_violation(self, member: discord.Member) -> bool:
+        lookup = self.group_lookup[member.guild.id]
+        seen = set()
+        for role in member.roles:
+            group_name = lookup.get(role.id)
+            if group_name is None:
+                continue
+            if group_name in seen:
+                return True
+            seen.add(group_name)
+        return False
+
+    async def clean_job(self, member: discord.Member, args) -> bool:
+        return len(await self.clean_member(member, member.roles)) > 0
+
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         added_roles = set(after.roles) - set(before.roles)
@@ -223,30 +240,28 @@ class ExclusiveRoles(commands.Cog):
 
     @er.command(name="cleanserver")
     async def er_scanserver(self, ctx):
-        num_roles = 0
-        num_members = 0
-        self.total_members = len(ctx.guild.members)
+        if self.bot.jobs.find("exclusive_roles_clean", ctx.guild.id) is not None:
+            return await ctx.send("already cleaning, do `!er csp` to see progress")
 
-        await ctx.send("Cleaning... do `!er csp` to see progress")
+        # only members breaking a group need an api call
+        members = [m for m in ctx.guild.members if self.has_violation(m)]
+        if not members:
+            return await ctx.send("Removed 0 roles from 0 members")
 
-        for member in ctx.guild.members:
-            num_cleaned = len(await self.clean_member(member, member.roles))
-            if num_cleaned > 0:
-                num_roles += num_cleaned
-                num_members += 1
-            self.clean_progress += 1
-
-        self.clean_progress = 0
-        await ctx.send(f"Removed {num_roles} roles from {num_members} members")
+        await self.bot.jobs.start(
+            "exclusive_roles_clean", ctx.guild, members, channel=ctx.channel
+        )
+        await ctx.send(
+            f"Cleaning {len(members)} members... do `!er csp` to see progress"
+        )
 
     @er.command(name="cleanserverprogress", aliases=["csp"])
     async def er_csp(self, ctx):
-        if self.clean_progress == 0:
+        job = self.bot.jobs.find("exclusive_roles_clean", ctx.guild.id)
+        if job is None:
             return await ctx.send("no cleaning happening right now")
 
-        total = self.total_members
-        p = self.clean_progress / total * 100
-        await ctx.send(f"{self.clean_progress}/{total} ({p:.0f}%)")
+        await ctx.send(job.progress())
 
 
 async def setup(bot):
@@ -1,14 +1,20 @@
 import asyncio
 import json
-from datetime import datetime
-from typing import TYPE_CHECKING
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 if TYPE_CHECKING:
     from bot import LunaBot
 
+    from .utils import ScheduledCall
+
+
+# tasks due further out than this stay in the database until a refresh
+LOOKAHEAD = timedelta(hours=1)
+
 
 class FutureTask:
     def __init__(self, bot, task_id, action, dt, **kwargs):
@@ -17,7 +23,8 @@ class FutureTask:
         self.action: str = action
         self.kwargs = kwargs
         self.dt: datetime = dt
-        self.task = None
+        self.call: "ScheduledCall | None" = None
+        self.on_done: Callable[[int], None] | None = None
 
     @classmethod
     def from_db_row(cls, bot, row):
@@ -43,19 +50,7 @@ class FutureTask:
         if member and role in member.roles:
             await member.kick(reason="suspicious account")
 
-    async def task_coro(self):
-        if self.action == "remove_role":
-            query = """INSERT INTO
-                           sticky_roles (user_id, role_id, until)
-                       VALUES
-                           ($1, $2, $3)
-                    """
-            await self.bot.db.execute(
-                query, self.kwargs.get("user_id"), self.kwargs.get("role_id"), self.dt
-            )
-
-        await asyncio.sleep((self.dt - discord.utils.utcnow()).total_seconds())
-
+    async def run(self):
         if self.action == "remove_role":
             await self.remove_role()
         elif self.action == "lock_thread":
@@ -63,40 +58,120 @@ class FutureTask:
         elif self.action == "kick_sus_member":
             await self.kick_sus_member()
 
-        query = "DELETE FROM future_tasks WHERE id = $1"
-        await self.bot.db.execute(query, self.id)
+        if self.on_done is not None:
+            self.on_done(self.id)
 
-    def start(self):
-        self.task = self.bot.loop.create_task(self.task_coro())
+    def start(self, on_done: Callable[[int], None] | None = None):
+        self.on_done = on_done
+        self.call = self.bot.scheduler.call_at(
+            self.dt, self.run, name=f"future task {self.id} ({self.action})"
+        )
 
     def cancel(self):
-        if self.task:
-            self.task.cancel()
+        if self.call:
+            self.bot.scheduler.cancel(self.call)
 
     def __repr__(self):
         return f"<FutureTask id={self.id} action={self.action} dt={self.dt} kwargs={self.kwargs}>"
 
 
 class FutureTasksCog(commands.Cog):
+    """Feeds the rows of ``future_tasks`` that are due within ``LOOKAHEAD``
+    to the bot's scheduler and deletes finished ones in batches."""
+
     def __init__(self, bot):
         self.bot: "LunaBot" = bot
+        self.completed: list[int] = []
+        self.delete_task: asyncio.Task | None = None
+
+    def add_task(self, task: FutureTask):
+        if task.id in self.bot.future_tasks:
+            return
+        self.bot.future_tasks[task.id] = task
+        task.start(self.mark_done)
 
     async def spawn_tasks(self):
-        query = "SELECT * FROM future_tasks"
-        rows = await self.bot.db.fetch(query)
+        query = """SELECT
+                       *
+                   FROM
+                       future_tasks
+                   WHERE
+                       time <= $1
+                       AND id != ALL ($2::int[])
+                """
+        rows = await self.bot.db.fetch(
+            query, discord.utils.utcnow() + LOOKAHEAD, list(self.bot.future_tasks)
+        )
 
         for row in rows:
-            task = FutureTask.from_db_row(self.bot, row)
-            self.bot.future_tasks[task.id] = task
-            task.start()
+            self.add_task(FutureTask.from_db_row(self.bot, row))
+
+    async def schedule(self, action: str, time: datetime, **kwargs) -> FutureTask:
+        query = """INSERT INTO
+                       future_tasks (action, time, data)
+                   VALUES
+                       ($1, $2, $3)
+                   RETURNING
+                       id
+                """
+        task_id = await self.bot.db.fetchval(
+            query, action, time, json.dumps(kwargs, indent=4)
+        )
+
+        if action == "remove_role":
+            # done once here rather than every time the task is loaded
+            query = """INSERT INTO
+                           sticky_roles (user_id, role_id, until)
+                       VALUES
+                           ($1, $2, $3)
+                    """
+            await self.bot.db.execute(
+                query, kwargs.get("user_id"), kwargs.get("role_id"), time
+            )
+
+        task = FutureTask(self.bot, task_id, action, time, **kwargs)
+        if time <= discord.utils.utcnow() + LOOKAHEAD:
+            self.add_task(task)
+        return task
+
+    def mark_done(self, task_id: int):
+        self.bot.future_tasks.pop(task_id, None)
+        self.completed.append(task_id)
+        if self.delete_task is None:
+            self.delete_task = self.bot.loop.create_task(self.delete_completed())
+
+    async def delete_completed(self, *, delay: float = 1):
+        # tasks that were due together finish around the same time
+        await asyncio.sleep(delay)
+        self.delete_task = None
+
+        ids, self.completed = self.completed, []
+        if not ids:
+            return
+        query = "DELETE FROM future_tasks WHERE id = ANY($1::int[])"
+        try:
+            await self.bot.db.execute(query, ids)
+        except Exception:
+            self.completed.extend(ids)
+            raise
+
+    @tasks.loop(seconds=LOOKAHEAD.total_seconds() / 2)
+    async def refresh_tasks(self):
+        await self.spawn_tasks()
 
     async def cog_load(self):
         await self.spawn_tasks()
+        self.refresh_tasks.start()
 
     async def cog_unload(self):
-        for task_id in self.bot.future_tasks:
-            task = self.bot.future_tasks.pop(task_id)
+        self.refresh_tasks.cancel()
+        for task in list(self.bot.future_tasks.values()):
             task.cancel()
+        self.bot.future_tasks.clear()
+
+        if self.delete_task is not None:
+            self.delete_task.cancel()
+        await self.delete_completed(delay=0)
 
 
 async def setup(bot):
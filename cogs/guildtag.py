@@ -20,12 +20,12 @@ class GuildTag(commands.Cog):
     def __init__(self, bot: "LunaBot"):
         self.bot = bot
         self._pending_removals: dict[int, asyncio.Task] = {}  # member_id -> task
-        self.role_progress = [
-            0,
-            0,
-            0,
-            0,
-        ]  # magic tuple = [added,addtotal,removed,removetotal]
+
+    async def cog_load(self):
+        self.bot.jobs.register("guildtag_sync", self.sync_member)
+
+    async def cog_unload(self):
+        self.bot.jobs.unregister("guildtag_sync")
 
     # --- helpers --------------------------------------------------------------
 
@@ -118,14 +118,35 @@ class GuildTag(commands.Cog):
                 _delayed_remove(after.id, after.guild.id)
             )
 
+    async def sync_member(self, member: discord.Member, args) -> bool:
+        # checked again here, the tag may have changed since the job started
+        role = member.guild.get_role(args["role_id"])
+        if role is None:
+            return False
+
+        if self._has_guild_tag(member):
+            if role not in member.roles:
+                await member.add_roles(role)
+                return True
+        elif role in member.roles:
+            await member.remove_roles(role)
+            return True
+        return False
+
     # @tasks.loop(hours=1)
     async def update_roles(self, channel=None):
         guild = self.bot.get_guild(self.bot.GUILD_ID)
         role = guild.get_role(self.bot.vars.get("guildtag-role-id"))
 
+        if channel is None:
+            channel = self.bot.get_var_channel("private")
+
         if role is None:
             return await channel.send("guild tag role not found")
 
+        if self.bot.jobs.find("guildtag_sync", guild.id) is not None:
+            return await channel.send("already roleing, do !gtrp to check progress")
+
         toadd = []
         toremove = []
 
@@ -141,21 +162,19 @@ class GuildTag(commands.Cog):
                 if role in member.roles:
                     toremove.append(member)
 
-        self.role_progress = [0, len(toadd), 0, len(toremove)]
-
-        if channel is None:
-            channel = self.bot.get_var_channel("private")
+        if not toadd and not toremove:
+            return await channel.send("everyone's guild tag roles are up to date")
 
-        await channel.send("roleing... do !gtrp to check progress")
-
-        for m in toadd:
-            await m.add_roles(role)
-            self.role_progress[0] += 1
-        for m in toremove:
-            await m.remove_roles(role)
-            self.role_progress[3] += 1
-
-        self.role_progress = [0, 0, 0, 0]
+        await self.bot.jobs.start(
+            "guildtag_sync",
+            guild,
+            toadd + toremove,
+            args={"role_id": role.id},
+            channel=channel,
+        )
+        await channel.send(
+            f"roleing... adding {len(toadd)}, removing {len(toremove)}. do !gtrp to check progress"
+        )
 
     @commands.command()
     @commands.check(is_admin)
@@ -168,8 +187,11 @@ class GuildTag(commands.Cog):
     @commands.check(is_admin)
     async def gtrp(self, ctx):
         """checks progress for guild tag roleing"""
-        a, b, c, d = self.role_progress
-        await ctx.send(f"added {a}/{b}, removed {c}/{d}")
+        job = self.bot.jobs.find("guildtag_sync", self.bot.GUILD_ID)
+        if job is None:
+            return await ctx.send("no roleing happening right now")
+
+        await ctx.send(job.progress())
 
 
 async def setup(bot):
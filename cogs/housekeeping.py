@@ -6,6 +6,7 @@ from typing import TYPE_CHECKING
 import discord
 from discord.ext import commands, tasks
 
+from .utils import MessageView, message_handler
 from .utils.checks import admin_only
 
 if TYPE_CHECKING:
@@ -44,8 +45,6 @@ class Housekeeping(commands.Cog):
             if int(gid) != self.bot.vars.get("main-server-id")
         ]
 
-        self.kick_progress = 0
-        self.role_progress = 0
 
     async def cog_load(self):
         self.edit.start()
@@ -74,12 +73,9 @@ class Housekeeping(commands.Cog):
     async def before_edit(self):
         await asyncio.sleep(600)
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if (
-            msg.channel.id == self.bot.vars.get("welc-channel-id")
-            and "welc" in msg.content.lower()
-        ):
+    @message_handler(channels=["welc-channel-id"], bots=True)
+    async def handle_message(self, msg: discord.Message, view: MessageView):
+        if "welc" in view.lower:
             # remove emojis and links
 
             cleaned = re.sub(
@@ -303,27 +299,24 @@ class Housekeeping(commands.Cog):
         ]
 
         # layout = self.bot.get_layout("kicked-from-guild-server")
-        to_kick = []
-        to_not_kick = [m for m in ctx.guild.members]
-
-        for member in ctx.guild.members:
-            if (
-                member.bot
-                or member.id in id_set
-                or member in ctx.guild.premium_subscribers
-                or member.id in whitelist
-            ):
-                continue
+        exempt = id_set | {m.id for m in ctx.guild.premium_subscribers} | set(whitelist)
+        candidates = [
+            m.id for m in ctx.guild.members if not m.bot and m.id not in exempt
+        ]
 
-            query = (
-                "SELECT 1 FROM guild_server_joins WHERE user_id = $1 AND joined_at < $2"
-            )
-            val = await self.bot.db.fetchval(query, member.id, seven_days_ago)
-            # query = "SELECT 1 FROM guild_server_joins WHERE user_id = $1"
-            # val = await self.bot.db.fetchval(query, member.id)
-            if val:
-                to_kick.append(member)
-                to_not_kick.remove(member)
+        query = """SELECT DISTINCT
+                       user_id
+                   FROM
+                       guild_server_joins
+                   WHERE
+                       user_id = ANY ($1::bigint[])
+                       AND joined_at < $2
+                """
+        rows = await self.bot.db.fetch(query, candidates, seven_days_ago)
+        kick_ids = {row["user_id"] for row in rows}
+
+        to_kick = [m for m in ctx.guild.members if m.id in kick_ids]
+        to_not_kick = [m for m in ctx.guild.members if m.id not in kick_ids]
 
         temp = await ctx.send(
             f"**CHOOSE YOUR ACTION FOR {len(to_kick)} MEMBERS:** `role`, `kick`, `cancel`"
@@ -340,65 +333,79 @@ class Housekeeping(commands.Cog):
             return
 
         if user_msg.content.lower() == "role":
-            await temp.edit(
-                content=f"Roleing {len(to_kick)} members. Do `!guildroleprogress` or `!grp` to see progress."
-            )
+            if self.bot.jobs.find("add_role", ctx.guild.id) is not None:
+                return await temp.edit(content="Already roleing in this server.")
 
             role = ctx.guild.get_role(
                 self.guild_data[str(ctx.guild.id)]["kick-warning-role-id"]
             )
 
-            try:
-                for member in to_kick:
-                    if role not in member.roles:
-                        await member.add_roles(role)
-                    self.role_progress += 1
-            except (discord.Forbidden, discord.HTTPException):
-                self.role_progress = 0
-                return await ctx.send("Roleing failed")
-
-            self.role_progress = 0
-
-            await ctx.send("Now removing the role from those who already joined...")
-            for member in to_not_kick:
-                if role in member.roles:
-                    await member.remove_roles(role)
-
-            await ctx.send("Finished roleing users in this guild server.")
+            to_add = [m for m in to_kick if role not in m.roles]
+            # the role is also taken back from those who already joined
+            to_remove = [m for m in to_not_kick if role in m.roles]
+            if not to_add and not to_remove:
+                return await temp.edit(content="Everyone's roles are already up to date.")
+
+            if to_add:
+                await self.bot.jobs.start(
+                    "add_role",
+                    ctx.guild,
+                    to_add,
+                    args={"role_id": role.id},
+                    channel=ctx.channel,
+                )
+            if to_remove:
+                await self.bot.jobs.start(
+                    "remove_role",
+                    ctx.guild,
+                    to_remove,
+                    args={"role_id": role.id},
+                    channel=ctx.channel,
+                )
+            await temp.edit(
+                content=f"Roleing {len(to_kick)} members. Do `!guildroleprogress` or `!grp` to see progress."
+            )
 
         elif user_msg.content.lower() == "kick":
+            if self.bot.jobs.find("kick", ctx.guild.id) is not None:
+                return await temp.edit(content="Already kicking in this server.")
+            if not to_kick:
+                return await temp.edit(content="There is nobody to kick.")
+
+            await self.bot.jobs.start(
+                "kick",
+                ctx.guild,
+                to_kick,
+                args={"reason": "did not join main server"},
+                channel=ctx.channel,
+            )
             await temp.edit(
                 content=f"Kicking {len(to_kick)} members. Do `!guildkickprogress` or `!gkp` to see progress."
             )
-
-            try:
-                for member in to_kick:
-                    await member.kick(reason="did not join main server")
-                    self.kick_progress += 1
-            except (discord.Forbidden, discord.HTTPException):
-                self.kick_progress = 0
-                return await ctx.send("Kicking failed")
-
-            self.kick_progress = 0
-            await ctx.send("Finished kicking users from guild server.")
         else:
             await temp.edit(content="Cancelled.")
 
     @commands.command(aliases=["gkp"])
     @admin_only()
     async def guildkickprogress(self, ctx):
-        if self.kick_progress == 0:
+        job = self.bot.jobs.find("kick", ctx.guild.id)
+        if job is None:
             return await ctx.send("No kicking is happening now.")
 
-        await ctx.send(self.kick_progress)
+        await ctx.send(job.progress())
 
     @commands.command(aliases=["grp"])
     @admin_only()
     async def guildroleprogress(self, ctx):
-        if self.role_progress == 0:
+        jobs = [
+            self.bot.jobs.find("add_role", ctx.guild.id),
+            self.bot.jobs.find("remove_role", ctx.guild.id),
+        ]
+        lines = [job.progress() for job in jobs if job is not None]
+        if not lines:
             return await ctx.send("No roleing is happening now.")
 
-        await ctx.send(self.role_progress)
+        await ctx.send("\n".join(lines))
 
     # @tasks.loop(hours=24)
     # async def kick_task(self):
@@ -1,10 +1,11 @@
 import json
 import re
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ext import commands
-from jinja2 import Environment, TemplateError
+from jinja2 import Environment, Template, TemplateError
 
 if TYPE_CHECKING:
     from bot import LunaBot
@@ -52,6 +53,141 @@ SPECIAL_REPLS = {
 }
 
 
+PLACEHOLDER = re.compile(r"{(.*?)}")
+
+jinja_env = Environment(enable_async=True)
+
+
+class TextPlan:
+    """A text split into literal segments around its ``{placeholder}``s."""
+
+    __slots__ = ("literals", "names")
+
+    def __init__(self, text: str):
+        self.literals: list[str] = []
+        self.names: list[str] = []
+
+        pos = 0
+        for match in PLACEHOLDER.finditer(text):
+            self.literals.append(text[pos : match.start()])
+            self.names.append(match.group(1))
+            pos = match.end()
+        self.literals.append(text[pos:])
+
+    def render(self, repls: dict, ctx: "LayoutContext | None", special: bool) -> str:
+        if not self.names:
+            return self.literals[0]
+
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            if special and name in SPECIAL_REPLS:
+                parts.append(str(SPECIAL_REPLS[name](ctx)))
+            elif name in repls and not isinstance(repls[name], list):
+                parts.append(str(repls[name]))
+            else:
+                parts.append(f"{{{name}}}")
+            parts.append(literal)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=2048)
+def compile_text(text: str) -> TextPlan:
+    return TextPlan(text)
+
+
+@lru_cache(maxsize=512)
+def compile_template(text: str) -> Template:
+    return jinja_env.from_string(text)
+
+
+class EmbedPlan:
+    """An embed with the text slots that can contain placeholders located.
+
+    Slots without a ``{`` are static in both plain and jinja mode, so
+    rendering only touches the slots listed here and copies the embed once.
+    """
+
+    def __init__(self, embed: discord.Embed):
+        self.embed = embed
+        self.fields: list[tuple[int, str, str]] = []
+        self.title = self._dynamic(embed.title)
+        self.description = self._dynamic(embed.description)
+        self.footer = self._dynamic(embed.footer.text)
+        self.author = self._dynamic(embed.author.name)
+
+        for i, field in enumerate(embed.fields):
+            if "{" in (field.name or "") or "{" in (field.value or ""):
+                self.fields.append((i, field.name, field.value))
+
+    @staticmethod
+    def _dynamic(text: str | None) -> str | None:
+        if text and "{" in text:
+            return text
+        return None
+
+    @property
+    def static(self) -> bool:
+        return not (
+            self.fields or self.title or self.description or self.footer or self.author
+        )
+
+    async def render(
+        self,
+        repls: dict,
+        *,
+        ctx: "LayoutContext | None" = None,
+        special: bool = True,
+        jinja: bool = False,
+    ) -> discord.Embed:
+        embed = self.embed.copy()
+        if self.static:
+            return embed
+
+        async def fill(text):
+            return await Layout.fill_text(
+                text, repls, ctx=ctx, special=special, jinja=jinja
+            )
+
+        for i, name, value in self.fields:
+            field = embed.fields[i]
+            embed.set_field_at(
+                i, name=await fill(name), value=await fill(value), inline=field.inline
+            )
+
+        if self.title:
+            embed.title = await fill(self.title)
+        if self.description:
+            embed.description = await fill(self.description)
+        if self.footer:
+            embed.set_footer(text=await fill(self.footer), icon_url=embed.footer.icon_url)
+        if self.author:
+            author = embed.author
+            embed.set_author(
+                name=await fill(self.author), url=author.url, icon_url=author.icon_url
+            )
+
+        return embed
+
+
+embed_plans: dict[str, EmbedPlan] = {}
+
+
+def get_embed_plan(name: str, embed: discord.Embed) -> EmbedPlan:
+    plan = embed_plans.get(name)
+    # saving an embed always stores a new object, so identity is enough to
+    # notice a stale plan even if the editor didn't invalidate it
+    if plan is None or plan.embed is not embed:
+        plan = embed_plans[name] = EmbedPlan(embed)
+    return plan
+
+
+def invalidate_embed_plan(name: str | None = None):
+    if name is None:
+        embed_plans.clear()
+    else:
+        embed_plans.pop(name, None)
+
+
 class Layout:
     def __init__(
         self,
@@ -100,27 +236,12 @@ class Layout:
 
         if jinja:
             try:
-                env = Environment(enable_async=True)
-                template = env.from_string(text)
+                template = compile_template(text)
                 return await template.render_async(repls)
             except TemplateError as e:
                 return f"`jinja error: {e}`"
 
-        def replace_special(match):
-            inside = match.group(1)
-            if inside in SPECIAL_REPLS:
-                return str(SPECIAL_REPLS[inside](ctx))
-            return f"{{{inside}}}"
-
-        def replace_single(match):
-            inside = match.group(1)
-            if inside in repls and not isinstance(repls[inside], list):
-                return str(repls[inside])
-            return f"{{{inside}}}"
-
-        if special:
-            text = re.sub(r"{(.*?)}", replace_special, text)
-        text = re.sub(r"{(.*?)}", replace_single, text)
+        text = compile_text(text).render(repls, ctx, special)
 
         # def replace_repeating(match):
         #     # example syntax: hi my name is {name}. i like [playing {sports} with {friend} |and|].
@@ -164,35 +285,9 @@ class Layout:
         special: bool = True,
         jinja: bool = False,
     ) -> discord.Embed:
-        embed = _embed.copy()
-        for field in embed.fields:
-            field.name = await Layout.fill_text(
-                field.name, repls, ctx=ctx, special=special, jinja=jinja
-            )
-            field.value = await Layout.fill_text(
-                field.value, repls, ctx=ctx, special=special, jinja=jinja
-            )
-
-        if embed.title:
-            embed.title = await Layout.fill_text(
-                embed.title, repls, ctx=ctx, special=special, jinja=jinja
-            )
-        if embed.footer:
-            embed.set_footer(
-                text=await Layout.fill_text(
-                    embed.footer.text, repls, ctx=ctx, special=special, jinja=jinja
-                )
-            )
-        if embed.author:
-            embed.author.name = await Layout.fill_text(
-                embed.author.name, repls, ctx=ctx, special=special, jinja=jinja
-            )
-        if embed.description:
-            embed.description = await Layout.fill_text(
-                embed.description, repls, ctx=ctx, special=special, jinja=jinja
-            )
-
-        return embed
+        return await EmbedPlan(_embed).render(
+            repls, ctx=ctx, special=special, jinja=jinja
+        )
 
     @property
     def embeds(self):
@@ -201,6 +296,30 @@ class Layout:
             embeds.append(self.bot.get_embed(name))
         return embeds
 
+    @property
+    def embed_plans(self) -> list[EmbedPlan]:
+        plans = []
+        for name in self.embed_names:
+            embed = self.bot.embeds.get(name)
+            if embed is None:
+                plans.append(EmbedPlan(self.bot.get_embed(name)))
+            else:
+                plans.append(get_embed_plan(name, embed))
+        return plans
+
+    async def render_embeds(
+        self,
+        repls: dict,
+        *,
+        ctx: commands.Context | LayoutContext | None = None,
+        special: bool = True,
+        jinja: bool = False,
+    ) -> list[discord.Embed]:
+        return [
+            await plan.render(repls, ctx=ctx, special=special, jinja=jinja)
+            for plan in self.embed_plans
+        ]
+
     def to_dict(self):
         if self.name is None:
             return {"name": None, "content": self.content, "embeds": self.embed_names}
@@ -265,10 +384,9 @@ class Layout:
         else:
             content = None
 
-        embeds = [
-            await self.fill_embed(embed, repls, ctx=ctx, special=special, jinja=jinja)
-            for embed in self.embeds
-        ]
+        embeds = await self.render_embeds(
+            repls, ctx=ctx, special=special, jinja=jinja
+        )
 
         cleaned_kwargs = {}
 
@@ -328,13 +446,9 @@ class Layout:
         else:
             content = None
 
-        embeds = []
-        for embed in self.embeds:
-            embeds.append(
-                await self.fill_embed(
-                    embed, repls, ctx=ctx, special=special, jinja=jinja
-                )
-            )
+        embeds = await self.render_embeds(
+            repls, ctx=ctx, special=special, jinja=jinja
+        )
 
         cleaned_kwargs = {}
         if "view" in kwargs:
@@ -1,4 +1,8 @@
+import asyncio
+import bisect
 import datetime
+import heapq
+import logging
 import math
 import random
 import time
@@ -6,14 +10,18 @@ from io import BytesIO
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands, menus, tasks
 from num2words import num2words
 
 from .utils import (
     Layout,
     LayoutContext,
-    SimplePages,
+    MessageView,
+    ViewMenuPages,
     generate_rank_card,
+    get_cached_avatar,
+    get_cached_rank_card,
+    message_handler,
     next_sunday,
 )
 
@@ -26,6 +34,235 @@ def get_level(xp: int):
     return int(math.sqrt(xp / 50))
 
 
+class XPLedger:
+    """In-memory copy of the ``xp`` and ``msg_count`` tables.
+
+    Increments are applied to memory right away and kept as pending deltas
+    until ``flush`` writes all of them in one transaction.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.xp: dict[int, int] = {}
+        self.msg_counts: dict[int, int] = {}
+        self.pending_xp: dict[int, int] = {}
+        self.pending_counts: dict[int, int] = {}
+        # total_xp at the last weekly reset (the xp_copy table)
+        self.weekly_base: dict[int, int] = {}
+        self.lock = asyncio.Lock()
+
+    async def load(self):
+        rows = await self.bot.db.fetch("SELECT user_id, total_xp FROM xp")
+        self.xp = {row["user_id"]: row["total_xp"] for row in rows}
+        rows = await self.bot.db.fetch("SELECT user_id, count FROM msg_count")
+        self.msg_counts = {row["user_id"]: row["count"] for row in rows}
+        rows = await self.bot.db.fetch("SELECT user_id, total_xp FROM xp_copy")
+        self.weekly_base = {row["user_id"]: row["total_xp"] for row in rows}
+
+    def get_xp(self, user_id: int) -> int:
+        return self.xp.get(user_id, 0)
+
+    def get_msg_count(self, user_id: int) -> int:
+        return self.msg_counts.get(user_id, 0)
+
+    def add_xp(self, user_id: int, amount: int) -> tuple[int, int]:
+        old = self.xp.get(user_id, 0)
+        self.xp[user_id] = old + amount
+        self.pending_xp[user_id] = self.pending_xp.get(user_id, 0) + amount
+        return old, old + amount
+
+    def add_message(self, user_id: int):
+        self.msg_counts[user_id] = self.msg_counts.get(user_id, 0) + 1
+        self.pending_counts[user_id] = self.pending_counts.get(user_id, 0) + 1
+
+    def weekly_gain(self, user_id: int) -> int | None:
+        base = self.weekly_base.get(user_id)
+        if base is None:
+            return None
+        return self.get_xp(user_id) - base
+
+    def _take_pending(self) -> tuple[dict[int, int], dict[int, int]]:
+        xp, self.pending_xp = self.pending_xp, {}
+        counts, self.pending_counts = self.pending_counts, {}
+        return xp, counts
+
+    def _merge_back(self, xp: dict[int, int], counts: dict[int, int]):
+        # so the next flush retries these deltas
+        for user_id, amount in xp.items():
+            self.pending_xp[user_id] = self.pending_xp.get(user_id, 0) + amount
+        for user_id, amount in counts.items():
+            self.pending_counts[user_id] = self.pending_counts.get(user_id, 0) + amount
+
+    @staticmethod
+    async def _write(conn, xp: dict[int, int], counts: dict[int, int]):
+        if xp:
+            query = """INSERT INTO xp (user_id, total_xp)
+                       SELECT * FROM unnest($1::bigint[], $2::bigint[])
+                       ON CONFLICT (user_id) DO UPDATE
+                       SET total_xp = xp.total_xp + EXCLUDED.total_xp
+                    """
+            await conn.execute(query, list(xp), list(xp.values()))
+        if counts:
+            query = """INSERT INTO msg_count (user_id, count)
+                       SELECT * FROM unnest($1::bigint[], $2::int[])
+                       ON CONFLICT (user_id) DO UPDATE
+                       SET count = msg_count.count + EXCLUDED.count
+                    """
+            await conn.execute(query, list(counts), list(counts.values()))
+
+    async def reset_week(self):
+        """Snapshots ``xp`` into ``xp_copy`` and starts a new ``msg_count``.
+
+        The week ends at the moment the lock is taken: deltas pending at that
+        point are written to the old tables in the same transaction as the
+        reset, anything added later belongs to the new week and is left for
+        the next flush.
+        """
+        async with self.lock:
+            xp, counts = self._take_pending()
+            old_base, old_counts = self.weekly_base, self.msg_counts
+            self.weekly_base = dict(self.xp)
+            self.msg_counts = {}
+
+            try:
+                async with self.bot.db.acquire() as conn:
+                    async with conn.transaction():
+                        await self._write(conn, xp, counts)
+                        await conn.execute("DROP TABLE IF EXISTS xp_copy")
+                        # make a copy of the xp table
+                        await conn.execute("CREATE TABLE xp_copy AS SELECT * FROM xp")
+                        await conn.execute("DROP TABLE IF EXISTS msg_count")
+                        await conn.execute(
+                            "CREATE TABLE msg_count (user_id BIGINT PRIMARY KEY, count INTEGER)"
+                        )
+            except Exception:
+                # the old week is still in the database, put it back in memory
+                self.weekly_base = old_base
+                for user_id, amount in self.msg_counts.items():
+                    old_counts[user_id] = old_counts.get(user_id, 0) + amount
+                self.msg_counts = old_counts
+                self._merge_back(xp, counts)
+                raise
+
+    async def flush(self):
+        async with self.lock:
+            if not self.pending_xp and not self.pending_counts:
+                return
+
+            xp, counts = self._take_pending()
+            try:
+                async with self.bot.db.acquire() as conn:
+                    async with conn.transaction():
+                        await self._write(conn, xp, counts)
+            except Exception:
+                self._merge_back(xp, counts)
+                raise
+
+
+class RankIndex:
+    """Guild members ordered by total XP, highest first.
+
+    Keys are ``(-total_xp, user_id)`` so ranks and leaderboard pages are
+    bisect lookups and slices.
+    """
+
+    def __init__(self):
+        self.keys: list[tuple[int, int]] = []
+        self.xp: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, user_id: int):
+        return user_id in self.xp
+
+    def build(self, pairs):
+        self.xp = dict(pairs)
+        self.keys = sorted((-xp, user_id) for user_id, xp in self.xp.items())
+
+    def set(self, user_id: int, xp: int):
+        self.remove(user_id)
+        self.xp[user_id] = xp
+        bisect.insort(self.keys, (-xp, user_id))
+
+    def remove(self, user_id: int):
+        old = self.xp.pop(user_id, None)
+        if old is None:
+            return
+        i = bisect.bisect_left(self.keys, (-old, user_id))
+        del self.keys[i]
+
+    def rank(self, xp: int) -> int:
+        """1 + the number of indexed members with more XP than ``xp``."""
+        return bisect.bisect_left(self.keys, (-xp,)) + 1
+
+    def page(self, start: int, stop: int) -> list[tuple[int, int]]:
+        return [(user_id, -neg_xp) for neg_xp, user_id in self.keys[start:stop]]
+
+    def after(self, key: tuple[int, int], limit: int) -> list[tuple[int, int]]:
+        """Keyset lookup: the ``limit`` entries that come after ``key``."""
+        start = bisect.bisect_right(self.keys, key)
+        return self.page(start, start + limit)
+
+
+class XPLeaderboardSource(menus.PageSource):
+    """Formats only the page that is being shown.
+
+    Moving forward continues from the last ``(-total_xp, user_id)`` key of the
+    previous page, so XP gains in the meantime don't shift entries between
+    pages. Jumps fall back to offsets.
+    """
+
+    def __init__(self, ranks: RankIndex, guild: discord.Guild, *, per_page=12):
+        self.ranks = ranks
+        self.guild = guild
+        self.per_page = per_page
+        # page number -> (key of its last entry, offset of its first entry)
+        self.cursors: dict[int, tuple[tuple[int, int], int]] = {}
+
+    def is_paginating(self):
+        return len(self.ranks) > self.per_page
+
+    def get_max_pages(self):
+        return max(1, math.ceil(len(self.ranks) / self.per_page))
+
+    async def get_page(self, page_number):
+        previous = self.cursors.get(page_number - 1)
+        if previous is not None:
+            key, offset = previous
+            offset += self.per_page
+            entries = self.ranks.after(key, self.per_page)
+        else:
+            offset = page_number * self.per_page
+            entries = self.ranks.page(offset, offset + self.per_page)
+
+        if entries:
+            user_id, total_xp = entries[-1]
+            self.cursors[page_number] = ((-total_xp, user_id), offset)
+        return offset, entries
+
+    async def format_page(self, menu, page):
+        offset, entries = page
+        lines = []
+        for index, (user_id, total_xp) in enumerate(entries, start=offset + 1):
+            member = self.guild.get_member(user_id)
+            mention = member.mention if member else f"<@{user_id}>"
+            lvl = get_level(total_xp)
+            lines.append(
+                f"{index}. {mention}\n**Level:** `{lvl}`\n**Total XP:** `{total_xp}`"
+            )
+
+        maximum = self.get_max_pages()
+        if maximum > 1:
+            footer = (
+                f"Page {menu.current_page + 1}/{maximum} ({len(self.ranks)} entries)"
+            )
+            menu.embed.set_footer(text=footer)
+
+        menu.embed.description = "\n".join(lines)
+        return menu.embed
+
+
 class Levels(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -60,24 +297,19 @@ class Levels(commands.Cog):
             (1060750259980079195, 1.15),
             (981252193132884109, 1.1),
         )
-        # self.xp_cache = {}
-        # self.bot.xp_cache = self.xp_cache
-        # self.msg_counts = {}
+        self.ledger = XPLedger(bot)
+        self.ranks = RankIndex()
         self.weekly_xp_task.start()
         self.cleanup_cooldowns.start()
 
     # make a loop that runs every sunday at 1am
     async def weekly_xp(self, *, channel=None, reset=False):
-        # await self.dump_xp()
-        query = """
-                    SELECT xp.user_id, (xp.total_xp - xp_copy.total_xp) AS diff
-                    FROM xp
-                    INNER JOIN xp_copy ON xp.user_id = xp_copy.user_id
-                    WHERE xp.user_id != $1 
-                    ORDER BY diff DESC
-                    LIMIT 3;
-                """
-        rows = await self.bot.db.fetch(query, self.bot.vars.get("luna-id"))
+        gains = []
+        for user_id in self.ranks.xp:
+            gain = self.ledger.weekly_gain(user_id)
+            if gain is not None:
+                gains.append((gain, user_id))
+        top = heapq.nlargest(3, gains)
 
         lb_layout = self.bot.get_layout("weeklylb")
         lb_repls = {}
@@ -87,12 +319,9 @@ class Levels(commands.Cog):
         prizes = [20_000, 15_000, 10_000]
 
         for i in range(3):
-            row = rows[i]
-            user_id = row["user_id"]
+            xp, user_id = top[i]
             mention = f"<@{user_id}>"
-            query = "SELECT count FROM msg_count WHERE user_id = $1"
-            msg_count = await self.bot.db.fetchval(query, row["user_id"])
-            xp = row["diff"]
+            msg_count = self.ledger.get_msg_count(user_id)
 
             lb_repls[f"mention{i + 1}"] = mention
             lb_repls[f"xp{i + 1}"] = xp
@@ -128,14 +357,45 @@ class Levels(commands.Cog):
     async def before_weekly_xp(self):
         await discord.utils.sleep_until(next_sunday())
 
-    # async def cog_load(self):
-    #     query = 'select user_id, total_xp from xp'
-    #     rows = await self.bot.db.fetch(query)
-    # for row in rows:
-    #     self.xp_cache[row['user_id']] = row['total_xp']
-    # rows = await self.bot.db.fetch('select user_id, count from msg_count')
-    # for row in rows:
-    #     self.msg_counts[row['user_id']] = row['count']
+    async def cog_load(self):
+        await self.ledger.load()
+        self.build_rank_index()
+        self.flush_ledger.start()
+
+    def build_rank_index(self):
+        guild = self.bot.get_guild(self.main_guild_id)
+        if guild is None:
+            return
+
+        luna_id = self.bot.vars.get("luna-id")
+        self.ranks.build(
+            (user_id, xp)
+            for user_id, xp in self.ledger.xp.items()
+            if user_id != luna_id and guild.get_member(user_id) is not None
+        )
+
+    def update_rank(self, user_id: int):
+        if user_id == self.bot.vars.get("luna-id"):
+            return
+        if user_id in self.ledger.xp:
+            self.ranks.set(user_id, self.ledger.xp[user_id])
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.guild.id == self.main_guild_id:
+            self.update_rank(member.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if member.guild.id == self.main_guild_id:
+            self.ranks.remove(member.id)
+
+    @tasks.loop(seconds=30)
+    async def flush_ledger(self):
+        try:
+            await self.ledger.flush()
+        except Exception as e:
+            logging.warning(f"Flushing xp ledger failed: {e}")
 
     @tasks.loop(minutes=10)  # Runs every 10 minutes; adjust as needed
     async def cleanup_cooldowns(self):
@@ -151,16 +411,11 @@ class Levels(commands.Cog):
     async def cog_unload(self):
         self.weekly_xp_task.cancel()
         self.cleanup_cooldowns.cancel()
+        self.flush_ledger.cancel()
+        await self.ledger.flush()
 
     async def reset_lb(self):
-        await self.bot.db.execute("DROP TABLE IF EXISTS xp_copy")
-        # make a copy of the xp table
-        await self.bot.db.execute("CREATE TABLE xp_copy AS SELECT * FROM xp")
-        await self.bot.db.execute("DROP TABLE IF EXISTS msg_count")
-        await self.bot.db.execute(
-            "CREATE TABLE msg_count (user_id BIGINT PRIMARY KEY, count INTEGER)"
-        )
-        # self.msg_counts = {}
+        await self.ledger.reset_week()
 
     async def add_leveled_roles(self, message, old_level, new_level):
         roles = {
@@ -215,49 +470,17 @@ class Levels(commands.Cog):
 
         return round(increment)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if not message.guild:
-            return
-        if message.guild.id != self.main_guild_id:
-            return
-
-        if message.channel.id not in self.whitelisted_channels or message.author.bot:
-            return
-
-        # self.msg_counts[message.author.id] = self.msg_counts.get(message.author.id, 0) + 1
-        # count = self.msg_counts[message.author.id]
-
-        query = """INSERT INTO msg_count (user_id, count) 
-                    VALUES ($1, $2)
-                    ON CONFLICT (user_id)
-                    DO UPDATE SET count = msg_count.count + $2
-                """
-        await self.bot.db.execute(query, message.author.id, 1)
+    @message_handler(main_guild=True, channels=[lambda cog: cog.whitelisted_channels])
+    async def handle_message(self, message: discord.Message, view: MessageView):
+        self.ledger.add_message(message.author.id)
 
         if (
             message.author.id not in self.xp_cooldowns
             or self.xp_cooldowns[message.author.id] < time.time()
         ):
             increment = self.get_increment(message.author)
-
-            # old = self.xp_cache.get(message.author.id)
-            # if old is None:
-            #     self.xp_cache[message.author.id] = increment
-            #     new = increment
-            #     old = 0
-            # else:
-            #     self.xp_cache[message.author.id] += increment
-            #     new = old + increment
-
-            query = """INSERT INTO xp (user_id, "total_xp") 
-                        VALUES ($1, $2)
-                        ON CONFLICT (user_id)
-                        DO UPDATE SET total_xp = xp.total_xp + $2
-                        RETURNING total_xp
-                    """
-            new_xp = await self.bot.db.fetchval(query, message.author.id, increment)
-            old_xp = new_xp - increment
+            old_xp, new_xp = self.ledger.add_xp(message.author.id, increment)
+            self.update_rank(message.author.id)
 
             new_level, old_level = get_level(new_xp), get_level(old_xp)
             await self.add_leveled_roles(message, old_level, new_level)
@@ -270,26 +493,8 @@ class Levels(commands.Cog):
         m = member if member else ctx.author
 
         async with ctx.channel.typing():
-            # xp = self.xp_cache.get(m.id)
-            # if xp is None:
-            #     self.xp_cache[ctx.author.id] = 0
-            #     xp = 0
-
-            # xps_no_luna = [v for k, v in self.xp_cache.items() if k != self.bot.vars.get('luna-id')]
-            # rank = len([v for v in xps_no_luna if v > xp]) + 1
-
-            query = "SELECT total_xp FROM xp WHERE user_id = $1"
-            xp = await self.bot.db.fetchval(query, m.id)
-
-            # Select all rows that have higher xp than the user
-            query = "SELECT user_id FROM xp WHERE total_xp > $1 AND user_id != $2"
-            rows = await self.bot.db.fetch(query, xp, self.bot.vars.get("luna-id"))
-
-            rank = 1
-            for row in rows:
-                member = ctx.guild.get_member(row["user_id"])
-                if member is not None:
-                    rank += 1
+            xp = self.ledger.get_xp(m.id)
+            rank = self.ranks.rank(xp)
 
             current_level = get_level(xp)
 
@@ -297,12 +502,17 @@ class Levels(commands.Cog):
             full = get_xp(current_level + 1)
             pc = (xp - empty) / (full - empty)
 
-            av_file = BytesIO()
-            await m.display_avatar.with_format("png").save(av_file)
+            avatar_key = m.display_avatar.key
+            file = get_cached_rank_card(avatar_key, current_level, pc)
+            if file is None:
+                av_file = get_cached_avatar(avatar_key)
+                if av_file is None:
+                    av_file = BytesIO()
+                    await m.display_avatar.with_format("png").save(av_file)
 
-            file = await self.bot.loop.run_in_executor(
-                None, generate_rank_card, current_level, av_file, pc
-            )
+                file = await self.bot.loop.run_in_executor(
+                    None, generate_rank_card, current_level, av_file, pc, avatar_key
+                )
 
             layout = self.bot.get_layout("rankcommand")
             embed = layout.embeds[0].copy()
@@ -322,55 +532,19 @@ class Levels(commands.Cog):
     async def lb(self, ctx):
         """Shows the XP leaderboard."""
 
-        # pairs_no_luna = [pair for pair in self.xp_cache.items() if pair[0] != self.bot.vars.get('luna-id')]
-        # pairs = sorted(pairs_no_luna, key=lambda x: x[1], reverse=True)
-
-        # Get pairs from db
-        query = """SELECT user_id, total_xp
-                     FROM xp
-                     WHERE user_id != $1
-                     ORDER BY total_xp DESC
-                 """
-        pairs = await self.bot.db.fetch(query, self.bot.vars.get("luna-id"))
-
-        i = 0
-        while i < len(pairs):
-            pair = pairs[i]
-            temp = ctx.guild.get_member(pair[0])
-            if temp is None:
-                pairs.pop(i)
-            else:
-                i += 1
-
-        entries = []
-        for user_id, total_xp in pairs:
-            member = ctx.guild.get_member(user_id)
-            lvl = get_level(total_xp)
-            if member is not None:
-                entries.append(
-                    f"{member.mention}\n**Level:** `{lvl}`\n**Total XP:** `{total_xp}`"
-                )
-
         embed = discord.Embed(
             title="XP Leaderboard", color=self.bot.DEFAULT_EMBED_COLOR
         )
-        view = SimplePages(entries, ctx=ctx, embed=embed)
+        view = ViewMenuPages(XPLeaderboardSource(self.ranks, ctx.guild), ctx=ctx)
+        view.embed = embed
         await view.start()
 
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def givexp(self, ctx, member: discord.Member, xp: int):
-        # self.xp_cache[member.id] += xp
-        query = """INSERT INTO
-                       xp (user_id, "total_xp")
-                   VALUES
-                       ($1, $2)
-                   ON CONFLICT (user_id) DO
-                   UPDATE
-                   SET
-                       total_xp = xp.total_xp + $2
-                """
-        await self.bot.db.execute(query, member.id, xp)
+        self.ledger.add_xp(member.id, xp)
+        self.update_rank(member.id)
+        await self.ledger.flush()
         await ctx.send(f"Gave {xp} xp to {member.mention}.")
 
 
@@ -1,7 +1,6 @@
-import asyncio
+import math
 import random
 from datetime import datetime, timedelta
-from io import BytesIO
 from typing import TYPE_CHECKING
 
 import discord
@@ -9,7 +8,6 @@ import matplotlib.dates as mdates
 import numpy as np
 from dateparser import parse
 from discord.ext import commands
-from matplotlib import pyplot as plt
 from pytz import timezone
 
 from .utils.checks import staff_only
@@ -41,15 +39,15 @@ class StatsFlags(commands.FlagConverter):
 
 
 def plot_data_sync(
-    data: list[tuple[datetime, float]], tz: str, stat: str | None = None
+    fig, data: list[tuple[datetime, float]], tz: str, stat: str | None = None
 ):
     """
-    Plot data synchronously.
-    :param data: A dictionary with join, leave, and net data.
-    :param stat: The statistic to plot ('joins', 'leaves', 'net').
-    :param start: Start time for the plot.
-    :param end: End time for the plot.
-    :return: A BytesIO object containing the plot.
+    Draw the plot onto a figure, run in the plot renderer's workers.
+    :param fig: The Agg figure to draw on.
+    :param data: A list of (time, value) tuples.
+    :param tz: The timezone used for the x axis.
+    :param stat: The rate statistic ('joins', 'leaves', 'net'), or None for
+        the absolute member count.
     """
     # Prepare the data for plotting
     x_values = []
@@ -59,8 +57,6 @@ def plot_data_sync(
         x_values.append(time)
         y_values.append(value)
 
-    # Create the plot.
-    fig = plt.figure(figsize=(8, 5))
     fig.set_facecolor("#36393f")  # Set figure background color
     ax = fig.add_subplot(1, 1, 1)
     ax.set_facecolor("#36393f")  # Set axes background color
@@ -114,13 +110,6 @@ def plot_data_sync(
     # Rotate the x axis labels.
     # fig.autofmt_xdate()
 
-    # Save the plot to a BytesIO object.
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-
-    return buf
-
 
 def parse_time_interval(string):
     # parse xd xh xm xs
@@ -214,59 +203,71 @@ class MemberStats(commands.Cog):
 
     async def generate_rate_data(self, stat, start, end, tick, guild_id):
         """
-        Generate data points for the plot by querying the database.
+        Generate data points for the plot with a single query.
         :param start: Start time for the data range.
         :param end: End time for the data range.
         :param tick: Time delta for each point.
-        :return: A dictionary containing join and leave data points.
+        :return: The data points for ``stat`` and the total joins and leaves.
         """
+        n_ticks = math.ceil((end - start) / tick)
+        upper = start + n_ticks * tick
+
+        query = """WITH events AS (
+                       SELECT time, 1 AS joined, 0 AS left_
+                       FROM joins
+                       WHERE guild_id = $4 AND time >= $1 AND time < $2
+                       UNION ALL
+                       SELECT time, 0, 1
+                       FROM leaves
+                       WHERE guild_id = $4 AND time >= $1 AND time < $2
+                   ),
+                   counts AS (
+                       SELECT date_bin($3::interval, time, $1::timestamptz) AS bucket,
+                              SUM(joined) AS joins,
+                              SUM(left_) AS leaves
+                       FROM events
+                       GROUP BY bucket
+                   )
+                   SELECT s.bucket,
+                          COALESCE(c.joins, 0)::bigint AS joins,
+                          COALESCE(c.leaves, 0)::bigint AS leaves
+                   FROM generate_series(
+                       $1::timestamptz, $2::timestamptz - $3::interval, $3::interval
+                   ) AS s(bucket)
+                   LEFT JOIN counts c ON c.bucket = s.bucket
+                   ORDER BY s.bucket
+                """
+        rows = await self.bot.db.fetch(query, start, upper, tick, guild_id)
+
         data = []
-        current_time = start
-
-        while current_time < end:
-            next_time = current_time + tick
-            join_count = await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM joins WHERE time >= $1 AND time < $2 AND guild_id = $3",
-                current_time,
-                next_time,
-                guild_id,
-            )
-            leave_count = await self.bot.db.fetchval(
-                "SELECT COUNT(*) FROM leaves WHERE time >= $1 AND time < $2 AND guild_id = $3",
-                current_time,
-                next_time,
-                guild_id,
-            )
+        total_joins = 0
+        total_leaves = 0
+        for row in rows:
+            joins, leaves = row["joins"], row["leaves"]
+            total_joins += joins
+            total_leaves += leaves
 
             if stat == "joins":
-                data.append((current_time + tick / 2, join_count))
+                data.append((row["bucket"] + tick / 2, joins))
             elif stat == "leaves":
-                data.append((current_time + tick / 2, leave_count))
+                data.append((row["bucket"] + tick / 2, leaves))
             elif stat == "net":
-                data.append((current_time + tick / 2, join_count - leave_count))
+                data.append((row["bucket"] + tick / 2, joins - leaves))
 
-            current_time = next_time
+        return data, total_joins, total_leaves
 
-        return data
-
-    async def get_total_joins(self, start, end, guild_id):
-        query = (
-            "SELECT COUNT(*) FROM joins WHERE time BETWEEN $1 AND $2 AND guild_id = $3"
-        )
-        total_joins = await self.bot.db.fetchval(query, start, end, guild_id)
-        return total_joins
-
-    async def get_total_leaves(self, start, end, guild_id):
-        query = (
-            "SELECT COUNT(*) FROM leaves WHERE time BETWEEN $1 AND $2 AND guild_id = $3"
-        )
-        total_leaves = await self.bot.db.fetchval(query, start, end, guild_id)
-        return total_leaves
+    async def get_totals(self, start, end, guild_id) -> tuple[int, int]:
+        query = """SELECT
+                       (SELECT COUNT(*) FROM joins
+                        WHERE time BETWEEN $1 AND $2 AND guild_id = $3) AS joins,
+                       (SELECT COUNT(*) FROM leaves
+                        WHERE time BETWEEN $1 AND $2 AND guild_id = $3) AS leaves
+                """
+        row = await self.bot.db.fetchrow(query, start, end, guild_id)
+        return row["joins"], row["leaves"]
 
-    async def generate_base_embed(self, start, end, guild_id):
+    async def generate_base_embed(self, start, end, joins, leaves):
         embed = discord.Embed(title="Stats", color=0xCAB7FF)
-        joins = await self.get_total_joins(start, end, guild_id)
-        leaves = await self.get_total_leaves(start, end, guild_id)
         net = joins - leaves
         embed.add_field(
             name="Start", value=discord.utils.format_dt(start, "R"), inline=True
@@ -319,10 +320,12 @@ class MemberStats(commands.Cog):
 
         #  GENERATE DATA POINTS FOR THE PLOT BY QUERYING THE DATABASE
         tick = timedelta(seconds=tick)
-        data = await self.generate_rate_data(stat, start, end, tick, ctx.guild.id)
-        buf = await asyncio.to_thread(plot_data_sync, data, tz, stat)
+        data, joins, leaves = await self.generate_rate_data(
+            stat, start, end, tick, ctx.guild.id
+        )
+        buf = await self.bot.plots.render(plot_data_sync, data, tz, stat)
         file = discord.File(buf, filename="plot.png")
-        embed = await self.generate_base_embed(start, end, ctx.guild.id)
+        embed = await self.generate_base_embed(start, end, joins, leaves)
 
         await ctx.send(file=file, embed=embed)
 
@@ -349,9 +352,10 @@ class MemberStats(commands.Cog):
         if flags.grad:
             absolute_data = grad_data(absolute_data)
 
-        buf = await asyncio.to_thread(plot_data_sync, absolute_data, tz)
+        joins, leaves = await self.get_totals(start, end, ctx.guild.id)
+        buf = await self.bot.plots.render(plot_data_sync, absolute_data, tz)
         file = discord.File(buf, filename="plot.png")
-        embed = await self.generate_base_embed(start, end, ctx.guild.id)
+        embed = await self.generate_base_embed(start, end, joins, leaves)
 
         await ctx.send(file=file, embed=embed)
 
@@ -1,15 +1,15 @@
-import asyncio
+import math
 from datetime import datetime, timedelta
-from io import BytesIO
 from typing import TYPE_CHECKING
 
 import discord
 import matplotlib.dates as mdates
 from dateparser import parse
 from discord.ext import commands
-from matplotlib import pyplot as plt
 from pytz import timezone
 
+from .utils import CopyBuffer, MessageView, message_handler
+
 if TYPE_CHECKING:
     from bot import LunaBot
 
@@ -22,14 +22,14 @@ class MsgStatsFlags(commands.FlagConverter):
     ticks: int = None
 
 
-def plot_data_sync(data, title, ylabel, tz):
+def plot_data_sync(fig, data, title, ylabel, tz):
     """
-    Plot data synchronously.
-    :param data: A dictionary with join, leave, and net data.
-    :param stat: The statistic to plot ('joins', 'leaves', 'net').
-    :param start: Start time for the plot.
-    :param end: End time for the plot.
-    :return: A BytesIO object containing the plot.
+    Draw the plot onto a figure, run in the plot renderer's workers.
+    :param fig: The Agg figure to draw on.
+    :param data: A list of (time, value) tuples.
+    :param title: The title of the plot.
+    :param ylabel: The label of the y axis.
+    :param tz: The timezone used for the x axis.
     """
     # Prepare the data for plotting
     x_values = []
@@ -39,8 +39,6 @@ def plot_data_sync(data, title, ylabel, tz):
         x_values.append(time)
         y_values.append(value)
 
-    # Create the plot.
-    fig = plt.figure(figsize=(8, 5))
     fig.set_facecolor("none")  # Set figure background color
     ax = fig.add_subplot(1, 1, 1)
     ax.set_facecolor("none")  # Set axes background color
@@ -85,13 +83,6 @@ def plot_data_sync(data, title, ylabel, tz):
     # Rotate the x axis labels.
     # fig.autofmt_xdate()
 
-    # Save the plot to a BytesIO object.
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-
-    return buf
-
 
 def parse_time_interval(string):
     # parse xd xh xm xs
@@ -113,50 +104,58 @@ def parse_time_interval(string):
 class MessageStats(commands.Cog):
     def __init__(self, bot):
         self.bot: "LunaBot" = bot
+        self.buffer = CopyBuffer(
+            bot,
+            "message_data",
+            ("user_id", "channel_id", "time"),
+            max_rows=500,
+            interval=15,
+        )
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if not msg.guild:
-            return
+    async def cog_load(self):
+        self.buffer.start()
 
-        if msg.author.bot or msg.guild.id != self.bot.GUILD_ID:
-            return
+    async def cog_unload(self):
+        await self.buffer.close()
 
-        query = """INSERT INTO
-                       message_data (user_id, channel_id)
-                   VALUES
-                       ($1, $2)
-                """
-        await self.bot.db.execute(query, msg.author.id, msg.channel.id)
+    @message_handler(main_guild=True)
+    async def handle_message(self, msg: discord.Message, view: MessageView):
+        self.buffer.add(msg.author.id, msg.channel.id, msg.created_at)
 
     async def generate_data(self, start: datetime, end: datetime, tick, general_only):
-        data = []
-        current_time = start
-
-        running_sum = 0
-
-        async def get_interval_count(t1, t2):
-            if general_only:
-                query = "SELECT COUNT(*) FROM message_data WHERE time >= $1 AND time < $2 AND channel_id != $3"
-                return await self.bot.db.fetchval(
-                    query, t1, t2, self.bot.vars.get("general-channel-id")
-                )
-            else:
-                query = (
-                    "SELECT COUNT(*) FROM message_data WHERE time >= $1 AND time < $2"
-                )
-                return await self.bot.db.fetchval(query, t1, t2)
-
-        while current_time < end:
-            next_time = current_time + tick
-            data.append(
-                (
-                    current_time + tick / 2,
-                    await get_interval_count(current_time, next_time),
-                )
-            )
-            current_time = next_time
-            running_sum += data[-1][1]
+        n_ticks = math.ceil((end - start) / tick)
+        upper = start + n_ticks * tick
+
+        if general_only:
+            channel_filter = "AND channel_id != $4"
+            args = (start, upper, tick, self.bot.vars.get("general-channel-id"))
+        else:
+            channel_filter = ""
+            args = (start, upper, tick)
+
+        # bin everything in one pass, then left join against every bucket so
+        # empty ones come back as 0
+        query = f"""WITH counts AS (
+                        SELECT date_bin($3::interval, time, $1::timestamptz) AS bucket,
+                               COUNT(*) AS n
+                        FROM message_data
+                        WHERE time >= $1 AND time < $2 {channel_filter}
+                        GROUP BY bucket
+                    )
+                    SELECT s.bucket,
+                           COALESCE(c.n, 0) AS n,
+                           SUM(COALESCE(c.n, 0)) OVER (ORDER BY s.bucket)::bigint
+                               AS running
+                    FROM generate_series(
+                        $1::timestamptz, $2::timestamptz - $3::interval, $3::interval
+                    ) AS s(bucket)
+                    LEFT JOIN counts c ON c.bucket = s.bucket
+                    ORDER BY s.bucket
+                """
+        rows = await self.bot.db.fetch(query, *args)
+
+        data = [(row["bucket"] + tick / 2, row["n"]) for row in rows]
+        running_sum = rows[-1]["running"] if rows else 0
 
         return data, running_sum
 
@@ -219,10 +218,11 @@ class MessageStats(commands.Cog):
         elif flags.tick:
             delta = timedelta(seconds=parse_time_interval(flags.tick))
 
+        await self.buffer.flush()
         data, n_msgs = await self.generate_data(
             start, end, delta, not flags.all_channels
         )
-        buf = await asyncio.to_thread(
+        buf = await self.bot.plots.render(
             plot_data_sync, data, "messages sent", "# of new messages", tz
         )
         file = discord.File(buf, filename="plot.png")
@@ -2,7 +2,7 @@ from discord.ext import commands
 import discord
 import json
 
-from cogs.utils import View
+from cogs.utils import MessageView, View, message_handler
 
 
 class ResendView(View):
@@ -54,9 +54,9 @@ class NoPings(commands.Cog):
         query = "UPDATE vars SET value = $1 WHERE name = $2"
         await self.bot.db.execute(query, new_var, "no-ping-ids")
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
-        if not msg.guild or msg.author.bot:
+    @message_handler()
+    async def handle_message(self, msg: discord.Message, view: MessageView):
+        if not view.mention_ids & self.no_ping_ids:
             return
 
         # if msg.author.guild_permissions.manage_messages:
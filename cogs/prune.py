@@ -14,6 +14,8 @@ from typing import List
 
 import dateparser
 
+from .utils import MemberJob
+
 
 class PruneHappening(Exception): ...
 
@@ -28,9 +30,6 @@ class Prune(commands.Cog):
 
     def __init__(self, bot):
         self.bot: "LunaBot" = bot
-        self.prune_progress = 0
-        self.total_pruned = 0
-        self.prune_task: asyncio.Task = None
 
     def to_prune_from_cutoff(
         self, guild: discord.Guild, cutoff: datetime
@@ -73,25 +72,29 @@ class Prune(commands.Cog):
             )
         )[:n]
 
-    def prune_dispatcher(self, members: List[discord.Member]) -> asyncio.Task:
-        if self.prune_progress != 0:
+    @property
+    def prune_job(self) -> MemberJob | None:
+        return self.bot.jobs.find("kick", self.bot.GUILD_ID, reason="prune")
+
+    async def prune_dispatcher(
+        self,
+        guild: discord.Guild,
+        members: List[discord.Member],
+        channel: discord.abc.Messageable,
+    ) -> MemberJob | None:
+        if not members:
+            return None
+        if self.prune_job is not None:
             raise PruneHappening()
 
-        async def prune():
-            self.total_pruned = len(members)
-            for member in members:
-                if member.status is not discord.Status.offline:
-                    continue
-                try:
-                    await member.kick(reason="prune")
-                except discord.Forbidden:
-                    pass
-                self.prune_progress += 1
-
-            self.prune_progress = 0
-
-        self.prune_task = self.bot.loop.create_task(prune())
-        return self.prune_task
+        # members who came online since the list was made are left alone
+        return await self.bot.jobs.start(
+            "kick",
+            guild,
+            members,
+            args={"reason": "prune", "only_offline": True},
+            channel=channel,
+        )
 
     async def cog_check(self, ctx):
         return (
@@ -100,6 +103,9 @@ class Prune(commands.Cog):
         )
 
     async def confirm_prune(self, ctx, to_prune, latest_dt):
+        if not to_prune:
+            return await ctx.send("There is nobody to prune.")
+
         abs_fmt = discord.utils.format_dt(latest_dt, "D")
         rel_fmt = discord.utils.format_dt(latest_dt, "R")
         n = len(to_prune)
@@ -121,18 +127,18 @@ class Prune(commands.Cog):
             return
 
         try:
-            self.prune_dispatcher(to_prune)
+            job = await self.prune_dispatcher(ctx.guild, to_prune, ctx.channel)
         except PruneHappening:
             return await ctx.send("Prune already happening now, please wait.")
 
         await ctx.send(
-            f"Pruning {self.total_pruned} members. Do `!prune p` to check progress, or `!prune cancel` to cancel."
+            f"Pruning {job.total} members. Do `!prune p` to check progress, or `!prune cancel` to cancel."
         )
 
     @commands.hybrid_group(name="prune", invoke_without_command=True)
     async def prune(self, ctx, n: int):
         to_prune = self.to_prune_from_n(ctx.guild, n)
-        latest_dt = to_prune[-1].joined_at
+        latest_dt = to_prune[-1].joined_at if to_prune else None
 
         await self.confirm_prune(ctx, to_prune, latest_dt)
 
@@ -140,7 +146,7 @@ class Prune(commands.Cog):
     async def to(self, ctx, n: int):
         n = len(ctx.guild.members) - n
         to_prune = self.to_prune_from_n(ctx.guild, n)
-        latest_dt = to_prune[-1].joined_at
+        latest_dt = to_prune[-1].joined_at if to_prune else None
 
         await self.confirm_prune(ctx, to_prune, latest_dt)
 
@@ -162,16 +168,17 @@ class Prune(commands.Cog):
 
     @prune.command(aliases=["p"])
     async def progress(self, ctx):
-        if self.prune_progress == 0:
+        job = self.prune_job
+        if job is None:
             return await ctx.send("no prune happening")
 
-        p = self.prune_progress / self.total_pruned * 100
-        await ctx.send(f"{self.prune_progress}/{self.total_pruned} ({p:.0f}%)")
+        await ctx.send(job.progress())
 
     @prune.command()
     async def cancel(self, ctx):
-        if not self.prune_task.done():
-            self.prune_task.cancel()
+        job = self.prune_job
+        if job is not None:
+            job.cancel()
             await ctx.send("Cancelled.")
         else:
             await ctx.send("no prune happening")
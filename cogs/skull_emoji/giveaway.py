@@ -233,10 +233,13 @@ class GiveawayCog(commands.Cog, name='Giveaways'):
 
     def launch_task(self, gvwy):
         async def task():
-            await asyncio.sleep(gvwy.end_time - time.time())
             await self.win(gvwy)
-        
-        self.tasks.append(self.bot.loop.create_task(task()))
+
+        self.tasks.append(
+            self.bot.scheduler.call_at(
+                gvwy.end_time, task, name=f"giveaway {gvwy.gvwy_id}"
+            )
+        )
 
     async def win(self, gvwy):
         # TODO: 
@@ -263,7 +266,7 @@ class GiveawayCog(commands.Cog, name='Giveaways'):
 
     async def cog_unload(self):
         for task in self.tasks:
-            task.cancel()
+            self.bot.scheduler.cancel(task)
 
     async def cog_check(self, ctx):
         return ctx.author.guild_permissions.administrator or ctx.author.id == self.bot.STORCH_ID
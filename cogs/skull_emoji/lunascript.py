@@ -2,10 +2,18 @@ import discord
 from discord.ext import commands 
 import expr 
 from num2words import num2words
-import re
 import datetime 
 import time
 from levels import get_level 
+from lunascript_ast import (
+    LunaScriptError,
+    UnmatchedBracket,
+    InvalidMathExpression,
+    InvalidFunctionArgs,
+    InvalidCondition,
+    compile_script,
+    render,
+)
 
 
 class LayoutNotFound(Exception):
@@ -30,18 +38,6 @@ class Layout:
         return cls(bot, name, bot.layouts[name][0], bot.layouts[name][1])
     
     
-def clean(token):
-    try:
-        token = int(token)
-    except ValueError:
-        try:
-            token = float(token)
-        except ValueError:
-            repl = r'\"'
-            token = f'''"{token.replace('"', repl)}"'''
-    return token 
-
-
 class ScriptContext:
     def __init__(self, bot, channel, guild=None, member=None, message=None, args=None):
         self.bot = bot 
@@ -247,23 +243,6 @@ class LunaScript(TextEmbed):
         return self.embed
         
 
-class LunaScriptError(Exception):
-    pass
-
-class UnmatchedBracket(LunaScriptError):
-    pass
-
-class InvalidMathExpression(LunaScriptError):
-    pass 
-
-class InvalidFunctionArgs(LunaScriptError):
-    pass 
-
-class InvalidCondition(LunaScriptError):
-    pass
-
-
-
 class LunaScriptParser:
 
     def __init__(self, script_ctx):
@@ -272,210 +251,30 @@ class LunaScriptParser:
         self.funcs = self.script_ctx.funcs
         self.vars = self.script_ctx.bot.vars  
         self.args = self.script_ctx.args
+        self.func_names = frozenset(self.funcs)
 
         
     async def parse(self, text):
         return await self.script_ctx.bot.loop.run_in_executor(None, self.parse_sync, text)
 
     def parse_sync(self, text):
-        
-        def ordered_eval(string):
-            string = [char for char in string]
-            newstr = []
-            i = 0
-            while i < len(string):
-                if i > 0 and string[i-1] == '\\':
-                    newstr.append(string[i])
-                    i += 1
-                    continue
-                if string[i] == '[':
-                    # find the closing bracket
-                    counter = 0
-                    j = i+1
-
-                    found = False
-                    while j < len(string):
-                        if string[j] == '[' and string[j-1] != '\\':
-                            counter += 1
-                        elif string[j] == ']' and string[j-1] != '\\':
-                            if counter == 0:
-                                found = True
-                                break 
-                            else:
-                                counter -= 1 
-                        j += 1  
-                    if not found:
-                        newstr.append('[')
-                        i += 1
-                        continue
-                    inside = ordered_eval(string[i+1:j])
-
-                    comp = True
-                    match = re.match(r'(\d+|(?:.+?))\s*(<|<=|=<|==|=|=>|>=|>)\s*(\d+|(?:.+?)):[ ]?', inside)
-                    if match is None:
-                        match = re.match(r'(true|false):[ ]?', inside)
-                        if match is None:
-                            newstr.append('[')
-                            i += 1
-                            continue
-                        comp = False
-
-                    if comp: 
-                        left = match.group(1)
-                        left = clean(left)
-                        op = match.group(2)
-                        if op == '=':
-                            op = '=='
-                        right = match.group(3)
-                        right = clean(right)
-
-                        if eval(f'{left} {op} {right}') is True:
-                            newstr.extend([char for char in inside[match.end():]])
-                    else:
-                        if match.group(1) == 'true':
-                            newstr.extend([char for char in inside[match.end():]])
-
-                    i += j - i + 1
-                elif string[i] == '(':
-                    k = i-1
-                    while k >= 0 and string[k] != ' ':
-                        k -= 1
-                    funcname = ''.join(string[k+1:i])
-                    if funcname not in self.funcs:
-                        newstr += string[i]
-                        i += 1
-                        continue
-                    # find the closing bracket
-                    counter = 0
-                    j = i+1
-                    found = False
-
-                    while j < len(string):
-                        if string[j] == '(':
-                            counter += 1
-                        elif string[j] == ')':
-                            if counter == 0:
-                                found = True
-                                break 
-                            else:
-                                counter -= 1 
-                        j += 1  
-                    if not found:
-                        newstr.append('(')
-                        i += 1
-                        continue
-
-                    inside = ordered_eval(string[i+1:j])
-                    args = inside.split(',')
-                    args = [arg.strip() for arg in args if arg != '']
-                    func = self.funcs[funcname]
-                    try:
-                        repl = func(*args)
-                    except TypeError:
-                        raise InvalidFunctionArgs(f'Invalid arguments for {funcname}: {inside}')
-                    for _ in range(len(funcname)):
-                        newstr.pop()
-                    newstr.extend([char for char in str(repl)])
-
-                    i += j - i + 1
-                elif string[i] == '$':
-                    # find next $ 
-                    j = i+1
-                    found = False 
-
-                    while j < len(string):
-                        if string[j] == '$' and string[j-1] != '\\':
-                            found = True
-                            break
-                        j += 1
-                    if not found:
-                        newstr.append('$')
-                        i += 1
-                        continue
-
-                    inside = ordered_eval(string[i+1:j])
-                    try:
-                        repl = expr.evaluate(inside)
-                    except Exception:
-                        raise InvalidMathExpression(f'Invalid math expression: {inside}')
-                    newstr.extend([char for char in str(repl)])
-                    i += j - i + 1
-                elif string[i] == '<':
-                    if i >= len(string) - 2 or string[i+1].lower() != 's' or string[i+2] != '>':
-                        newstr += string[i]
-                        i += 1
-                        continue
-                    
-                    j = i+3
-                    found = False
-                    while j < len(string) - 3:
-                        if string[j:j+4] in (['<', '/', 's', '>'], ['<', '/', 'S', '>']):
-                            found = True
-                            break
-                        j += 1
-
-                    if not found:
-                        raise UnmatchedBracket(f'Unmatched bracket: <s>')
-
-                    def inner():
-                        vars = [
-                            ('bot', 'self.script_ctx.bot'), 
-                            ('server', 'self.script_ctx.guild'), 
-                            ('channel', 'self.script_ctx.channel'), 
-                            ('member', 'self.script_ctx.member'), 
-                            ('message', 'self.script_ctx.message')
-                        ]
-                        for name, val in vars:
-                            exec(f'{name} = {val}', locals(), locals())
-                        for name, val in self.vars.items():
-                            if isinstance(val, str):
-                                repl = '\\"'
-                                val = '"' + val.replace('"', repl) + '"'
-                            exec(f'{name} = {val}', locals(), locals())
-                        exec(''.join(string[i+3:j]))
-                        g = locals() 
-                        if 'updates' in g:
-                            for varname in g['updates'].split():
-                                if varname in g:
-                                    self.vars[varname] = g[varname]
-                                    self.script_ctx.bot.vars[varname] = g[varname]
-                    inner()
-                    i += j - i + 4
-                elif string[i] == '{':
-                    j = i+1
-                    while j < len(string) and string[j] != '}':
-                        j += 1
-                    varname = ''.join(string[i+1:j])
-                    if varname in self.vars_builtin:
-                        repl = self.vars_builtin[varname]()
-                    elif varname in self.vars:
-                        repl = self.vars[varname]
-                    elif varname in self.args:
-                        repl = self.args[varname]
-                    else:
-                        repl = ''
-                    
-                    newstr.extend([char for char in str(repl)])
-                    i += j - i + 1
-                else:
-                    newstr.append(string[i])
-                    i += 1
-
-            return ''.join(newstr)
-        
-        return ordered_eval(text)
-
-if __name__ == '__main__':
-    teststr = '''<s>
-    n+=1
-    updates = 'n'
-    </s>
-    hi {mention}! you are the th({n}) person to use this.
-    [{n}<10: we need $10-{n}$ more to reach 10]
-    [{n}>=10: we reached 10!]'''
-    teststr = 'th(6)'
-
-    parser = LunaScriptParser()
-    for i in range(100):
-        print(parser.parse(teststr))
-    print(parser.vars)
\ No newline at end of file
+        return render(compile_script(text, self.func_names), self)
+
+    def evaluate_math(self, text):
+        return expr.evaluate(text)
+
+    def run_script(self, code):
+        ns = {
+            'bot': self.script_ctx.bot,
+            'server': self.script_ctx.guild,
+            'channel': self.script_ctx.channel,
+            'member': self.script_ctx.member,
+            'message': self.script_ctx.message,
+        }
+        ns.update(self.vars)
+        exec(code, globals(), ns)
+        if 'updates' in ns:
+            for varname in ns['updates'].split():
+                if varname in ns:
+                    self.vars[varname] = ns[varname]
+                    self.script_ctx.bot.vars[varname] = ns[varname]
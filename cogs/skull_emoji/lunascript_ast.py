@@ -0,0 +1,362 @@
+"""Tokenizer, parser and tree-walking evaluator for LunaScript.
+
+A script is tokenized and parsed once into a tuple of nodes (plain strings
+for literal text) and cached per script text, so sending the same layout
+again only walks the tree. The evaluator needs a scope with ``vars_builtin``,
+``vars``, ``args`` and ``funcs`` mappings and ``evaluate_math(text)`` /
+``run_script(code)`` methods, which ``LunaScriptParser`` provides.
+
+The syntax is the same as the old character-by-character parser:
+
+    {name}          variable (builtin, then bot var, then argument)
+    th(...)         call of a known function, comma separated arguments
+    $...$           math expression
+    [a < b: text]   condition, also [true: text] and [false: text]
+    <s>...</s>      python block, names listed in ``updates`` are saved
+    \\x              the character after a backslash is never special
+"""
+
+import operator
+import re
+import textwrap
+from functools import lru_cache
+
+
+class LunaScriptError(Exception):
+    pass
+
+class UnmatchedBracket(LunaScriptError):
+    pass
+
+class InvalidMathExpression(LunaScriptError):
+    pass
+
+class InvalidFunctionArgs(LunaScriptError):
+    pass
+
+class InvalidCondition(LunaScriptError):
+    pass
+
+
+SPECIAL = re.compile(r'[\[\]()${<]')
+SCRIPT_END = re.compile(r'</[sS]>')
+
+CONDITION = re.compile(r'(\d+|(?:.+?))\s*(<|<=|=<|==|=|=>|>=|>)\s*(\d+|(?:.+?)):[ ]?')
+BOOLEAN = re.compile(r'(true|false):[ ]?')
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '=<': operator.le,
+    '==': operator.eq,
+    '=': operator.eq,
+    '=>': operator.ge,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+
+def clean(token):
+    try:
+        return int(token)
+    except ValueError:
+        try:
+            return float(token)
+        except ValueError:
+            return token
+
+
+# tokens are (kind, value) pairs, kind is 'text', 'var', 'script' or one of
+# the bracket characters, whose value is None
+
+def tokenize(text):
+    tokens = []
+    start = 0
+    pos = 0
+    n = len(text)
+
+    while True:
+        m = SPECIAL.search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        c = text[i]
+        pos = i + 1
+
+        if i > 0 and text[i-1] == '\\':
+            continue
+
+        if c == '<':
+            if text[i+1:i+2].lower() != 's' or text[i+2:i+3] != '>':
+                continue
+            end = SCRIPT_END.search(text, i+3)
+            if end is None:
+                raise UnmatchedBracket('Unmatched bracket: <s>')
+            token = ('script', text[i+3:end.start()])
+            pos = end.end()
+        elif c == '{':
+            j = text.find('}', i+1)
+            if j == -1:
+                j = n
+            token = ('var', text[i+1:j])
+            pos = j + 1
+        else:
+            token = (c, None)
+
+        if start < i:
+            tokens.append(('text', text[start:i]))
+        tokens.append(token)
+        start = pos
+
+    if start < n:
+        tokens.append(('text', text[start:]))
+    return tokens
+
+
+def add_text(nodes, text):
+    if not text:
+        return
+    if nodes and nodes[-1].__class__ is str:
+        nodes[-1] += text
+    else:
+        nodes.append(text)
+
+
+def render(nodes, scope):
+    out = []
+    for node in nodes:
+        if node.__class__ is str:
+            out.append(node)
+        else:
+            out.append(node.render(scope))
+    return ''.join(out)
+
+
+class Var:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def render(self, scope):
+        name = self.name
+        if name in scope.vars_builtin:
+            return str(scope.vars_builtin[name]())
+        if name in scope.vars:
+            return str(scope.vars[name])
+        if name in scope.args:
+            return str(scope.args[name])
+        return ''
+
+
+class Call:
+    __slots__ = ('name', 'children')
+
+    def __init__(self, name, children):
+        self.name = name
+        self.children = children
+
+    def render(self, scope):
+        inside = render(self.children, scope)
+        args = [arg.strip() for arg in inside.split(',') if arg != '']
+        try:
+            return str(scope.funcs[self.name](*args))
+        except TypeError:
+            raise InvalidFunctionArgs(f'Invalid arguments for {self.name}: {inside}')
+
+
+class Math:
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+    def render(self, scope):
+        inside = render(self.children, scope)
+        try:
+            return str(scope.evaluate_math(inside))
+        except Exception:
+            raise InvalidMathExpression(f'Invalid math expression: {inside}')
+
+
+class Cond:
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+    @staticmethod
+    def apply(inside):
+        m = CONDITION.match(inside)
+        if m is not None:
+            left, op, right = m.groups()
+            if OPERATORS[op](clean(left), clean(right)) is True:
+                return inside[m.end():]
+            return ''
+
+        m = BOOLEAN.match(inside)
+        if m is not None:
+            if m.group(1) == 'true':
+                return inside[m.end():]
+            return ''
+
+        # not a condition, keep the brackets
+        return f'[{inside}]'
+
+    def render(self, scope):
+        return self.apply(render(self.children, scope))
+
+
+class Script:
+    __slots__ = ('source', 'code')
+
+    def __init__(self, source):
+        self.source = source
+        self.code = compile(textwrap.dedent(source), '<s>', 'exec')
+
+    def render(self, scope):
+        scope.run_script(self.code)
+        return ''
+
+
+class Parser:
+    """Builds the node tree from the token list.
+
+    A construct that isn't closed before the end of the script, or before a
+    closing bracket of a construct around it, is kept as literal text and
+    its contents are parsed as if the opening bracket wasn't there.
+    """
+
+    CLOSERS = {'[': ']', '(': ')', '$': '$'}
+
+    def __init__(self, tokens, func_names):
+        self.tokens = tokens
+        self.func_names = func_names
+        self.pos = 0
+        self.closers = []
+
+    def parse(self):
+        nodes, _ = self.parse_until(None)
+        return nodes
+
+    def parse_until(self, closer):
+        nodes = []
+        depth = 0  # unmatched literal '(' seen in this span
+        tokens = self.tokens
+
+        while self.pos < len(tokens):
+            kind, value = tokens[self.pos]
+
+            if kind == ')' and depth:
+                depth -= 1
+                add_text(nodes, ')')
+                self.pos += 1
+                continue
+            if kind == closer:
+                self.pos += 1
+                return nodes, True
+            if kind in self.closers:
+                return nodes, False
+
+            self.pos += 1
+            if kind == 'text':
+                add_text(nodes, value)
+            elif kind == 'var':
+                nodes.append(Var(value))
+            elif kind == 'script':
+                nodes.append(Script(value))
+            elif kind == '[':
+                self.parse_construct(nodes, kind, Cond)
+            elif kind == '$':
+                self.parse_construct(nodes, kind, Math)
+            elif kind == '(':
+                name = self.func_name(nodes)
+                if name is None:
+                    depth += 1
+                    add_text(nodes, '(')
+                else:
+                    self.parse_call(nodes, name)
+            else:
+                add_text(nodes, kind)
+
+        return nodes, False
+
+    def parse_span(self, opener):
+        self.closers.append(self.CLOSERS[opener])
+        children, closed = self.parse_until(self.CLOSERS[opener])
+        self.closers.pop()
+        return tuple(children), closed
+
+    def parse_construct(self, nodes, opener, cls):
+        children, closed = self.parse_span(opener)
+        if closed:
+            nodes.append(cls(children))
+        else:
+            self.splice(nodes, opener, children)
+
+    def parse_call(self, nodes, name):
+        children, closed = self.parse_span('(')
+        if closed:
+            # the name was added as text before the '(' was seen
+            prefix = nodes.pop()
+            add_text(nodes, prefix[:-len(name)])
+            nodes.append(Call(name, children))
+        else:
+            self.splice(nodes, '(', children)
+
+    @staticmethod
+    def splice(nodes, opener, children):
+        add_text(nodes, opener)
+        for child in children:
+            if child.__class__ is str:
+                add_text(nodes, child)
+            else:
+                nodes.append(child)
+
+    def func_name(self, nodes):
+        # the function name runs back to the last space, or to the start of
+        # the span if there's no space at all
+        if not nodes or nodes[-1].__class__ is not str:
+            return None
+        text = nodes[-1]
+        space = text.rfind(' ')
+        if space == -1 and len(nodes) > 1:
+            return None
+        name = text[space+1:]
+        if name in self.func_names:
+            return name
+        return None
+
+
+def fold(nodes):
+    """Evaluates conditions whose contents are constant and merges the
+    literal text around them."""
+    out = []
+    for node in nodes:
+        if node.__class__ is str:
+            add_text(out, node)
+            continue
+
+        children = getattr(node, 'children', None)
+        if children is not None:
+            node.children = fold(children)
+
+        if node.__class__ is Cond and all(c.__class__ is str for c in node.children):
+            try:
+                add_text(out, Cond.apply(''.join(node.children)))
+                continue
+            except TypeError:
+                pass
+        out.append(node)
+    return tuple(out)
+
+
+@lru_cache(maxsize=1024)
+def compile_script(text, func_names):
+    """Returns the cached node tree for ``text``. ``func_names`` is a
+    frozenset of the names that can be called."""
+    return fold(Parser(tokenize(text), func_names).parse())
+
+
+def evaluate(text, scope):
+    return render(compile_script(text, frozenset(scope.funcs)), scope)
@@ -1,6 +1,4 @@
-from matplotlib import pyplot as plt
 import matplotlib.dates as mdates
-from io import BytesIO
 
 from datetime import datetime
 from pytz import timezone
@@ -14,24 +12,21 @@ params = {
     "axes.edgecolor": "w",
     "figure.dpi": 300,
 }
-plt.rcParams.update(params)
 
 
 async def plot_data(bot, data):
-    buf = await bot.loop.run_in_executor(None, plot_data_sync, data)
+    # teams aren't picklable, the workers only need their names
+    series = [(team.name, points) for team, points in data]
+    buf = await bot.plots.render(plot_data_sync, series, rc=params)
     return File(fp=buf, filename="plot.png")
 
 
-def plot_data_sync(data):
+def plot_data_sync(fig, data):
     """
-    Plot data synchronously.
-    :param data: A list of tuples of the form (datetime, value).
-    :return: A BytesIO object containing the plot.
+    Draw the team series onto a figure, run in the plot renderer's workers.
+    :param fig: The Agg figure to draw on.
+    :param data: A list of (team name, [(timestamp, value)]) tuples.
     """
-    # Convert the data to a list of datetime objects and a list of values.
-
-    # Create the plot.
-    fig = plt.figure(figsize=(8, 5))
     # set background colo
     fig.set_facecolor("#36393f")
 
@@ -49,8 +44,8 @@ def plot_data_sync(data):
     i = 0
     colors = {"bunny": "#cab7ff", "kitty": "#9900bb"}
     for t in data:
-        legends.append(t[0].name)
-        color = colors[t[0].name]
+        legends.append(t[0])
+        color = colors[t[0]]
         ax.plot(
             [datetime.fromtimestamp(t[0]) for t in data[i][1]],
             [t[1] for t in data[i][1]],
@@ -68,13 +63,6 @@ def plot_data_sync(data):
     # Rotate the x axis labels.
     fig.autofmt_xdate()
 
-    # Save the plot to a BytesIO object.
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-
-    return buf
-
 
 if __name__ == "__main__":
     test_data = [
@@ -135,8 +123,13 @@ if __name__ == "__main__":
             ],
         )
     ]
-    buf = plot_data_sync(test_data)
+    from io import BytesIO
+
     from PIL import Image
 
+    from cogs.utils.plotting import render_figure
+
+    buf = BytesIO(render_figure(plot_data_sync, (test_data,), params))
+
     img = Image.open(buf)
     img.show()
@@ -1,8 +1,74 @@
-import expr 
+"""Regression tests and a benchmark for the LunaScript parser.
+
+``LegacyParser`` is the old character-by-character parser, kept as the
+reference the compiled parser is checked against. Run with pytest, or
+directly to run the tests followed by the benchmark:
+
+    python test_lunascript.py [n]
+"""
+
+import ast
+import operator
+import random
 import re
+import sys
+import time
+
+from lunascript_ast import (
+    InvalidFunctionArgs,
+    InvalidMathExpression,
+    UnmatchedBracket,
+    compile_script,
+    evaluate,
+)
+
+
+MATH_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.USub: operator.neg,
+}
+
+
+def evaluate_math(text):
+    def walk(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.BinOp):
+            return MATH_OPS[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.UnaryOp):
+            return MATH_OPS[type(node.op)](walk(node.operand))
+        raise ValueError(text)
+    return walk(ast.parse(text.strip(), mode='eval').body)
+
+
+class Scope:
+    def __init__(self):
+        self.vars_builtin = {'name': lambda: 'bob', 'mention': lambda: '<@6969>'}
+        self.vars = {'n': 3, 'greeting': 'hi there'}
+        self.args = {'$1': 'first', '$2': 'second'}
+        self.funcs = {
+            'th': lambda num: str(num) + 'th',
+            'upper': lambda text: text.upper(),
+            'join': lambda *parts: '-'.join(parts),
+        }
 
+    def evaluate_math(self, text):
+        return evaluate_math(text)
 
-def clean(token):
+    def run_script(self, code):
+        ns = dict(self.vars)
+        exec(code, {}, ns)
+        if 'updates' in ns:
+            for varname in ns['updates'].split():
+                if varname in ns:
+                    self.vars[varname] = ns[varname]
+
+
+def legacy_clean(token):
     try:
         token = int(token)
     except ValueError:
@@ -11,37 +77,19 @@ def clean(token):
         except ValueError:
             repl = r'\"'
             token = f'''"{token.replace('"', repl)}"'''
-    return token 
-
-class LunaScriptError(Exception):
-    pass
-
-class UnmatchedBracket(LunaScriptError):
-    pass
-
-class InvalidMathExpression(LunaScriptError):
-    pass 
+    return token
 
-class InvalidFunctionArgs(LunaScriptError):
-    pass 
 
-class InvalidCondition(LunaScriptError):
-    pass
-
-
-class LunaScriptParser:
-
-
-    def __init__(self):
-        self.funcs = {'th': self.th} 
-        self.vars_builtin = {'name': 'bob', 'mention': '<@6969>'}
-        self.vars = {'n': 0}
+class LegacyParser:
+    """The old parser, minus ``<s>`` blocks (their ``locals()`` trick no
+    longer works since Python 3.13)."""
 
-    def th(self, num):
-        return str(num) + 'th'
+    def __init__(self, scope):
+        self.scope = scope
 
     def parse(self, text):
-        
+        scope = self.scope
+
         def ordered_eval(string):
             string = [char for char in string]
             newstr = []
@@ -52,10 +100,8 @@ class LunaScriptParser:
                     i += 1
                     continue
                 if string[i] == '[':
-                    # find the closing bracket
                     counter = 0
                     j = i+1
-
                     found = False
                     while j < len(string):
                         if string[j] == '[' and string[j-1] != '\\':
@@ -63,29 +109,37 @@ class LunaScriptParser:
                         elif string[j] == ']' and string[j-1] != '\\':
                             if counter == 0:
                                 found = True
-                                break 
+                                break
                             else:
-                                counter -= 1 
-                        j += 1  
+                                counter -= 1
+                        j += 1
                     if not found:
-                        raise UnmatchedBracket(f'Unmatched bracket: [')
-
+                        newstr.append('[')
+                        i += 1
+                        continue
                     inside = ordered_eval(string[i+1:j])
 
+                    comp = True
                     match = re.match(r'(\d+|(?:.+?))\s*(<|<=|=<|==|=|=>|>=|>)\s*(\d+|(?:.+?)):[ ]?', inside)
                     if match is None:
-                        raise InvalidCondition(f'Invalid condition in {inside}')
-                    
-                    left = match.group(1)
-                    left = clean(left)
-                    op = match.group(2)
-                    if op == '=':
-                        op = '=='
-                    right = match.group(3)
-                    right = clean(right)
-
-                    if eval(f'{left} {op} {right}') is True:
-                        newstr.extend([char for char in inside[match.end():]])
+                        match = re.match(r'(true|false):[ ]?', inside)
+                        if match is None:
+                            newstr.append('[')
+                            i += 1
+                            continue
+                        comp = False
+
+                    if comp:
+                        left = legacy_clean(match.group(1))
+                        op = match.group(2)
+                        if op == '=':
+                            op = '=='
+                        right = legacy_clean(match.group(3))
+                        if eval(f'{left} {op} {right}') is True:
+                            newstr.extend([char for char in inside[match.end():]])
+                    else:
+                        if match.group(1) == 'true':
+                            newstr.extend([char for char in inside[match.end():]])
 
                     i += j - i + 1
                 elif string[i] == '(':
@@ -93,99 +147,70 @@ class LunaScriptParser:
                     while k >= 0 and string[k] != ' ':
                         k -= 1
                     funcname = ''.join(string[k+1:i])
-                    if funcname not in self.funcs:
+                    if funcname not in scope.funcs:
                         newstr += string[i]
                         i += 1
                         continue
-                    # find the closing bracket
                     counter = 0
                     j = i+1
                     found = False
-
                     while j < len(string):
                         if string[j] == '(':
                             counter += 1
                         elif string[j] == ')':
                             if counter == 0:
                                 found = True
-                                break 
+                                break
                             else:
-                                counter -= 1 
-                        j += 1  
+                                counter -= 1
+                        j += 1
                     if not found:
-                        raise UnmatchedBracket(f'Unmatched bracket: (')
+                        newstr.append('(')
+                        i += 1
+                        continue
 
                     inside = ordered_eval(string[i+1:j])
                     args = inside.split(',')
-                    args = [arg.strip() for arg in args]
-                    func = self.funcs[funcname]
+                    args = [arg.strip() for arg in args if arg != '']
                     try:
-                        repl = func(*args)
+                        repl = scope.funcs[funcname](*args)
                     except TypeError:
                         raise InvalidFunctionArgs(f'Invalid arguments for {funcname}: {inside}')
                     for _ in range(len(funcname)):
                         newstr.pop()
                     newstr.extend([char for char in str(repl)])
-
                     i += j - i + 1
                 elif string[i] == '$':
-                    # find next $ 
                     j = i+1
-                    found = False 
-
+                    found = False
                     while j < len(string):
                         if string[j] == '$' and string[j-1] != '\\':
                             found = True
                             break
                         j += 1
                     if not found:
-                        raise UnmatchedBracket(f'Unmatched bracket: $')
+                        newstr.append('$')
+                        i += 1
+                        continue
 
                     inside = ordered_eval(string[i+1:j])
                     try:
-                        repl = expr.evaluate(inside)
+                        repl = scope.evaluate_math(inside)
                     except Exception:
                         raise InvalidMathExpression(f'Invalid math expression: {inside}')
                     newstr.extend([char for char in str(repl)])
                     i += j - i + 1
-                elif string[i] == '<':
-                    if i >= len(string) - 2 or string[i+1].lower() != 's' or string[i+2] != '>':
-                        newstr += string[i]
-                        i += 1
-                        continue
-                    
-                    j = i+3
-                    found = False
-                    while j < len(string) - 3:
-                        if string[j:j+4] in (['<', '/', 's', '>'], ['<', '/', 'S', '>']):
-                            found = True
-                            break
-                        j += 1
-
-                    if not found:
-                        raise UnmatchedBracket(f'Unmatched bracket: <s>')
-
-                    def inner():
-                        for name, val in self.vars.items():
-                            exec(f'{name} = {val}', locals(), locals())
-                        exec(''.join(string[i+3:j]))
-                        g = locals() 
-                        print(g)
-                        if 'updates' in g:
-                            for varname in g['updates'].split():
-                                if varname in g:
-                                    self.vars[varname] = g[varname]
-                    inner()
-                    i += j - i + 4
                 elif string[i] == '{':
                     j = i+1
                     while j < len(string) and string[j] != '}':
                         j += 1
                     varname = ''.join(string[i+1:j])
-                    if varname in self.vars_builtin:
-                        repl = self.vars_builtin[varname]
-                    elif varname in self.vars:
-                        repl = self.vars[varname]
+                    if varname in scope.vars_builtin:
+                        repl = scope.vars_builtin[varname]()
+                    elif varname in scope.vars:
+                        repl = scope.vars[varname]
+                    elif varname in scope.args:
+                        repl = scope.args[varname]
                     else:
                         repl = ''
                     newstr.extend([char for char in str(repl)])
@@ -195,19 +220,165 @@ class LunaScriptParser:
                     i += 1
 
             return ''.join(newstr)
-        
+
         return ordered_eval(text)
 
-teststr = '''<s>
-n+=1
-updates = 'n'
-</s>
-hi {mention}! you are the th({n}) person to use this.
-[{n}<10: we need $10-{n}$ more to reach 10]
-[{n}>=10: we reached 10!]'''
-teststr = 'th(6)'
-
-parser = LunaScriptParser()
-for i in range(100):
-    print(parser.parse(teststr))
-print(parser.vars)
\ No newline at end of file
+
+CASES = [
+    ('plain text', 'plain text'),
+    ('hi {name}! {mention}', 'hi bob! <@6969>'),
+    ('{n} {greeting} {$1} {missing}.', '3 hi there first .'),
+    ('the th({n}) one', 'the 3th one'),
+    ('th(6)', '6th'),
+    ('upper(th(2))', '2TH'),
+    ('join(a, b,c)', 'a-b-c'),
+    ('math(1) and (brackets)', 'math(1) and (brackets)'),
+    ('$1 + 2$ and $10-{n}$', '3 and 7'),
+    ('price: $5', 'price: $5'),
+    ('[{n}<10: we need $10-{n}$ more]', 'we need 7 more'),
+    ('[{n}>=10: done]', ''),
+    ('[{n}=3: three][{n}==4: four]', 'three'),
+    ('[true: yes][false: no]', 'yes'),
+    ('[{name}=bob: hi bob]', 'hi bob'),
+    ('[{n}>1: [{n}>2: [{n}>3: deep]nested]outer]', 'nestedouter'),
+    ('[not a condition]', '[not a condition]'),
+    ('[unclosed {n}', '[unclosed 3'),
+    (r'\[{n}<10: escaped] \{n} \$1$', r'\[3<10: escaped] \{n} \$1$'),
+    ('{unclosed', ''),
+    ('[{n}>1: th($1+1$)] end', '2th end'),
+]
+
+
+def test_cases():
+    for script, expected in CASES:
+        assert evaluate(script, Scope()) == expected, script
+
+
+def test_cases_match_legacy():
+    for script, _ in CASES:
+        assert evaluate(script, Scope()) == LegacyParser(Scope()).parse(script), script
+
+
+def random_script(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(1, 6)):
+        kind = rng.choice(['text', 'text', 'var', 'func', 'math', 'cond', 'bool'])
+        if depth > 3:
+            kind = rng.choice(['text', 'var'])
+
+        if kind == 'text':
+            parts.append(rng.choice(['hello ', 'a b ', 'x', ' ', 'end.', '(x) ', 'yes, no ']))
+        elif kind == 'var':
+            parts.append('{' + rng.choice(['n', 'name', 'greeting', '$1', 'nope']) + '}')
+        elif kind == 'func':
+            name = rng.choice(['th', 'upper', 'join'])
+            parts.append(f' {name}({random_script(rng, depth + 1)})')
+        elif kind == 'math':
+            parts.append(f'${rng.randint(0, 9)}+{{n}}*{rng.randint(0, 9)}$')
+        elif kind == 'cond':
+            op = rng.choice(['<', '>', '=', '==', '>='])
+            parts.append(f'[{{n}}{op}{rng.randint(0, 6)}: {random_script(rng, depth + 1)}]')
+        else:
+            parts.append(f'[{rng.choice(["true", "false"])}: {random_script(rng, depth + 1)}]')
+    return ''.join(parts)
+
+
+def test_random_scripts_match_legacy():
+    rng = random.Random(0)
+    for _ in range(500):
+        script = random_script(rng)
+        try:
+            expected = LegacyParser(Scope()).parse(script)
+        except InvalidFunctionArgs:
+            continue
+        assert evaluate(script, Scope()) == expected, script
+
+
+def test_script_blocks():
+    scope = Scope()
+    script = '<s>\nn += 1\nupdates = "n"\n</s>you are the th({n}) one'
+    assert evaluate(script, scope) == 'you are the 4th one'
+    assert evaluate(script, scope) == 'you are the 5th one'
+    assert scope.vars['n'] == 5
+
+    indented = '''<S>
+    greeting = greeting.upper()
+    updates = 'greeting'
+    </S>{greeting}'''
+    assert evaluate(indented, scope) == 'HI THERE'
+
+
+def test_errors():
+    for script, error in [
+        ('<s>n = 1', UnmatchedBracket),
+        ('th(1, 2)', InvalidFunctionArgs),
+        ('$1 +$', InvalidMathExpression),
+    ]:
+        try:
+            evaluate(script, Scope())
+        except error:
+            pass
+        else:
+            raise AssertionError(f'{script} should raise {error.__name__}')
+
+
+def test_compiled_scripts_are_cached():
+    names = frozenset(Scope().funcs)
+    script = 'hi {name}, [{n}>1: th({n})]'
+    assert compile_script(script, names) is compile_script(script, names)
+
+
+def test_constant_conditions_are_folded():
+    names = frozenset(Scope().funcs)
+    assert compile_script('a [1<2: b] [true: c][2<1: d] e', names) == ('a b c e',)
+
+
+def test_brackets_are_evaluated_once():
+    # the old parser re-scanned a bracket that wasn't a condition, which
+    # ran its contents twice and lost functions right after the '['
+    assert evaluate('[th(5)]', Scope()) == '[5th]'
+
+
+def nested_script(width, depth):
+    if depth == 0:
+        return 'hi {name}, the th({n}) $1+{n}$ '
+    inner = nested_script(width, depth - 1)
+    return ' '.join(f'[{{n}}>{i}: {inner}]' for i in range(width))
+
+
+def benchmark(n):
+    scope = Scope()
+    scripts = [nested_script(3, depth) for depth in range(1, 5)]
+    names = frozenset(scope.funcs)
+
+    for script in scripts:
+        legacy = LegacyParser(scope)
+        start = time.perf_counter()
+        for _ in range(n):
+            legacy.parse(script)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(n):
+            compile_script.cache_clear()
+            evaluate(script, scope)
+        cold_time = time.perf_counter() - start
+
+        compile_script(script, names)
+        start = time.perf_counter()
+        for _ in range(n):
+            evaluate(script, scope)
+        cached_time = time.perf_counter() - start
+
+        print(
+            f'{len(script):>7} chars  legacy {n / legacy_time:9.1f}/s  '
+            f'cold {n / cold_time:9.1f}/s  cached {n / cached_time:9.1f}/s'
+        )
+
+
+if __name__ == '__main__':
+    tests = [func for name, func in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+    print(f'{len(tests)} tests passed')
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
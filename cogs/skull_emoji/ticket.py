@@ -1,4 +1,3 @@
-import json 
 import discord 
 from discord.ext import commands 
 from discord import ui 
@@ -6,7 +5,7 @@ import time
 import asyncio 
 from datetime import timedelta, datetime
 from .utils import View
-from io import StringIO
+from cogs.utils import replace_transcript, transcript_file
 
 from typing import TYPE_CHECKING
 
@@ -67,12 +66,7 @@ class CloseView(View):
                 'content': msg.content,
                 'attachments': attachments
             })
-        query = """INSERT INTO
-                       ticket_transcripts (ticket_id, opener_id, messages)
-                   VALUES
-                       ($1, $2, $3)
-                """
-        await self.bot.db.execute(query, self.ticket_id, self.opener_id, json.dumps(msg_objs, indent=4))
+        await replace_transcript(self.bot.db, self.ticket_id, self.opener_id, msg_objs)
 
     async def interaction_check(self, inter):
         if inter.user.id == self.bot.owner_id:
@@ -228,20 +222,7 @@ class TicketCog(commands.Cog, name='Tickets', description='a few sketchy admin-o
     
     
     async def get_txt_file(self, ticket_id):
-        query = 'SELECT messages FROM ticket_transcripts WHERE ticket_id = $1'
-        row = await self.bot.db.fetchrow(query, ticket_id)
-        if not row:
-            return None
-        msgs = json.loads(row['messages'])
-        output = StringIO()
-        for msg in msgs:
-            output.write(f'{msg["username"]} ({msg["author_id"]}): {msg["content"]}\n')
-            for a in msg['attachments']:
-                output.write(f'  {a}\n')
-            output.write('\n')
-        
-        output.seek(0)
-        return discord.File(output, filename=f'transcript-{ticket_id}.txt')
+        return await transcript_file(self.bot.db, ticket_id)
 
 
     async def cog_check(self, ctx):
@@ -18,9 +18,62 @@ from typing import Optional
 # Custom rust module
 from fuzzy_rust import extract_bests
 
+try:
+    from fuzzy_rust import FuzzyIndex
+except ImportError:
+    # the extension was built before FuzzyIndex existed
+    FuzzyIndex = None
+
 MOLLY_ID = 675058943596298340
 
 
+class TermIndex:
+    """Stand-in for ``fuzzy_rust.FuzzyIndex`` on older builds of the
+    extension. Same interface, but every query scores the full term list
+    with ``extract_bests``."""
+
+    def __init__(self, items=None):
+        self.terms: dict[int, list[str]] = dict(items or ())
+
+    def add(self, id: int, terms: list[str]):
+        self.terms[id] = terms
+
+    def update(self, id: int, terms: list[str]) -> bool:
+        if id not in self.terms:
+            return False
+        self.terms[id] = terms
+        return True
+
+    def remove(self, id: int) -> bool:
+        return self.terms.pop(id, None) is not None
+
+    def extract_bests(self, query: str, limit: int) -> list[tuple[int, int]]:
+        owners: dict[str, list[int]] = {}
+        for id, terms in self.terms.items():
+            for term in terms:
+                owners.setdefault(term, []).append(id)
+
+        best: dict[int, int] = {}
+        for term, score in extract_bests(query, list(owners), len(owners)):
+            for id in owners[term]:
+                best[id] = max(best.get(id, score), score)
+
+        results = sorted(best.items(), key=lambda r: (-r[1], r[0]))
+        return results[:limit]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, id: int):
+        return id in self.terms
+
+
+def member_terms(member: discord.Member) -> list[str]:
+    terms = {member.display_name, member.global_name, member.name}
+    terms.discard(None)
+    return list(terms)
+
+
 def is_luna_or_molly():
     async def predicate(ctx: commands.Context):
         if ctx.author.id not in [
@@ -42,6 +95,16 @@ class Staff(commands.Cog):
     def __init__(self, bot):
         self.bot: "LunaBot" = bot
         self.role_lock = True
+        self.member_indexes: dict[int, "FuzzyIndex | TermIndex"] = {}
+
+    def get_member_index(self, guild: discord.Guild) -> "FuzzyIndex | TermIndex":
+        # built on first use, kept up to date by the member listeners below
+        index = self.member_indexes.get(guild.id)
+        if index is None:
+            cls = FuzzyIndex or TermIndex
+            index = cls([(m.id, member_terms(m)) for m in guild.members])
+            self.member_indexes[guild.id] = index
+        return index
 
     async def cog_check(self, ctx):
         return (
@@ -51,61 +114,29 @@ class Staff(commands.Cog):
     @commands.command()
     async def userlookup(self, ctx, limit: Optional[int] = 5, *, query: str):
         t1 = time.perf_counter()
-        search_terms = {}
-
-        # Gather search terms and allow multiple users with the same name
-        def slop():
-            for m in ctx.guild.members:
-                terms = [m.display_name, m.global_name, m.name]
-                for term in terms:
-                    if term:  # Ensure term is not None
-                        if term in search_terms:
-                            search_terms[term].append(m)
-                        else:
-                            search_terms[term] = [m]
-
-        await asyncio.to_thread(slop)
-
+        index = self.get_member_index(ctx.guild)
         t2 = time.perf_counter()
 
-        # Perform Rust-based fuzzy matching
-        results = await asyncio.to_thread(
-            extract_bests,
-            query,
-            list(search_terms.keys()),
-            limit,
-        )
-
-        # slow python-based
-        # results = await asyncio.to_thread(
-        #     process.extract,
-        #     query,
-        #     search_terms.keys(),
-        #     limit=limit,
-        # )
+        # Perform Rust-based fuzzy matching, best term per member
+        results = await asyncio.to_thread(index.extract_bests, query, limit)
 
         t3 = time.perf_counter()
         embed = discord.Embed(title="Best Matches", color=self.bot.DEFAULT_EMBED_COLOR)
 
         desc = []
-        seen = set()
-        for x in results:
-            name = x[0]
-            for member in search_terms[
-                name
-            ]:  # Append all members with the matching name
-                if member in seen:
-                    continue
-                seen.add(member)
-                desc.append(
-                    f"{member.mention} (`{member.name}` a.k.a. {member.display_name})"
-                )
+        for member_id, _ in results:
+            member = ctx.guild.get_member(member_id)
+            if member is None:
+                continue
+            desc.append(
+                f"{member.mention} (`{member.name}` a.k.a. {member.display_name})"
+            )
 
         embed.description = "\n".join(desc)
         t4 = time.perf_counter()
         if ctx.author.id == self.bot.owner_id:
             await ctx.send(
-                f"search_terms={len(search_terms)}, preprocess={(t2 - t1):.2f}, fuzzy={(t3 - t2):.2f}, postprocess={(t4 - t3):.2f}"
+                f"members={len(index)}, preprocess={(t2 - t1) * 1000:.2f}ms, fuzzy={(t3 - t2) * 1000:.2f}ms, postprocess={(t4 - t3) * 1000:.2f}ms"
             )
 
         await ctx.send(embed=embed)
@@ -194,6 +225,36 @@ class Staff(commands.Cog):
         await asyncio.sleep(1)
         self.role_lock = True
 
+    @commands.Cog.listener("on_member_join")
+    async def add_indexed_member(self, member: discord.Member):
+        index = self.member_indexes.get(member.guild.id)
+        if index is not None:
+            index.add(member.id, member_terms(member))
+
+    @commands.Cog.listener("on_raw_member_remove")
+    async def remove_indexed_member(self, payload: discord.RawMemberRemoveEvent):
+        index = self.member_indexes.get(payload.guild_id)
+        if index is not None:
+            index.remove(payload.user.id)
+
+    @commands.Cog.listener("on_member_update")
+    async def update_indexed_member(
+        self, before: discord.Member, after: discord.Member
+    ):
+        index = self.member_indexes.get(after.guild.id)
+        if index is not None and before.display_name != after.display_name:
+            index.update(after.id, member_terms(after))
+
+    @commands.Cog.listener("on_user_update")
+    async def update_indexed_user(self, before: discord.User, after: discord.User):
+        if before.name == after.name and before.global_name == after.global_name:
+            return
+        for guild_id, index in self.member_indexes.items():
+            guild = self.bot.get_guild(guild_id)
+            member = guild and guild.get_member(after.id)
+            if member is not None:
+                index.update(member.id, member_terms(member))
+
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
         if self.bot.vars.get("role-protection") == 0:
@@ -5,7 +5,13 @@ from discord.ext import commands
 
 from bot import LunaBot
 
-from .utils import Layout, LayoutChooserOrEditor, SimplePages
+from .utils import (
+    Layout,
+    LayoutChooserOrEditor,
+    MessageView,
+    SimplePages,
+    message_handler,
+)
 
 # TODO: turn sm into a group
 
@@ -45,17 +51,9 @@ class StickyMessages(commands.Cog):
                 self.bot, row
             )
 
-    @commands.Cog.listener()
-    async def on_message(self, msg):
-        if msg.author.bot:
-            return
-
-        if msg.channel.id not in self.sticky_messages:
-            return
-
-        sm = discord.utils.find(
-            lambda sm: sm.channel == msg.channel, self.sticky_messages.values()
-        )
+    @message_handler(guild_only=False, channels=[lambda cog: cog.sticky_messages])
+    async def handle_message(self, msg: discord.Message, view: MessageView):
+        sm = self.sticky_messages[msg.channel.id]
         new_message = await sm.layout.send(msg.channel)
         old_message_id = sm.last_message_id
         sm.last_message_id = new_message.id
@@ -93,6 +91,7 @@ class StickyMessages(commands.Cog):
         await self.bot.db.execute(query, channel.id, view.layout.to_json())
         sm = StickyMessage(self.bot, channel, view.layout, None)
         self.sticky_messages[channel.id] = sm
+        self.bot.messages.invalidate()
 
         await ctx.send("Successfully added the sticky message.")
 
@@ -108,6 +107,7 @@ class StickyMessages(commands.Cog):
                 """
         await self.bot.db.execute(query, channel.id)
         del self.sticky_messages[channel.id]
+        self.bot.messages.invalidate()
         await ctx.send("Successfully removed the sticky message.")
 
     @commands.command()
@@ -1,7 +1,6 @@
-import json
+import asyncio
 import logging
-from datetime import datetime
-from io import StringIO
+from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING, Optional
 
 import dateparser
@@ -9,7 +8,17 @@ import discord
 from discord import ui
 from discord.ext import commands, tasks
 
-from .utils import View, admin_only, staff_only
+from .utils import (
+    MessageView,
+    TranscriptPageSource,
+    View,
+    ViewMenuPages,
+    admin_only,
+    count_transcript,
+    message_handler,
+    staff_only,
+    transcript_file,
+)
 
 if TYPE_CHECKING:
     from bot import LunaBot, LunaCtx
@@ -18,15 +27,17 @@ if TYPE_CHECKING:
 class Ticket:
     def __init__(
         self,
-        opener: discord.Member,
+        opener: discord.abc.Snowflake,
         timestamp: datetime,
         id: Optional[int] = None,
         thread: Optional[discord.Thread] = None,
+        last_activity: Optional[datetime] = None,
     ):
         self.opener = opener
         self.timestamp = timestamp
         self.id: Optional[int] = id
         self.thread: Optional[discord.Thread] = thread
+        self.last_activity: datetime = last_activity or timestamp
 
 
 class TicketView(ui.View):
@@ -142,6 +153,8 @@ class TicketTypeMenu(View):
             ticket.opener.id,
             ticket.timestamp.timestamp(),
         )
+        self.bot.tickets[ticket.thread] = ticket
+        self.bot.messages.invalidate()
         # view = CloseView(self.bot, ticket.id, ticket.channel, ticket.opener.id, ticket.timestamp)
 
         choice = self.ticket_type.values[0]
@@ -184,22 +197,94 @@ class TicketTypeMenu(View):
 
 
 REMIND_GAP = 86400 * 7
+INACTIVE_AFTER = timedelta(days=1)
 
 
 class TicketCog(commands.Cog, name="Tickets v2", description="thread tickets"):
     def __init__(self, bot):
         self.bot: "LunaBot" = bot
+        # tickets with activity that hasn't been written yet
+        self.active: set[Ticket] = set()
+        self.loaded = asyncio.Event()
 
     async def cog_load(self):
         self.bot.add_view(TicketView(self.bot))
+        self.bot.loop.create_task(self.load_tickets())
+        self.flush_activity.start()
         self.remind_inactive.start()
 
     async def cog_unload(self):
         self.remind_inactive.cancel()
+        self.flush_activity.cancel()
+        await self.write_activity()
+
+    async def load_tickets(self):
+        # threads are only cached once the bot is ready
+        await self.bot.wait_until_ready()
+
+        rows = await self.bot.db.fetch("SELECT * FROM active_tickets")
+        for row in rows:
+            thread = self.bot.get_channel(row["channel_id"])
+            if not isinstance(thread, discord.Thread):
+                continue
+
+            ticket = Ticket(
+                discord.Object(row["opener_id"]),
+                datetime.fromtimestamp(row["timestamp"], timezone.utc),
+                row["ticket_id"],
+                thread,
+                row["last_activity"],
+            )
+            # catch up on messages sent while the bot was offline
+            if thread.last_message_id is not None:
+                last = discord.utils.snowflake_time(thread.last_message_id)
+                if last > ticket.last_activity:
+                    ticket.last_activity = last
+                    self.active.add(ticket)
+            self.bot.tickets[thread] = ticket
+
+        self.bot.messages.invalidate()
+        self.loaded.set()
+
+    @message_handler(
+        bots=True,
+        channels=[lambda cog: (t.id for t in cog.bot.tickets)],
+    )
+    async def track_activity(self, msg: discord.Message, view: MessageView):
+        ticket = self.bot.tickets.get(msg.channel)  # type: ignore
+        if ticket is None:
+            return
+
+        ticket.last_activity = msg.created_at
+        self.active.add(ticket)
+
+    async def write_activity(self):
+        if not self.active:
+            return
+
+        tickets, self.active = self.active, set()
+        query = "UPDATE active_tickets SET last_activity = $1 WHERE channel_id = $2"
+        await self.bot.db.executemany(
+            query, [(t.last_activity, t.thread.id) for t in tickets]
+        )
+
+    @tasks.loop(minutes=1)
+    async def flush_activity(self):
+        await self.write_activity()
 
     @tasks.loop(hours=1)
     async def remind_inactive(self):
-        rows = await self.bot.db.fetch("SELECT * FROM active_tickets")
+        await self.write_activity()
+
+        query = """SELECT
+                       *
+                   FROM
+                       active_tickets
+                   WHERE
+                       remind_after <= NOW()
+                       AND last_activity < $1
+                """
+        rows = await self.bot.db.fetch(query, discord.utils.utcnow() - INACTIVE_AFTER)
         for row in rows:
             channel = self.bot.get_channel(row["channel_id"])
 
@@ -210,20 +295,6 @@ class TicketCog(commands.Cog, name="Tickets v2", description="thread tickets"):
 
             assert isinstance(channel, discord.Thread)
 
-            hist = [msg async for msg in channel.history(limit=1, oldest_first=False)]
-            if len(hist) == 0:
-                self.bot.log(f"message history for {channel.jump_url} empty", "ticket")
-                continue
-
-            last_msg = hist[0]
-            if (discord.utils.utcnow() - last_msg.created_at).total_seconds() < 86400:
-                continue
-            if (
-                row["remind_after"] is None
-                or row["remind_after"] > discord.utils.utcnow()
-            ):
-                continue
-
             layout = self.bot.get_layout("ticketreminder")
             # pings = [u.mention for u in await channel.fetch_members()]
             await layout.send(channel, repls={"pings": "@everyone"})
@@ -235,21 +306,14 @@ class TicketCog(commands.Cog, name="Tickets v2", description="thread tickets"):
                 channel.id,
             )
 
+    @flush_activity.before_loop
+    @remind_inactive.before_loop
+    async def wait_for_tickets(self):
+        # activity from before the restart is only known once loaded
+        await self.loaded.wait()
+
     async def get_txt_file(self, ticket_id):
-        query = "SELECT messages FROM ticket_transcripts WHERE ticket_id = $1"
-        row = await self.bot.db.fetchrow(query, ticket_id)
-        if not row:
-            return None
-        msgs = json.loads(row["messages"])
-        output = StringIO()
-        for msg in msgs:
-            output.write(f"{msg['username']} ({msg['author_id']}): {msg['content']}\n")
-            for a in msg["attachments"]:
-                output.write(f"  {a}\n")
-            output.write("\n")
-
-        output.seek(0)
-        return discord.File(output, filename=f"transcript-{ticket_id}.txt")
+        return await transcript_file(self.bot.db, ticket_id)
 
     # async def cog_check(self, ctx):
     #     return ctx.author.id == self.bot.owner_id or ctx.author.guild_permissions.administrator
@@ -266,6 +330,21 @@ class TicketCog(commands.Cog, name="Tickets v2", description="thread tickets"):
             return
         await ctx.send(file=file)
 
+    @commands.command(aliases=["vt"])
+    @staff_only()
+    async def viewtranscript(self, ctx, ticket_id: int):
+        total = await count_transcript(self.bot.db, ticket_id)
+        if total is None:
+            return await ctx.send("No transcript found for that ticket.")
+
+        embed = discord.Embed(
+            title=f"Ticket {ticket_id} Transcript",
+            color=self.bot.DEFAULT_EMBED_COLOR,
+        )
+        source = TranscriptPageSource(self.bot.db, ticket_id, total, embed)
+        view = ViewMenuPages(source, ctx=ctx)
+        await view.start()
+
     @commands.command()
     @admin_only()
     async def sendticketembed(
@@ -297,6 +376,9 @@ class TicketCog(commands.Cog, name="Tickets v2", description="thread tickets"):
 
         query = "DELETE FROM active_tickets WHERE channel_id = $1"
         await self.bot.db.execute(query, ctx.channel.id)
+        ticket = self.bot.tickets.pop(ctx.channel, None)
+        self.active.discard(ticket)
+        self.bot.messages.invalidate()
 
         await ctx.send("Ticked closed!")
         await ctx.channel.edit(archived=True, locked=True)
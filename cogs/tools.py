@@ -376,6 +376,24 @@ class Tools(commands.Cog, description="storchs tools"):
 
         await ctx.send(f"Sticker `{sticker.name}` created.")
 
+    @commands.group(invoke_without_command=True)
+    async def jobs(self, ctx):
+        """shows running bulk member jobs"""
+        lines = [job.progress() for job in self.bot.jobs.running.values()]
+        if not lines:
+            return await ctx.send("No jobs running.")
+
+        await ctx.send("\n".join(lines))
+
+    @jobs.command(name="cancel")
+    async def jobs_cancel(self, ctx, job_id: int):
+        job = self.bot.jobs.get(job_id)
+        if job is None:
+            return await ctx.send("No running job with that id.")
+
+        job.cancel()
+        await ctx.send(f"Cancelled job #{job_id}.")
+
     @commands.command()
     async def grabtimestamp(self, ctx, obj: Union[discord.Message]):
         await ctx.send(obj.created_at.timestamp())
@@ -438,6 +456,51 @@ class Tools(commands.Cog, description="storchs tools"):
         view = DTStyleChooser(ctx, mds)
         view.message = await ctx.send(content, view=view)
 
+    @commands.command(aliases=["hstats"])
+    async def handlerstats(self, ctx, reset: bool = False):
+        """Shows how long each message handler takes per message."""
+        if reset:
+            self.bot.messages.reset_stats()
+            return await ctx.send("Reset message handler stats.")
+
+        handlers = sorted(
+            self.bot.messages.handlers, key=lambda h: h.stats.total, reverse=True
+        )
+        lines = [f"{'handler':<36}{'calls':>8}{'avg ms':>9}{'max ms':>9}{'errs':>6}"]
+        for h in handlers:
+            s = h.stats
+            lines.append(
+                f"{h.name[:35]:<36}{s.calls:>8}{s.average * 1000:>9.2f}"
+                f"{s.max * 1000:>9.1f}{s.errors:>6}"
+            )
+        await ctx.send("```\n" + "\n".join(lines) + "```")
+
+    @commands.command()
+    async def buffers(self, ctx):
+        """Shows the queue depth and flush latency of the write buffers."""
+        if not self.bot.buffers:
+            return await ctx.send("No write buffers are running.")
+
+        embed = discord.Embed(title="Write buffers", color=self.bot.DEFAULT_EMBED_COLOR)
+        for buffer in sorted(self.bot.buffers, key=lambda b: b.table):
+            if buffer.last_flush_at is None:
+                last = "never"
+            else:
+                last = discord.utils.format_dt(buffer.last_flush_at, "R")
+            embed.add_field(
+                name=buffer.table,
+                value=(
+                    f"**Queued:** {buffer.depth}\n"
+                    f"**Last flush:** {last} "
+                    f"({buffer.last_flush_size} rows, {buffer.last_flush_latency * 1000:.1f}ms)\n"
+                    f"**Total flushed:** {buffer.total_flushed}\n"
+                    f"**Failed flushes:** {buffer.failed_flushes}\n"
+                    f"**Dropped rows:** {buffer.dropped}"
+                ),
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def cleanroles(self, ctx):
         roles = ctx.guild.roles
@@ -491,6 +554,7 @@ class Tools(commands.Cog, description="storchs tools"):
                    DROP TABLE saved_powerups;
                    DROP TABLE event_stats;
                    DROP TABLE event_log;
+                   DROP TABLE event_player_totals;
                    DROP TABLE powerups;
                    DROP TABLE event_dailies;
                 """
@@ -1,11 +1,18 @@
+from .buffers import *
 from .checks import *
 from .converters import *
+from .cooldowns import *
 from .errors import *
 from .helpers import *
 from .imaging import *
+from .jobs import *
 from .paginators import *
+from .plotting import *
+from .scheduler import *
 from .time_stuff import *
+from .transcripts import *
 from .views import *
+from .dispatch import *
 
 from cogs.embeds.editor import *
 from cogs.layouts.layout import *
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Sequence
+
+import discord
+
+if TYPE_CHECKING:
+    from bot import LunaBot
+
+__all__ = ("CopyBuffer",)
+
+
+class CopyBuffer:
+    """Collects rows in memory and writes them to a table with COPY.
+
+    A flush happens every ``interval`` seconds, as soon as ``max_rows`` rows
+    are queued, and when the buffer is closed. Rows from a failed flush are
+    put back at the front of the queue so the next flush retries them; past
+    ``max_queued`` rows (e.g. while the database is down) the oldest rows
+    are dropped.
+    """
+
+    def __init__(
+        self,
+        bot: LunaBot,
+        table: str,
+        columns: Sequence[str],
+        *,
+        max_rows: int = 500,
+        max_queued: int | None = None,
+        interval: float = 10,
+    ):
+        self.bot = bot
+        self.table = table
+        self.columns = list(columns)
+        self.max_rows = max_rows
+        self.max_queued = max_queued or max_rows * 20
+        self.interval = interval
+
+        self.rows: list[tuple[Any, ...]] = []
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task | None = None
+        self.pending: asyncio.Task | None = None
+
+        self.total_flushed = 0
+        self.last_flush_size = 0
+        self.last_flush_latency = 0.0
+        self.last_flush_at: datetime | None = None
+        self.failed_flushes = 0
+        self.dropped = 0
+        # while flushes fail, only the interval loop retries
+        self.failing = False
+
+        self.bot.buffers.add(self)
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._try_flush()
+
+    async def _try_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.warning(f"Flushing {self.table} failed: {e}")
+
+    def _trim(self):
+        over = len(self.rows) - self.max_queued
+        if over > 0:
+            del self.rows[:over]
+            self.dropped += over
+            logging.warning(f"Dropped {over} queued rows for {self.table}")
+
+    def add(self, *row: Any):
+        self.rows.append(row)
+        self._trim()
+        if len(self.rows) < self.max_rows or self.lock.locked() or self.failing:
+            return
+        if self.pending is None or self.pending.done():
+            self.pending = self.bot.loop.create_task(self._try_flush())
+
+    async def flush(self) -> int:
+        async with self.lock:
+            if not self.rows:
+                return 0
+
+            rows, self.rows = self.rows, []
+            start = time.perf_counter()
+            try:
+                await self.write(rows)
+            except Exception:
+                self.failed_flushes += 1
+                self.failing = True
+                self.rows[:0] = rows
+                self._trim()
+                raise
+
+            self.failing = False
+            self.last_flush_latency = time.perf_counter() - start
+            self.last_flush_size = len(rows)
+            self.last_flush_at = discord.utils.utcnow()
+            self.total_flushed += len(rows)
+            return len(rows)
+
+    async def write(self, rows: list[tuple[Any, ...]]):
+        """Writes one batch, subclasses can extend this to update derived tables."""
+        await self.bot.db.copy_records_to_table(
+            self.table, records=rows, columns=self.columns
+        )
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.pending is not None and not self.pending.done():
+            await self.pending
+        try:
+            await self.flush()
+        finally:
+            self.bot.buffers.discard(self)
+
+    @property
+    def depth(self) -> int:
+        return len(self.rows)
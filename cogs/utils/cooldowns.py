@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot import LunaBot
+
+__all__ = ("CooldownStore",)
+
+
+CooldownKey = tuple[str, int | None]
+
+
+class CooldownEntry:
+    __slots__ = ("bucket", "end", "count")
+
+    def __init__(self, bucket: str, end: float, count: int):
+        self.bucket = bucket
+        self.end = end
+        self.count = count
+
+    @property
+    def end_time(self) -> datetime:
+        return datetime.fromtimestamp(self.end, tz=timezone.utc)
+
+
+class CooldownStore:
+    """Keeps ``(action, object)`` cooldown windows in memory.
+
+    A window starts on first use and allows ``rate`` uses until it ends.
+    Expired windows are evicted through a heap ordered by end time, and the
+    live windows are snapshotted to the ``cooldowns`` table so they survive
+    restarts.
+    """
+
+    def __init__(self, bot: LunaBot, *, snapshot_interval: float = 60):
+        self.bot = bot
+        self.snapshot_interval = snapshot_interval
+        self.entries: dict[CooldownKey, CooldownEntry] = {}
+        self.heap: list[tuple[float, CooldownKey]] = []
+        self.dirty = False
+        self.task: asyncio.Task | None = None
+        self.lock = asyncio.Lock()
+
+    async def load(self):
+        query = """SELECT action, object_id, bucket, end_time, count
+                   FROM cooldowns
+                   WHERE end_time > NOW()
+                """
+        rows = await self.bot.db.fetch(query)
+        for row in rows:
+            key = (row["action"], row["object_id"])
+            end = row["end_time"].timestamp()
+            self.entries[key] = CooldownEntry(row["bucket"], end, row["count"])
+            heapq.heappush(self.heap, (end, key))
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self._snapshot_loop())
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            self.evict()
+            try:
+                await self.snapshot()
+            except Exception as e:
+                logging.warning(f"Cooldown snapshot failed: {e}")
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.evict()
+        await self.snapshot()
+
+    def evict(self, now: float | None = None) -> int:
+        if now is None:
+            now = time.time()
+
+        evicted = 0
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            end, key = heapq.heappop(heap)
+            entry = self.entries.get(key)
+            # the window might have been re-armed since this item was pushed
+            if entry is not None and entry.end == end:
+                del self.entries[key]
+                evicted += 1
+
+        if evicted:
+            self.dirty = True
+        return evicted
+
+    def hit(
+        self,
+        action: str,
+        obj_id: int | None,
+        bucket: str,
+        duration: float,
+        *,
+        rate: int = 1,
+        update: bool = True,
+    ) -> datetime | None:
+        """Uses one slot of the cooldown and returns its end time if it's full."""
+        key = (action, obj_id)
+        now = time.time()
+        entry = self.entries.get(key)
+
+        if entry is not None and entry.end > now:
+            if entry.count >= rate:
+                return entry.end_time
+            entry.count += 1
+            self.dirty = True
+            return None
+
+        if update:
+            end = now + duration
+            self.entries[key] = CooldownEntry(bucket, end, 1)
+            heapq.heappush(self.heap, (end, key))
+            self.dirty = True
+
+        return None
+
+    async def snapshot(self):
+        async with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+
+            records = [
+                (action, obj_id, entry.bucket, entry.end_time, entry.count)
+                for (action, obj_id), entry in self.entries.items()
+            ]
+            try:
+                async with self.bot.db.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute("DELETE FROM cooldowns")
+                        await conn.copy_records_to_table(
+                            "cooldowns",
+                            records=records,
+                            columns=(
+                                "action",
+                                "object_id",
+                                "bucket",
+                                "end_time",
+                                "count",
+                            ),
+                        )
+            except Exception:
+                self.dirty = True
+                raise
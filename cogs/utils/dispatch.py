@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Iterable
+
+import discord
+from discord.ext import commands
+
+if TYPE_CHECKING:
+    from bot import LunaBot
+
+__all__ = ("message_handler", "MessageView", "MessageDispatcher", "HandlerStats")
+
+
+ChannelSource = int | str | Callable[[Any], Iterable[int]]
+HandlerFunc = Callable[[discord.Message, "MessageView"], Coroutine[Any, Any, Any]]
+
+
+@dataclass
+class HandlerFilter:
+    guild_only: bool = True
+    main_guild: bool = False
+    channels: tuple[ChannelSource, ...] | None = None
+    bots: bool = False
+    verified: bool = False
+
+
+def message_handler(
+    *,
+    guild_only: bool = True,
+    main_guild: bool = False,
+    channels: Iterable[ChannelSource] | None = None,
+    bots: bool = False,
+    verified: bool = False,
+):
+    """Marks a cog method as a handler for the bot's message dispatcher.
+
+    ``channels`` can hold raw channel IDs, names of channel vars
+    (e.g. ``"general-channel-id"``) or callables that take the cog and
+    return channel IDs. Call ``bot.messages.invalidate()`` whenever the
+    result of one of those callables changes.
+
+    The decorated method is called as ``handler(msg, view)``.
+    """
+
+    def decorator(func):
+        func.__message_handler__ = HandlerFilter(
+            guild_only=guild_only,
+            main_guild=main_guild,
+            channels=tuple(channels) if channels is not None else None,
+            bots=bots,
+            verified=verified,
+        )
+        return func
+
+    return decorator
+
+
+class MessageView:
+    """Per-message values that are computed at most once for all handlers."""
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+
+    @cached_property
+    def lower(self) -> str:
+        return self.message.content.lower()
+
+    @cached_property
+    def tokens(self) -> list[str]:
+        return self.lower.split()
+
+    @cached_property
+    def token_set(self) -> frozenset[str]:
+        return frozenset(self.tokens)
+
+    @cached_property
+    def mention_ids(self) -> frozenset[int]:
+        return frozenset(u.id for u in self.message.mentions)
+
+    @cached_property
+    def role_ids(self) -> frozenset[int]:
+        """Same IDs as ``Member.roles``, including the default role."""
+        author = self.message.author
+        if not isinstance(author, discord.Member):
+            return frozenset()
+        return frozenset(author._roles) | {author.guild.id}
+
+
+@dataclass
+class HandlerStats:
+    calls: int = 0
+    errors: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def average(self) -> float:
+        if self.calls == 0:
+            return 0.0
+        return self.total / self.calls
+
+
+@dataclass
+class Handler:
+    name: str
+    cog: commands.Cog
+    func: HandlerFunc
+    filter: HandlerFilter
+    stats: HandlerStats = field(default_factory=HandlerStats)
+
+
+class MessageDispatcher:
+    """Runs every registered message handler for a message, each in its own
+    task, sharing one ``MessageView``.
+
+    Handlers that are restricted to channels are looked up through a
+    channel -> handlers index, so a message only touches the handlers that
+    could possibly care about it.
+    """
+
+    def __init__(self, bot: LunaBot):
+        self.bot = bot
+        self.handlers: list[Handler] = []
+        self._index: dict[int, list[Handler]] | None = None
+        self._global: list[Handler] = []
+
+    def register_cog(self, cog: commands.Cog):
+        for name in dir(type(cog)):
+            attr = getattr(type(cog), name, None)
+            handler_filter = getattr(attr, "__message_handler__", None)
+            if handler_filter is None:
+                continue
+
+            self.handlers.append(
+                Handler(
+                    f"{cog.qualified_name}.{name}",
+                    cog,
+                    getattr(cog, name),
+                    handler_filter,
+                )
+            )
+        self.invalidate()
+
+    def unregister_cog(self, cog: commands.Cog):
+        self.handlers = [h for h in self.handlers if h.cog is not cog]
+        self.invalidate()
+
+    def invalidate(self):
+        self._index = None
+
+    def _resolve_channels(self, handler: Handler) -> set[int]:
+        assert handler.filter.channels is not None
+
+        ids = set()
+        for source in handler.filter.channels:
+            if isinstance(source, int):
+                ids.add(source)
+            elif isinstance(source, str):
+                value = self.bot.vars.get(source)
+                if isinstance(value, int):
+                    ids.add(value)
+            else:
+                ids.update(source(handler.cog))
+        return ids
+
+    def _build_index(self) -> dict[int, list[Handler]]:
+        index: dict[int, list[Handler]] = {}
+        self._global = []
+
+        for handler in self.handlers:
+            if handler.filter.channels is None:
+                self._global.append(handler)
+                continue
+            for channel_id in self._resolve_channels(handler):
+                index.setdefault(channel_id, []).append(handler)
+
+        # keep registration order when a channel has scoped and global handlers
+        order = {id(h): i for i, h in enumerate(self.handlers)}
+        for handlers in index.values():
+            handlers.extend(self._global)
+            handlers.sort(key=lambda h: order[id(h)])
+
+        self._index = index
+        return index
+
+    def _passes(self, handler: Handler, msg: discord.Message) -> bool:
+        f = handler.filter
+        if not f.bots and msg.author.bot:
+            return False
+        if f.guild_only and msg.guild is None:
+            return False
+        if f.main_guild and (msg.guild is None or msg.guild.id != self.bot.GUILD_ID):
+            return False
+        if f.verified:
+            role_id = self.bot.vars.get("verified-role-id")
+            if not isinstance(msg.author, discord.Member) or role_id is None:
+                return False
+            if msg.author.get_role(int(role_id)) is None:
+                return False
+        return True
+
+    def handlers_for(self, msg: discord.Message) -> list[Handler]:
+        index = self._index
+        if index is None:
+            index = self._build_index()
+        return index.get(msg.channel.id, self._global)
+
+    async def _run(self, handler: Handler, msg: discord.Message, view: MessageView):
+        start = time.perf_counter()
+        try:
+            await handler.func(msg, view)
+        except Exception:
+            handler.stats.errors += 1
+            await self.bot.on_error(f"message handler {handler.name}", msg)
+        finally:
+            elapsed = time.perf_counter() - start
+            handler.stats.calls += 1
+            handler.stats.total += elapsed
+            handler.stats.max = max(handler.stats.max, elapsed)
+
+    async def dispatch(self, msg: discord.Message):
+        view = MessageView(msg)
+        matched = [h for h in self.handlers_for(msg) if self._passes(h, msg)]
+
+        # every handler gets its own task, so one that waits on something
+        # (a reaction, a code run) doesn't hold up the rest
+        await asyncio.gather(*(self._run(h, msg, view) for h in matched))
+
+    def reset_stats(self):
+        for handler in self.handlers:
+            handler.stats = HandlerStats()
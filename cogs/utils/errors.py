@@ -20,3 +20,9 @@ class InvalidURL(Exception): ...
 
 
 class ActivityEventBreak(commands.CheckFailure): ...
+
+
+class PlotRendererBusy(commands.CommandError): ...
+
+
+class PlotTimeout(commands.CommandError): ...
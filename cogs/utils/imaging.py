@@ -1,8 +1,12 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
+from typing import Any, Hashable
 
 from PIL import Image, ImageDraw
 
-__all__ = ("generate_rank_card",)
+__all__ = ("generate_rank_card", "get_cached_rank_card", "get_cached_avatar")
 
 AV_WIDTH = 205
 AV_CORNER = (93, 34)
@@ -11,6 +15,9 @@ LVL_HEIGHT = 229 - 142
 PBAR_CORNER = (320, 253)
 PBAR_FULL_SIZE = (760 - 320, 270 - 252)
 
+AVATAR_CACHE_SIZE = 256
+CARD_CACHE_SIZE = 512
+
 numbers = {}
 for i in range(10):
     im = Image.open(f"assets/{i}.png")
@@ -24,55 +31,144 @@ pbar = Image.open("assets/pbar.png").convert(mode="RGBA")
 frame1 = Image.open("assets/frame1.png").convert(mode="RGBA")
 frame2 = Image.open("assets/frame2.png").convert(mode="RGBA")
 
+av_mask = Image.new("L", (AV_WIDTH, AV_WIDTH), 0)
+ImageDraw.Draw(av_mask).ellipse([(0, 0), av_mask.size], fill=255)
+
+save_kwargs = {
+    "format": "GIF",
+    "save_all": True,
+    "loop": 0,
+    "duration": 1000,
+    "optimize": False,
+}
+
+
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data: OrderedDict[Hashable, Any] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+avatar_cache = _LRU(AVATAR_CACHE_SIZE)
+card_cache = _LRU(CARD_CACHE_SIZE)
+
+
+def bar_key(percent: float) -> tuple[int, int]:
+    """The width of the crop taken from the progress bar asset and the width
+    it is resized to, which together decide the bar's pixels."""
+    return round(pbar.size[0] * percent), round(PBAR_FULL_SIZE[0] * percent)
+
+
+@lru_cache(maxsize=None)
+def level_layer(level: int) -> Image.Image:
+    digits = [numbers[digit] for digit in str(level)]
+    layer = Image.new(
+        "RGBA", (sum(im.size[0] for im in digits), LVL_HEIGHT), (0, 0, 0, 0)
+    )
+    x = 0
+    for im in digits:
+        layer.paste(im, (x, 0))
+        x += im.size[0]
+    return layer
+
+
+@lru_cache(maxsize=None)
+def bar_layer(crop_width: int, width: int) -> Image.Image | None:
+    if width <= 0:
+        return None
 
-def generate_rank_card(level, av_file, percent):
-    save_kwargs = {
-        "format": "GIF",
-        "save_all": True,
-        "loop": 0,
-        "duration": 1000,
-        "optimize": False,
-    }
+    # crop the progress bar from the right based on the percent
+    crop = pbar.crop((0, 0, crop_width, pbar.size[1]))
+    # round the corners of the crop
+    mask = Image.new("L", crop.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), crop.size], fill=255, radius=15)
+    new = Image.new(mode="RGBA", size=crop.size, color=0)
+    new.paste(crop, (0, 0), mask)
+    return new.resize((width, PBAR_FULL_SIZE[1]))
 
-    layer = Image.new(mode="RGBA", size=frame1.size, color=(0, 0, 0, 0))
 
-    with Image.open(av_file) as av:
-        av = av.resize((AV_WIDTH, AV_WIDTH))
+def load_avatar(av_file, avatar_key: Hashable | None = None) -> Image.Image:
+    if isinstance(av_file, Image.Image):
+        return av_file
+    if avatar_key is not None:
+        av = avatar_cache.get(avatar_key)
+        if av is not None:
+            return av
 
-    mask = Image.new("L", av.size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.ellipse([(0, 0), av.size], fill=255)
-    layer.paste(av, AV_CORNER, mask)
+    with Image.open(av_file) as im:
+        av = im.resize((AV_WIDTH, AV_WIDTH))
 
-    digitx = LVL_CORNER[0]
-    digity = LVL_CORNER[1]
+    if avatar_key is not None:
+        avatar_cache.put(avatar_key, av)
+    return av
 
-    for digit in str(level):
-        im = numbers[digit]
-        layer.paste(im, (digitx, digity))
-        digitx += im.size[0]
 
-    # crop the progress bar from the right based on the percent
-    pbar_crop = pbar.crop((0, 0, round(pbar.size[0] * (percent)), pbar.size[1]))
-    # round the corners of pbar_crop
-    mask = Image.new("L", pbar_crop.size, 0)
-    draw = ImageDraw.Draw(mask)
-    # draw a rounded rectangle over mask
-    draw.rounded_rectangle([(0, 0), pbar_crop.size], fill=255, radius=15)
-    new = Image.new(mode="RGBA", size=pbar_crop.size, color=0)
-    new.paste(pbar_crop, (0, 0), mask)
-    xsize = round(PBAR_FULL_SIZE[0] * percent)
-    if xsize > 0:
-        new = new.resize((round(PBAR_FULL_SIZE[0] * percent), PBAR_FULL_SIZE[1]))
-        layer.paste(new, PBAR_CORNER, new)
+def get_cached_avatar(avatar_key: Hashable) -> Image.Image | None:
+    return avatar_cache.get(avatar_key)
+
+
+def get_cached_rank_card(
+    avatar_key: Hashable, level: int, percent: float
+) -> BytesIO | None:
+    data = card_cache.get((avatar_key, level, bar_key(percent)))
+    if data is None:
+        return None
+    return BytesIO(data)
+
+
+def generate_rank_card(level, av_file, percent, avatar_key: Hashable | None = None):
+    """Renders the two-frame rank card GIF.
+
+    ``av_file`` is either the raw avatar or an avatar from
+    ``get_cached_avatar``. With an ``avatar_key`` (the avatar hash) the decoded
+    avatar and the finished card are cached.
+    """
+    key = bar_key(percent)
+    if avatar_key is not None:
+        cached = get_cached_rank_card(avatar_key, level, percent)
+        if cached is not None:
+            return cached
+
+    layer = Image.new(mode="RGBA", size=frame1.size, color=(0, 0, 0, 0))
+    layer.paste(load_avatar(av_file, avatar_key), AV_CORNER, av_mask)
+
+    digits = level_layer(level)
+    layer.paste(digits, LVL_CORNER)
+
+    bar = bar_layer(*key)
+    if bar is not None:
+        layer.paste(bar, PBAR_CORNER, bar)
 
     f1 = frame1.copy()
     f2 = frame2.copy()
-
     f1.paste(layer, (0, 0), layer)
     f2.paste(layer, (0, 0), layer)
 
     out = BytesIO()
     f1.save(out, append_images=[f2], **save_kwargs)
+
+    if avatar_key is not None:
+        card_cache.put((avatar_key, level, key), out.getvalue())
+
     out.seek(0)
     return out
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable
+
+import discord
+
+if TYPE_CHECKING:
+    from bot import LunaBot
+
+__all__ = ("MemberJob", "MemberJobs")
+
+
+# returns whether anything was done to the member
+MemberAction = Callable[[discord.Member, dict[str, Any]], Awaitable[bool]]
+
+
+async def kick_member(member: discord.Member, args: dict[str, Any]) -> bool:
+    if args.get("only_offline") and member.status is not discord.Status.offline:
+        return False
+    await member.kick(reason=args.get("reason"))
+    return True
+
+
+async def add_role(member: discord.Member, args: dict[str, Any]) -> bool:
+    role = member.guild.get_role(args["role_id"])
+    if role is None or role in member.roles:
+        return False
+    await member.add_roles(role, reason=args.get("reason"))
+    return True
+
+
+async def remove_role(member: discord.Member, args: dict[str, Any]) -> bool:
+    role = member.guild.get_role(args["role_id"])
+    if role is None or role not in member.roles:
+        return False
+    await member.remove_roles(role, reason=args.get("reason"))
+    return True
+
+
+class MemberJob:
+    """Applies one action to a list of members.
+
+    ``concurrency`` members are processed at a time; discord.py queues the
+    requests on the route's rate limit bucket, so this only needs to be high
+    enough to keep the bucket busy. ``position`` is the index before which
+    every member has been processed and is what gets checkpointed, so a
+    resumed job may redo the few members after it. Actions are expected to
+    check the member's state first, which makes redoing them harmless.
+    """
+
+    def __init__(
+        self,
+        jobs: MemberJobs,
+        job_id: int,
+        action: str,
+        guild_id: int,
+        member_ids: list[int],
+        args: dict[str, Any],
+        *,
+        channel_id: int | None = None,
+        position: int = 0,
+        done: int = 0,
+        skipped: int = 0,
+        failed: int = 0,
+    ):
+        self.jobs = jobs
+        self.bot = jobs.bot
+        self.id = job_id
+        self.action = action
+        self.guild_id = guild_id
+        self.member_ids = member_ids
+        self.args = args
+        self.channel_id = channel_id
+
+        self.position = position
+        self.done = done
+        self.skipped = skipped
+        self.failed = failed
+
+        self.status = "running"
+        self.finished: set[int] = set()
+        self.next_index = position
+        self.since_checkpoint = 0
+        self.processed = 0
+        self.started_at = time.monotonic()
+        self.task: asyncio.Task | None = None
+
+    @classmethod
+    def from_db_row(cls, jobs: MemberJobs, row) -> MemberJob:
+        return cls(
+            jobs,
+            row["id"],
+            row["action"],
+            row["guild_id"],
+            list(row["member_ids"]),
+            json.loads(row["args"]),
+            channel_id=row["channel_id"],
+            position=row["position"],
+            done=row["done"],
+            skipped=row["skipped"],
+            failed=row["failed"],
+        )
+
+    @property
+    def total(self) -> int:
+        return len(self.member_ids)
+
+    @property
+    def completed(self) -> int:
+        return self.position + len(self.finished)
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.processed / elapsed
+
+    def eta(self) -> timedelta | None:
+        rate = self.rate
+        if rate == 0:
+            return None
+        return timedelta(seconds=(self.total - self.completed) / rate)
+
+    def progress(self) -> str:
+        pc = self.completed / self.total * 100 if self.total else 100
+        line = (
+            f"#{self.id} `{self.action}` {self.completed}/{self.total} ({pc:.0f}%), "
+            f"{self.done} done, {self.skipped} skipped, {self.failed} failed"
+        )
+        if self.status != "running":
+            return f"{line} [{self.status}]"
+
+        eta = self.eta()
+        if eta is not None:
+            end = discord.utils.format_dt(discord.utils.utcnow() + eta, "R")
+            line += f", {self.rate:.1f}/s, done {end}"
+        return line
+
+    def start(self):
+        self.task = self.bot.loop.create_task(self.run())
+
+    async def wait(self):
+        if self.task is not None:
+            await asyncio.shield(self.task)
+
+    def cancel(self):
+        self.status = "cancelled"
+
+    async def run(self):
+        func = self.jobs.actions[self.action]
+        guild = self.bot.get_guild(self.guild_id)
+        workers = [
+            self._worker(func, guild) for _ in range(self.jobs.concurrency)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            self.status = "paused"
+            raise
+        finally:
+            if self.status == "running":
+                self.status = "done"
+            await self.checkpoint()
+            self.jobs.running.pop(self.id, None)
+
+        if self.status != "paused":
+            await self.report()
+
+    async def _worker(self, func: MemberAction, guild: discord.Guild | None):
+        while self.status == "running" and self.next_index < self.total:
+            index = self.next_index
+            self.next_index += 1
+
+            member = guild and guild.get_member(self.member_ids[index])
+            if member is None:
+                self.skipped += 1
+            else:
+                try:
+                    if await func(member, self.args):
+                        self.done += 1
+                    else:
+                        self.skipped += 1
+                except discord.NotFound:
+                    self.skipped += 1
+                except discord.HTTPException as e:
+                    self.failed += 1
+                    logging.info(f"Job {self.id} failed on {member.id}: {e}")
+                except Exception:
+                    self.failed += 1
+                    logging.exception(f"Job {self.id} failed on {member.id}")
+
+            self._finish(index)
+            if self.since_checkpoint >= self.jobs.checkpoint_every:
+                await self.checkpoint()
+
+    def _finish(self, index: int):
+        self.processed += 1
+        self.since_checkpoint += 1
+        self.finished.add(index)
+        while self.position in self.finished:
+            self.finished.remove(self.position)
+            self.position += 1
+
+    async def checkpoint(self):
+        self.since_checkpoint = 0
+        status = "running" if self.status == "paused" else self.status
+        query = """UPDATE member_jobs
+                   SET
+                       position = $2,
+                       done = $3,
+                       skipped = $4,
+                       failed = $5,
+                       status = $6,
+                       finished_at = CASE
+                           WHEN $6 = 'running' THEN NULL
+                           ELSE NOW()
+                       END
+                   WHERE
+                       id = $1
+                """
+        try:
+            await self.bot.db.execute(
+                query,
+                self.id,
+                self.position,
+                self.done,
+                self.skipped,
+                self.failed,
+                status,
+            )
+        except Exception as e:
+            logging.warning(f"Checkpointing job {self.id} failed: {e}")
+
+    async def report(self):
+        channel = self.bot.get_channel(self.channel_id) if self.channel_id else None
+        if channel is None:
+            return
+        try:
+            await channel.send(f"Job {self.progress()}")
+        except discord.HTTPException:
+            pass
+
+
+class MemberJobs:
+    """Runs bulk member actions as jobs stored in ``member_jobs``.
+
+    Actions are registered by name, ``kick``, ``add_role`` and
+    ``remove_role`` are built in. Jobs that were running when the bot shut
+    down are picked up again by ``resume``, those whose action isn't
+    registered by then are marked ``orphaned``.
+    """
+
+    def __init__(
+        self, bot: LunaBot, *, concurrency: int = 5, checkpoint_every: int = 25
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.actions: dict[str, MemberAction] = {
+            "kick": kick_member,
+            "add_role": add_role,
+            "remove_role": remove_role,
+        }
+        self.running: dict[int, MemberJob] = {}
+
+    def register(self, name: str, func: MemberAction):
+        self.actions[name] = func
+
+    def unregister(self, name: str):
+        self.actions.pop(name, None)
+
+    def get(self, job_id: int) -> MemberJob | None:
+        return self.running.get(job_id)
+
+    def find(
+        self, action: str, guild_id: int | None = None, **args: Any
+    ) -> MemberJob | None:
+        """Returns the first running job for ``action``, optionally limited to
+        a guild and to jobs whose args contain ``args``."""
+        for job in self.running.values():
+            if job.action != action or guild_id not in (None, job.guild_id):
+                continue
+            if all(job.args.get(k) == v for k, v in args.items()):
+                return job
+        return None
+
+    async def start(
+        self,
+        action: str,
+        guild: discord.Guild,
+        members: Iterable[discord.abc.Snowflake],
+        *,
+        args: dict[str, Any] | None = None,
+        channel: discord.abc.Messageable | None = None,
+    ) -> MemberJob:
+        if action not in self.actions:
+            raise ValueError(f"unknown member action {action}")
+
+        args = args or {}
+        member_ids = [m.id for m in members]
+        channel_id = getattr(channel, "id", None)
+        query = """INSERT INTO
+                       member_jobs (action, guild_id, channel_id, member_ids, args)
+                   VALUES
+                       ($1, $2, $3, $4, $5)
+                   RETURNING
+                       id
+                """
+        job_id = await self.bot.db.fetchval(
+            query, action, guild.id, channel_id, member_ids, json.dumps(args)
+        )
+
+        job = MemberJob(
+            self, job_id, action, guild.id, member_ids, args, channel_id=channel_id
+        )
+        self.running[job_id] = job
+        job.start()
+        return job
+
+    async def resume(self):
+        # members have to be cached before they can be looked up
+        await self.bot.wait_until_ready()
+        query = "SELECT * FROM member_jobs WHERE status = 'running' ORDER BY id"
+        for row in await self.bot.db.fetch(query):
+            if row["id"] in self.running:
+                continue
+            if row["action"] not in self.actions:
+                # its cog wasn't loaded, the row is left for a human to look at
+                logging.warning(
+                    f"Job {row['id']} has unknown action {row['action']}, marking it orphaned"
+                )
+                query = "UPDATE member_jobs SET status = 'orphaned' WHERE id = $1"
+                await self.bot.db.execute(query, row["id"])
+                continue
+            job = MemberJob.from_db_row(self, row)
+            self.running[job.id] = job
+            job.start()
+            logging.info(f"Resumed job {job.id} at {job.position}/{job.total}")
+
+    async def close(self):
+        # stop without cancelling, so the jobs resume on the next start
+        for job in list(self.running.values()):
+            job.status = "paused"
+        for job in list(self.running.values()):
+            await job.wait()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .errors import PlotRendererBusy, PlotTimeout
+
+__all__ = ("PlotRenderer", "render_figure")
+
+
+DrawFunc = Callable[..., Any]
+
+
+def render_figure(
+    draw: DrawFunc,
+    args: tuple[Any, ...],
+    rc: dict[str, Any] | None = None,
+    figsize: tuple[float, float] = (8, 5),
+) -> bytes:
+    """Calls ``draw(fig, *args)`` on a fresh Agg figure and returns the PNG.
+
+    The figure is never registered with pyplot, so nothing keeps it alive
+    once it's cleared here.
+    """
+    with matplotlib.rc_context(rc or {}):
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        try:
+            draw(fig, *args)
+            buf = BytesIO()
+            fig.savefig(buf, format="png")
+            return buf.getvalue()
+        finally:
+            fig.clear()
+
+
+class PlotRenderer:
+    """Renders matplotlib figures in a pool of worker processes.
+
+    At most ``max_pending`` jobs can be queued or running, anything past that
+    is rejected with ``PlotRendererBusy``. A job that runs longer than
+    ``timeout`` raises ``PlotTimeout`` and the pool is restarted, since a
+    running job can't be cancelled any other way. Workers are replaced after
+    ``max_tasks_per_child`` jobs to keep their memory flat.
+
+    ``draw`` functions must be importable module-level functions that take
+    the figure followed by picklable arguments.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_pending: int = 8,
+        timeout: float = 30,
+        max_tasks_per_child: int = 50,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+
+        self.pool: ProcessPoolExecutor | None = None
+        self.pending = 0
+
+        self.rendered = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        return self.pool
+
+    def _restart(self):
+        pool, self.pool = self.pool, None
+        if pool is None:
+            return
+
+        for process in list(pool._processes.values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def render(
+        self,
+        draw: DrawFunc,
+        *args: Any,
+        rc: dict[str, Any] | None = None,
+        figsize: tuple[float, float] = (8, 5),
+    ) -> BytesIO:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PlotRendererBusy()
+
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self._get_pool(), render_figure, draw, args, rc, figsize
+            )
+            data = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logging.warning(f"Plot {draw.__qualname__} timed out, restarting pool")
+            self._restart()
+            raise PlotTimeout()
+        except BrokenProcessPool:
+            self._restart()
+            raise
+        finally:
+            self.pending -= 1
+
+        self.rendered += 1
+        return BytesIO(data)
+
+    def close(self):
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
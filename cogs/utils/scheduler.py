@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from bot import LunaBot
+
+__all__ = ("Scheduler", "ScheduledCall")
+
+
+class ScheduledCall:
+    __slots__ = ("when", "seq", "callback", "name", "cancelled")
+
+    def __init__(
+        self,
+        when: float,
+        seq: int,
+        callback: Callable[[], Awaitable[Any]],
+        name: str,
+    ):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.name = name
+        self.cancelled = False
+
+    def __lt__(self, other: ScheduledCall):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+class Scheduler:
+    """Runs coroutines at given times from a single sleeper task.
+
+    Calls sit in a heap ordered by due time. The sleeper waits until the
+    earliest one is due, starts everything that is due as one batch and is
+    woken early when a sooner call is added. Cancelled calls are skipped when
+    they're popped.
+    """
+
+    def __init__(self, bot: LunaBot):
+        self.bot = bot
+        self.heap: list[ScheduledCall] = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+        self.fired = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def call_at(
+        self,
+        when: datetime | float,
+        callback: Callable[[], Awaitable[Any]],
+        *,
+        name: str | None = None,
+    ) -> ScheduledCall:
+        if isinstance(when, datetime):
+            when = when.timestamp()
+
+        call = ScheduledCall(
+            when, next(self.counter), callback, name or callback.__qualname__
+        )
+        heapq.heappush(self.heap, call)
+
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self._run())
+        elif self.heap[0] is call:
+            self.wakeup.set()
+        return call
+
+    def cancel(self, call: ScheduledCall):
+        call.cancelled = True
+
+    async def _fire(self, call: ScheduledCall):
+        try:
+            await call.callback()
+        except Exception:
+            self.failed += 1
+            await self.bot.on_error(f"scheduled call {call.name}")
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+
+            now = time.time()
+            heap = self.heap
+            while heap and heap[0].when <= now:
+                call = heapq.heappop(heap)
+                if call.cancelled:
+                    continue
+                self.fired += 1
+                self.bot.loop.create_task(self._fire(call))
+
+            timeout = heap[0].when - time.time() if heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
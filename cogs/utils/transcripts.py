@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import math
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Iterable
+
+import asyncpg
+import discord
+from discord.ext import menus
+
+__all__ = (
+    "append_transcript",
+    "replace_transcript",
+    "iter_transcript",
+    "count_transcript",
+    "fetch_transcript_range",
+    "transcript_file",
+    "TranscriptPageSource",
+)
+
+# a transcript bigger than this is written to disk while it's being built
+SPOOL_SIZE = 1024 * 1024
+STREAM_BATCH = 200
+
+COLUMNS = ("ticket_id", "position", "author_id", "username", "content", "attachments")
+
+
+def format_message(row) -> str:
+    lines = [f"{row['username']} ({row['author_id']}): {row['content']}\n"]
+    for a in row["attachments"] or ():
+        lines.append(f"  {a}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+
+async def lock_transcript(conn: asyncpg.Connection, ticket_id: int):
+    # held until the transaction ends, so positions are handed out one
+    # writer at a time
+    await conn.execute("SELECT pg_advisory_xact_lock($1)", ticket_id)
+
+
+def to_records(
+    ticket_id: int, messages: Iterable[dict[str, Any]], start: int = 0
+) -> list[tuple[Any, ...]]:
+    return [
+        (
+            ticket_id,
+            position,
+            msg["author_id"],
+            msg["username"],
+            msg["content"],
+            list(msg["attachments"]),
+        )
+        for position, msg in enumerate(messages, start=start)
+    ]
+
+
+async def create_transcript(conn: asyncpg.Connection, ticket_id: int, opener_id: int):
+    query = """INSERT INTO
+                   ticket_transcripts (ticket_id, opener_id)
+               SELECT
+                   $1, $2
+               WHERE
+                   NOT EXISTS (
+                       SELECT 1 FROM ticket_transcripts WHERE ticket_id = $1
+                   )
+            """
+    await conn.execute(query, ticket_id, opener_id)
+
+
+async def append_transcript(
+    db: asyncpg.Pool,
+    ticket_id: int,
+    opener_id: int,
+    messages: Iterable[dict[str, Any]],
+):
+    """Adds messages to the end of a ticket's transcript, creating it if
+    needed. ``messages`` are dicts with ``author_id``, ``username``,
+    ``content`` and ``attachments``."""
+    async with db.acquire() as conn:
+        async with conn.transaction():
+            await lock_transcript(conn, ticket_id)
+            # a legacy transcript has to be split first, it takes the
+            # positions before the new messages
+            await split_legacy_transcript(conn, ticket_id)
+            await create_transcript(conn, ticket_id, opener_id)
+
+            query = """SELECT
+                           COALESCE(MAX(position) + 1, 0)
+                       FROM
+                           ticket_transcript_messages
+                       WHERE
+                           ticket_id = $1
+                    """
+            start = await conn.fetchval(query, ticket_id)
+            await conn.copy_records_to_table(
+                "ticket_transcript_messages",
+                records=to_records(ticket_id, messages, start),
+                columns=COLUMNS,
+            )
+
+
+async def replace_transcript(
+    db: asyncpg.Pool,
+    ticket_id: int,
+    opener_id: int,
+    messages: Iterable[dict[str, Any]],
+):
+    """Like ``append_transcript``, but ``messages`` replace the whole
+    transcript. Used for the full channel history saved on close, so
+    closing twice doesn't repeat it."""
+    async with db.acquire() as conn:
+        async with conn.transaction():
+            await lock_transcript(conn, ticket_id)
+            await create_transcript(conn, ticket_id, opener_id)
+
+            query = """UPDATE
+                           ticket_transcripts
+                       SET
+                           messages = NULL
+                       WHERE
+                           ticket_id = $1
+                           AND messages IS NOT NULL
+                    """
+            await conn.execute(query, ticket_id)
+            query = "DELETE FROM ticket_transcript_messages WHERE ticket_id = $1"
+            await conn.execute(query, ticket_id)
+            await conn.copy_records_to_table(
+                "ticket_transcript_messages",
+                records=to_records(ticket_id, messages),
+                columns=COLUMNS,
+            )
+
+
+async def split_legacy_transcript(conn: asyncpg.Connection, ticket_id: int):
+    # transcripts used to be JSONB documents. Every close saved the full
+    # history again, so only the latest one is kept. Has to run under
+    # lock_transcript.
+    query = """SELECT
+                   messages
+               FROM
+                   ticket_transcripts
+               WHERE
+                   ticket_id = $1
+                   AND messages IS NOT NULL
+               ORDER BY
+                   id DESC
+               LIMIT
+                   1
+            """
+    blob = await conn.fetchval(query, ticket_id)
+    if blob is None:
+        return
+
+    query = "DELETE FROM ticket_transcript_messages WHERE ticket_id = $1"
+    await conn.execute(query, ticket_id)
+    await conn.copy_records_to_table(
+        "ticket_transcript_messages",
+        records=to_records(ticket_id, json.loads(blob)),
+        columns=COLUMNS,
+    )
+
+    query = """UPDATE
+                   ticket_transcripts
+               SET
+                   messages = NULL
+               WHERE
+                   ticket_id = $1
+                   AND messages IS NOT NULL
+            """
+    await conn.execute(query, ticket_id)
+
+
+async def migrate_transcript(db: asyncpg.Pool, ticket_id: int):
+    # legacy transcripts are split into rows the first time they're read
+    async with db.acquire() as conn:
+        async with conn.transaction():
+            await lock_transcript(conn, ticket_id)
+            await split_legacy_transcript(conn, ticket_id)
+
+
+async def count_transcript(db: asyncpg.Pool, ticket_id: int) -> int | None:
+    """Number of messages in a transcript, None if there is no transcript."""
+    await migrate_transcript(db, ticket_id)
+
+    query = """SELECT
+                   (SELECT COUNT(*) FROM ticket_transcript_messages m WHERE m.ticket_id = t.ticket_id)
+               FROM
+                   ticket_transcripts t
+               WHERE
+                   t.ticket_id = $1
+               LIMIT
+                   1
+            """
+    return await db.fetchval(query, ticket_id)
+
+
+async def fetch_transcript_range(
+    db: asyncpg.Pool, ticket_id: int, start: int, stop: int
+) -> list[asyncpg.Record]:
+    query = """SELECT
+                   *
+               FROM
+                   ticket_transcript_messages
+               WHERE
+                   ticket_id = $1
+                   AND position >= $2
+                   AND position < $3
+               ORDER BY
+                   position
+            """
+    return await db.fetch(query, ticket_id, start, stop)
+
+
+async def iter_transcript(
+    db: asyncpg.Pool, ticket_id: int, *, batch: int = STREAM_BATCH
+) -> AsyncIterator[str]:
+    """Yields the transcript as text, one message at a time, fetching
+    ``batch`` messages per query."""
+    await migrate_transcript(db, ticket_id)
+
+    position = 0
+    while True:
+        rows = await fetch_transcript_range(db, ticket_id, position, position + batch)
+        if not rows:
+            return
+        for row in rows:
+            yield format_message(row)
+        position = rows[-1]["position"] + 1
+
+
+async def transcript_file(db: asyncpg.Pool, ticket_id: int) -> discord.File | None:
+    if await count_transcript(db, ticket_id) is None:
+        return None
+
+    fp = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    async for text in iter_transcript(db, ticket_id):
+        fp.write(text.encode())
+    fp.seek(0)
+    return discord.File(fp, filename=f"transcript-{ticket_id}.txt")
+
+
+class TranscriptPageSource(menus.PageSource):
+    """Fetches only the messages of the page that is being shown."""
+
+    def __init__(
+        self,
+        db: asyncpg.Pool,
+        ticket_id: int,
+        total: int,
+        embed: discord.Embed,
+        *,
+        per_page: int = 10,
+    ):
+        self.db = db
+        self.ticket_id = ticket_id
+        self.total = total
+        self.embed = embed
+        self.per_page = per_page
+
+    def is_paginating(self):
+        return self.total > self.per_page
+
+    def get_max_pages(self):
+        return max(1, math.ceil(self.total / self.per_page))
+
+    async def get_page(self, page_number):
+        start = page_number * self.per_page
+        return await fetch_transcript_range(
+            self.db, self.ticket_id, start, start + self.per_page
+        )
+
+    async def format_page(self, menu, rows):
+        self.embed.description = "".join(format_message(row) for row in rows)[:4096]
+
+        maximum = self.get_max_pages()
+        if maximum > 1:
+            footer = f"Page {menu.current_page + 1}/{maximum} ({self.total} messages)"
+            self.embed.set_footer(text=footer)
+        return self.embed
@@ -22,6 +22,12 @@ class Vanity(commands.Cog):
         )
         self._pending_removals: dict[int, asyncio.Task] = {}  # member_id -> task
 
+    async def cog_load(self):
+        self.bot.jobs.register("vanity_sync", self.sync_member)
+
+    async def cog_unload(self):
+        self.bot.jobs.unregister("vanity_sync")
+
     # --- helpers --------------------------------------------------------------
 
     @staticmethod
@@ -126,6 +132,24 @@ class Vanity(commands.Cog):
                 _delayed_remove(after.id, after.guild.id)
             )
 
+    async def sync_member(self, member: discord.Member, args) -> bool:
+        # checked again here, the status may have changed since the job started
+        if member.status == discord.Status.offline:
+            return False
+
+        role = member.guild.get_role(args["role_id"])
+        if role is None:
+            return False
+
+        if self._has_vanity(member):
+            if role not in member.roles:
+                await member.add_roles(role)
+                return True
+        elif role in member.roles:
+            await member.remove_roles(role)
+            return True
+        return False
+
     # @tasks.loop(hours=1)
     async def update_roles(self, channel=None):
         guild = self.bot.get_guild(self.bot.GUILD_ID)
@@ -133,13 +157,19 @@ class Vanity(commands.Cog):
         embed1 = discord.Embed(title="added roles to")
         embed2 = discord.Embed(title="removed roles from")
 
-        added = []
-        removed = []
+        toadd = []
+        toremove = []
         role = guild.get_role(self.bot.vars.get("vanity-role-id"))
 
         if role is None:
             return
 
+        if channel is None:
+            channel = self.bot.get_var_channel("private")
+
+        if self.bot.jobs.find("vanity_sync", guild.id) is not None:
+            return await channel.send("already roleing, do !uvrp to check progress")
+
         for member in guild.members:
             if member.bot:
                 continue
@@ -149,21 +179,37 @@ class Vanity(commands.Cog):
 
             if self._has_vanity(member):
                 if role not in member.roles:
-                    await member.add_roles(role)
-                    added.append(member.mention)
+                    toadd.append(member)
 
             else:
                 if role in member.roles:
-                    await member.remove_roles(role)
-                    removed.append(member.mention)
+                    toremove.append(member)
 
-        if channel is None:
-            channel = self.bot.get_var_channel("private")
+        if not toadd and not toremove:
+            return await channel.send("everyone's vanity roles are up to date")
+
+        job = await self.bot.jobs.start(
+            "vanity_sync", guild, toadd + toremove, args={"role_id": role.id}
+        )
+        await job.wait()
+
+        added = [m.mention for m in toadd if role in m.roles]
+        removed = [m.mention for m in toremove if role not in m.roles]
 
         embed1.description = "\n".join(added)
         embed2.description = "\n".join(removed)
         await channel.send(embeds=[embed1, embed2])
 
+    @commands.command()
+    @commands.check(is_admin)
+    async def uvrp(self, ctx):
+        """checks progress for vanity roleing"""
+        job = self.bot.jobs.find("vanity_sync", self.bot.GUILD_ID)
+        if job is None:
+            return await ctx.send("no roleing happening right now")
+
+        await ctx.send(job.progress())
+
     @commands.command()
     @commands.check(is_admin)
     async def uvr(self, ctx):
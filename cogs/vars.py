@@ -21,6 +21,7 @@ class Vars(commands.Cog):
             else:
                 value = row["value"]
             self.bot.vars[row["name"]] = value
+        self.bot.messages.invalidate()
 
     async def cog_unload(self):
         self.bot.vars = {}
@@ -42,6 +43,7 @@ class Vars(commands.Cog):
         if value.isdigit():
             value = int(value)
         self.bot.vars[name] = value
+        self.bot.messages.invalidate()
         await ctx.send(f"Successfully set the variable `{name}` to `{value}`")
 
     @commands.command()
@@ -63,6 +65,7 @@ class Vars(commands.Cog):
         query = "DELETE FROM vars WHERE name = $1"
         await self.bot.db.execute(query, name)
         self.bot.vars.pop(name, None)
+        self.bot.messages.invalidate()
         await ctx.send(f"Successfully deleted the variable `{name}`")
 
 
@@ -1,3 +1,6 @@
+use std::collections::HashMap;
+use std::sync::{RwLock, RwLockReadGuard, RwLockWriteGuard};
+
 use fuzzy_matcher::skim::SkimMatcherV2;
 use fuzzy_matcher::FuzzyMatcher;
 use pyo3::prelude::*;
@@ -34,9 +37,156 @@ fn extract_bests<'a>(
     // Ok(results.into_iter().map(|(a, _)| a).collect())
 }
 
+struct Entry {
+    id: u64,
+    terms: Vec<String>,
+}
+
+#[derive(Default)]
+struct Entries {
+    entries: Vec<Entry>,
+    // id -> position in `entries`
+    slots: HashMap<u64, usize>,
+}
+
+impl Entries {
+    fn insert(&mut self, id: u64, terms: Vec<String>) {
+        match self.slots.get(&id) {
+            Some(&i) => self.entries[i].terms = terms,
+            None => {
+                self.slots.insert(id, self.entries.len());
+                self.entries.push(Entry { id, terms });
+            }
+        }
+    }
+
+    fn remove(&mut self, id: u64) -> bool {
+        let Some(i) = self.slots.remove(&id) else {
+            return false;
+        };
+        self.entries.swap_remove(i);
+        if let Some(moved) = self.entries.get(i) {
+            self.slots.insert(moved.id, i);
+        }
+        true
+    }
+}
+
+/// A fuzzy search index that keeps its terms between queries.
+///
+/// Every id owns a list of terms (e.g. a member's display name, global name
+/// and username) and scores as its best matching term. Queries release the
+/// GIL; updates wait for running queries to finish.
+#[pyclass(frozen)]
+struct FuzzyIndex {
+    inner: RwLock<Entries>,
+}
+
+impl FuzzyIndex {
+    fn read(&self) -> RwLockReadGuard<'_, Entries> {
+        self.inner.read().unwrap_or_else(|e| e.into_inner())
+    }
+
+    fn write(&self) -> RwLockWriteGuard<'_, Entries> {
+        self.inner.write().unwrap_or_else(|e| e.into_inner())
+    }
+}
+
+#[pymethods]
+impl FuzzyIndex {
+    #[new]
+    #[pyo3(signature = (items=None))]
+    fn new(items: Option<Vec<(u64, Vec<String>)>>) -> Self {
+        let index = FuzzyIndex {
+            inner: RwLock::new(Entries::default()),
+        };
+        if let Some(items) = items {
+            index.extend(items);
+        }
+        index
+    }
+
+    /// Adds an id with its terms, replacing the terms if it already exists.
+    fn add(&self, id: u64, terms: Vec<String>) {
+        self.write().insert(id, terms);
+    }
+
+    /// Adds many (id, terms) pairs at once.
+    fn extend(&self, items: Vec<(u64, Vec<String>)>) {
+        let mut entries = self.write();
+        entries.entries.reserve(items.len());
+        for (id, terms) in items {
+            entries.insert(id, terms);
+        }
+    }
+
+    /// Replaces the terms of an existing id. Returns False if it isn't indexed.
+    fn update(&self, id: u64, terms: Vec<String>) -> bool {
+        let mut entries = self.write();
+        match entries.slots.get(&id) {
+            Some(&i) => {
+                entries.entries[i].terms = terms;
+                true
+            }
+            None => false,
+        }
+    }
+
+    /// Removes an id. Returns False if it wasn't indexed.
+    fn remove(&self, id: u64) -> bool {
+        self.write().remove(id)
+    }
+
+    fn clear(&self) {
+        let mut entries = self.write();
+        entries.entries.clear();
+        entries.slots.clear();
+    }
+
+    /// Returns up to `limit` (id, score) pairs, best match first, ties by id.
+    // `allow_threads` is `detach` from pyo3 0.26 on, see Cargo.toml
+    fn extract_bests(&self, py: Python<'_>, query: &str, limit: usize) -> Vec<(u64, i64)> {
+        py.allow_threads(|| {
+            let matcher = SkimMatcherV2::default();
+            let entries = self.read();
+
+            let mut results: Vec<(u64, i64)> = entries
+                .entries
+                .par_iter()
+                .filter_map(|entry| {
+                    entry
+                        .terms
+                        .iter()
+                        .filter_map(|term| matcher.fuzzy_match(term, query))
+                        .max()
+                        .map(|score| (entry.id, score))
+                })
+                .collect();
+            drop(entries);
+
+            let order = |a: &(u64, i64), b: &(u64, i64)| b.1.cmp(&a.1).then(a.0.cmp(&b.0));
+            if limit < results.len() {
+                results.select_nth_unstable_by(limit, order);
+                results.truncate(limit);
+            }
+            results.sort_unstable_by(order);
+            results
+        })
+    }
+
+    fn __len__(&self) -> usize {
+        self.read().entries.len()
+    }
+
+    fn __contains__(&self, id: u64) -> bool {
+        self.read().slots.contains_key(&id)
+    }
+}
+
 /// A Python module implemented in Rust.
 #[pymodule]
 fn fuzzy_rust(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(extract_bests, m)?)?;
+    m.add_class::<FuzzyIndex>()?;
     Ok(())
 }
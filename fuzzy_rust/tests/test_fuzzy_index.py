@@ -0,0 +1,144 @@
+"""Smoke tests for ``FuzzyIndex``, checked against ``extract_bests`` and
+against ``cogs.staff.TermIndex``, the fallback used on older builds.
+
+Build the extension first (pyo3 0.25.x, see Cargo.toml), then run from
+this directory with the bot's requirements installed:
+
+    maturin develop --release
+    python -m pytest tests  (or: python tests/test_fuzzy_index.py)
+"""
+
+import random
+import string
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from fuzzy_rust import FuzzyIndex, extract_bests
+
+# the fallback lives in the cog, import it from the bot's root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from cogs.staff import TermIndex, member_terms  # noqa: E402
+
+
+def reference(items, query, limit):
+    # what FuzzyIndex should return: each id scored by its best term
+    terms = sorted({t for _, ts in items.items() for t in ts})
+    scores = dict(extract_bests(query, terms, len(terms)))
+    best = {}
+    for id, ts in items.items():
+        matched = [scores[t] for t in ts if t in scores]
+        if matched:
+            best[id] = max(matched)
+    return sorted(best.items(), key=lambda r: (-r[1], r[0]))[:limit]
+
+
+def random_name(rng):
+    return "".join(rng.choices(string.ascii_lowercase + "_. ", k=rng.randint(3, 12)))
+
+
+def test_add_update_remove():
+    index = FuzzyIndex([(1, ["storch", "storchy"]), (2, ["luna"])])
+    assert len(index) == 2
+    assert 1 in index and 3 not in index
+
+    index.add(3, ["molly"])
+    assert len(index) == 3
+    assert [id for id, _ in index.extract_bests("molly", 5)][0] == 3
+
+    # add replaces the terms of an existing id
+    index.add(3, ["lumi"])
+    assert len(index) == 3
+    assert 3 not in [id for id, _ in index.extract_bests("molly", 5)]
+
+    assert index.update(2, ["lunabot"]) is True
+    assert index.update(99, ["nobody"]) is False
+    assert 99 not in index
+
+    assert index.remove(1) is True
+    assert index.remove(1) is False
+    assert 1 not in index and len(index) == 2
+    assert 1 not in [id for id, _ in index.extract_bests("storch", 5)]
+
+    index.clear()
+    assert len(index) == 0
+    assert index.extract_bests("luna", 5) == []
+
+
+def test_limits():
+    index = FuzzyIndex([(i, [f"user{i}"]) for i in range(10)])
+    assert index.extract_bests("user", 0) == []
+    assert len(index.extract_bests("user", 3)) == 3
+    assert len(index.extract_bests("user", 100)) == 10
+    # equal scores come back ordered by id
+    assert [id for id, _ in index.extract_bests("user", 100)] == list(range(10))
+
+
+def test_matches_extract_bests():
+    rng = random.Random(0)
+    items = {
+        rng.randrange(1 << 62): [random_name(rng) for _ in range(rng.randint(1, 3))]
+        for _ in range(2000)
+    }
+    index = FuzzyIndex(list(items.items()))
+
+    # churn the index so removals move entries around
+    for id in rng.sample(sorted(items), 300):
+        if rng.random() < 0.5:
+            assert index.remove(id)
+            del items[id]
+        else:
+            items[id] = [random_name(rng)]
+            assert index.update(id, items[id])
+
+    for _ in range(50):
+        query = random_name(rng)[: rng.randint(1, 5)]
+        for limit in (1, 5, 25):
+            assert index.extract_bests(query, limit) == reference(items, query, limit)
+
+
+def random_member(rng, names):
+    # members often share a name with someone else, and global_name is
+    # optional, like on discord
+    name = rng.choice(names) if names and rng.random() < 0.2 else random_name(rng)
+    names.append(name)
+    display = rng.choice([name, random_name(rng), name.title()])
+    global_name = rng.choice([None, name, random_name(rng) + " \u2728"])
+    return SimpleNamespace(display_name=display, global_name=global_name, name=name)
+
+
+def test_matches_term_index():
+    rng = random.Random(1)
+    names = []
+    members = {rng.randrange(1 << 62): random_member(rng, names) for _ in range(3000)}
+    items = [(id, member_terms(m)) for id, m in members.items()]
+    index = FuzzyIndex(items)
+    fallback = TermIndex(items)
+
+    # the same member updates and leaves on both
+    for id in rng.sample(sorted(members), 500):
+        change = rng.random()
+        if change < 0.4:
+            assert index.remove(id) and fallback.remove(id)
+        elif change < 0.8:
+            terms = member_terms(random_member(rng, names))
+            assert index.update(id, terms) and fallback.update(id, terms)
+        else:
+            index.add(id, member_terms(members[id]))
+            fallback.add(id, member_terms(members[id]))
+    assert len(index) == len(fallback)
+
+    queries = [rng.choice(names)[: rng.randint(1, 6)] for _ in range(60)]
+    queries += ["", "zzzzzzzz", "\u2728", names[0], names[0].upper()]
+    for query in queries:
+        for limit in (1, 10, 100):
+            assert index.extract_bests(query, limit) == fallback.extract_bests(
+                query, limit
+            ), (query, limit)
+
+
+if __name__ == "__main__":
+    tests = [func for name, func in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+    print(f"{len(tests)} tests passed")
@@ -93,9 +93,13 @@ CREATE TABLE IF NOT EXISTS active_tickets (
   opener_id BIGINT,
   timestamp INTEGER,
   archive_id BIGINT,
-  remind_after TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+  remind_after TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+  last_activity TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+ALTER TABLE active_tickets ADD COLUMN IF NOT EXISTS last_activity TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+CREATE INDEX IF NOT EXISTS active_tickets_remind_after_idx ON active_tickets (remind_after) WHERE remind_after IS NOT NULL;
+
 CREATE TABLE IF NOT EXISTS ticket_transcripts (
   id SERIAL PRIMARY KEY,
   ticket_id BIGINT,
@@ -103,6 +107,16 @@ CREATE TABLE IF NOT EXISTS ticket_transcripts (
   messages JSONB
 );
 
+CREATE TABLE IF NOT EXISTS ticket_transcript_messages (
+  ticket_id BIGINT,
+  position INTEGER,
+  author_id BIGINT,
+  username TEXT,
+  content TEXT,
+  attachments TEXT[],
+  PRIMARY KEY (ticket_id, position)
+);
+
 CREATE TABLE IF NOT EXISTS confessions (
   id SERIAL PRIMARY KEY,
   user_id BIGINT,
@@ -173,6 +187,8 @@ CREATE TABLE IF NOT EXISTS joins (
   time TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );  
 
+CREATE INDEX IF NOT EXISTS joins_guild_id_time_idx ON joins (guild_id, time);
+
 CREATE TABLE IF NOT EXISTS leaves (
   id SERIAL PRIMARY KEY,
   user_id BIGINT,
@@ -181,6 +197,8 @@ CREATE TABLE IF NOT EXISTS leaves (
   time TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS leaves_guild_id_time_idx ON leaves (guild_id, time);
+
 CREATE TABLE IF NOT EXISTS message_data (
   id SERIAL PRIMARY KEY,
   user_id BIGINT,
@@ -188,6 +206,8 @@ CREATE TABLE IF NOT EXISTS message_data (
   time TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS message_data_time_channel_id_idx ON message_data (time, channel_id);
+
 CREATE TABLE IF NOT EXISTS afk (
   id SERIAL PRIMARY KEY,
   user_id BIGINT,
@@ -264,3 +284,19 @@ CREATE TABLE IF NOT EXISTS candybals (
   user_id BIGINT UNIQUE,
   balance INTEGER
 );
+
+CREATE TABLE IF NOT EXISTS member_jobs (
+  id SERIAL PRIMARY KEY,
+  action TEXT NOT NULL,
+  guild_id BIGINT NOT NULL,
+  channel_id BIGINT,
+  member_ids BIGINT[] NOT NULL,
+  args JSONB NOT NULL DEFAULT '{}',
+  position INTEGER NOT NULL DEFAULT 0,
+  done INTEGER NOT NULL DEFAULT 0,
+  skipped INTEGER NOT NULL DEFAULT 0,
+  failed INTEGER NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'running',
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  finished_at TIMESTAMP WITH TIME ZONE
+);
@@ -0,0 +1,169 @@
+"""Compares the old linear autoresponder scan with the compiled matcher.
+
+Usage:
+    python scripts/bench_autoresponders.py [corpus.txt] [responders.json]
+
+``corpus.txt`` holds one recorded message per line. ``responders.json`` is a
+list of objects with ``name``, ``trigger``, ``detection`` and optionally
+``restrictions`` (e.g. exported with
+``SELECT name, trigger, detection, restrictions FROM auto_responders``).
+Without them a synthetic corpus and responder set are generated.
+"""
+
+import importlib.util
+import json
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Any, Collection
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# load the module directly so the benchmark doesn't need the bot's config/deps
+spec = importlib.util.spec_from_file_location(
+    "matcher", ROOT / "cogs" / "auto_responders" / "matcher.py"
+)
+matcher = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(matcher)
+
+
+def legacy_match(
+    responders: list[Any],
+    author_id: int,
+    role_ids: Collection[int],
+    channel_id: int,
+    content: str,
+):
+    """The original linear scan from the cog, the reference for the benchmark."""
+    for ar in responders:
+        if ar.wl_users and author_id not in ar.wl_users:
+            continue
+        if ar.bl_users and author_id in ar.bl_users:
+            continue
+
+        roleids = list(role_ids)
+        if ar.wl_roles and all(role not in roleids for role in ar.wl_roles):
+            continue
+        if ar.bl_roles and any(role in roleids for role in ar.bl_roles):
+            continue
+        if ar.wl_channels and channel_id not in ar.wl_channels:
+            continue
+        if ar.bl_channels and channel_id in ar.bl_channels:
+            continue
+
+        lowered = content.lower()
+
+        if ar.detection == "starts":
+            if not lowered.startswith(ar.trigger):
+                continue
+        elif ar.detection == "contains":
+            if ar.trigger not in lowered:
+                continue
+        elif ar.detection == "matches":
+            if ar.trigger != lowered:
+                continue
+        elif ar.detection == "contains_word":
+            if ar.trigger not in lowered.split():
+                continue
+        elif ar.detection == "regex":
+            if not re.search(ar.trigger, content, re.IGNORECASE):
+                continue
+
+        return ar
+
+    return None
+
+
+class FakeAR:
+    def __init__(self, name, trigger, detection, restrictions=None):
+        restrictions = restrictions or {}
+        self.name = name
+        self.trigger = trigger
+        self.detection = detection
+        self.wl_users = restrictions.get("whitelisted_users", [])
+        self.bl_users = restrictions.get("blacklisted_users", [])
+        self.wl_roles = restrictions.get("whitelisted_roles", [])
+        self.bl_roles = restrictions.get("blacklisted_roles", [])
+        self.wl_channels = restrictions.get("whitelisted_channels", [])
+        self.bl_channels = restrictions.get("blacklisted_channels", [])
+
+
+def word(rng):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+
+
+def synthetic(rng, n_responders=300, n_messages=5000):
+    vocab = [word(rng) for _ in range(2000)]
+    detections = ["contains", "starts", "matches", "contains_word", "regex"]
+    responders = []
+    for i in range(n_responders):
+        detection = rng.choice(detections)
+        trigger = " ".join(rng.choices(vocab, k=rng.randint(1, 2)))
+        if detection == "regex":
+            trigger = rf"\b{rng.choice(vocab)}\d*\b"
+        restrictions = {}
+        if rng.random() < 0.3:
+            restrictions["blacklisted_roles"] = rng.sample(range(100), 3)
+        if rng.random() < 0.2:
+            restrictions["whitelisted_channels"] = rng.sample(range(20), 4)
+        responders.append(FakeAR(f"ar{i}", trigger, detection, restrictions))
+
+    messages = [
+        " ".join(rng.choices(vocab, k=rng.randint(1, 30))) for _ in range(n_messages)
+    ]
+    return responders, messages
+
+
+def main():
+    rng = random.Random(0)
+    responders, messages = synthetic(rng)
+
+    if len(sys.argv) > 1:
+        messages = Path(sys.argv[1]).read_text(encoding="utf-8").splitlines()
+    if len(sys.argv) > 2:
+        rows = json.loads(Path(sys.argv[2]).read_text(encoding="utf-8"))
+        responders = []
+        for row in rows:
+            restrictions = row.get("restrictions") or {}
+            if isinstance(restrictions, str):
+                restrictions = json.loads(restrictions)
+            responders.append(
+                FakeAR(row["name"], row["trigger"], row["detection"], restrictions)
+            )
+
+    events = [
+        (
+            rng.randrange(1000),
+            frozenset(rng.sample(range(100), 15)),
+            rng.randrange(20),
+            content,
+        )
+        for content in messages
+    ]
+
+    start = time.perf_counter()
+    compiled = matcher.TriggerMatcher(responders)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    old = [legacy_match(responders, *event) for event in events]
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [compiled.match(*event) for event in events]
+    new_time = time.perf_counter() - start
+
+    mismatches = sum(a is not b for a, b in zip(old, new))
+
+    print(f"responders: {len(responders)}, messages: {len(events)}")
+    print(f"matcher build: {build * 1000:.2f}ms")
+    print(f"old: {old_time:.3f}s ({len(events) / old_time:,.0f} msgs/s)")
+    print(f"new: {new_time:.3f}s ({len(events) / new_time:,.0f} msgs/s)")
+    print(f"speedup: {old_time / new_time:.1f}x, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Compares the old rank card renderer with the cached one.
+
+Usage (from the repository root, the assets are loaded relative to it):
+    python scripts/bench_rank_card.py [n]
+
+First checks that both renderers produce the same frames, then reports
+cards per second for the old renderer, a cold render (new avatar
+each time), a render with a cached avatar and a repeated ``!rank`` that hits
+the output cache.
+"""
+
+import importlib.util
+import random
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# load the module directly so the benchmark doesn't need the bot's config/deps
+spec = importlib.util.spec_from_file_location(
+    "imaging", ROOT / "cogs" / "utils" / "imaging.py"
+)
+imaging = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(imaging)
+
+
+def legacy_rank_card(level, av_file, percent):
+    """The original renderer, kept as the reference."""
+    layer = Image.new(mode="RGBA", size=imaging.frame1.size, color=(0, 0, 0, 0))
+
+    with Image.open(av_file) as av:
+        av = av.resize((imaging.AV_WIDTH, imaging.AV_WIDTH))
+
+    mask = Image.new("L", av.size, 0)
+    ImageDraw.Draw(mask).ellipse([(0, 0), av.size], fill=255)
+    layer.paste(av, imaging.AV_CORNER, mask)
+
+    x = imaging.LVL_CORNER[0]
+    for digit in str(level):
+        im = imaging.numbers[digit]
+        layer.paste(im, (x, imaging.LVL_CORNER[1]))
+        x += im.size[0]
+
+    pbar = imaging.pbar
+    crop = pbar.crop((0, 0, round(pbar.size[0] * percent), pbar.size[1]))
+    mask = Image.new("L", crop.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), crop.size], fill=255, radius=15)
+    new = Image.new(mode="RGBA", size=crop.size, color=0)
+    new.paste(crop, (0, 0), mask)
+    xsize = round(imaging.PBAR_FULL_SIZE[0] * percent)
+    if xsize > 0:
+        new = new.resize((xsize, imaging.PBAR_FULL_SIZE[1]))
+        layer.paste(new, imaging.PBAR_CORNER, new)
+
+    f1 = imaging.frame1.copy()
+    f2 = imaging.frame2.copy()
+    f1.paste(layer, (0, 0), layer)
+    f2.paste(layer, (0, 0), layer)
+
+    out = BytesIO()
+    f1.save(out, append_images=[f2], **imaging.save_kwargs)
+    out.seek(0)
+    return out
+
+
+def frames(data):
+    with Image.open(data) as im:
+        out = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            out.append(im.convert("RGBA").tobytes())
+        return out
+
+
+def compare(rng, n):
+    """Renders the same cards with both renderers and counts the ones whose
+    frames differ, for avatars in the modes Discord serves."""
+    mismatches = 0
+    modes = ["RGB", "RGBA", "P", "LA"]
+    percents = [0, 0.001, 0.5, 0.999, 1] + [rng.random() for _ in range(n)]
+    for i, pc in enumerate(percents):
+        data = avatar(rng, modes[i % len(modes)])
+        level = rng.randint(1, 120)
+        old = frames(legacy_rank_card(level, BytesIO(data), pc))
+        # render through the avatar cache too, like !rank does
+        imaging.generate_rank_card(level, BytesIO(data), pc, ("diff", i))
+        av = imaging.get_cached_avatar(("diff", i))
+        new = frames(imaging.generate_rank_card(level, av, pc))
+        if old != new:
+            mismatches += 1
+            print(f"mismatch: level {level}, percent {pc}, mode {modes[i % len(modes)]}")
+    print(f"compared {len(percents)} cards, mismatches: {mismatches}")
+    return mismatches
+
+
+def avatar(rng, mode="RGB"):
+    im = Image.new("RGB", (512, 512), tuple(rng.randrange(256) for _ in range(3)))
+    # some detail so resampling differences would show up
+    ImageDraw.Draw(im).ellipse((100, 50, 400, 300), fill=(255, 255, 255))
+    if mode == "P":
+        im = im.quantize(16)
+    else:
+        im = im.convert(mode)
+    out = BytesIO()
+    im.save(out, format="PNG")
+    return out.getvalue()
+
+
+def run(label, n, func):
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {n / elapsed:8.1f} cards/s")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rng = random.Random(0)
+    avatars = [avatar(rng) for _ in range(20)]
+    cases = [(rng.randint(1, 120), rng.random()) for _ in range(n)]
+
+    def legacy(i):
+        level, pc = cases[i]
+        legacy_rank_card(level, BytesIO(avatars[i % len(avatars)]), pc)
+
+    def cold(i):
+        level, pc = cases[i]
+        imaging.generate_rank_card(level, BytesIO(avatars[i % len(avatars)]), pc)
+
+    def cached_avatar(i):
+        level, pc = cases[i]
+        key = i % len(avatars)
+        av = imaging.get_cached_avatar(key)
+        if av is None:
+            av = BytesIO(avatars[key])
+        imaging.generate_rank_card(level, av, pc, key)
+
+    def repeated(i):
+        level, pc = cases[i % len(avatars)]
+        key = i % len(avatars)
+        if imaging.get_cached_rank_card(key, level, pc) is None:
+            imaging.generate_rank_card(level, BytesIO(avatars[key]), pc, key)
+
+    if compare(rng, min(n, 50)):
+        sys.exit(1)
+
+    run("legacy", n, legacy)
+    run("cold", n, cold)
+    run("cached avatar", n, cached_avatar)
+    imaging.card_cache.data.clear()
+    run("repeated !rank", n, repeated)
+
+
+if __name__ == "__main__":
+    main()